@@ -0,0 +1,38 @@
+import os 
+import uuid
+from typing import Optional
+from adapters.files.base import FileService
+
+
+class _LocalFiles(FileService):
+    """Stand-in file service keeping uploads in a local directory, for tests; no LLM provider can read its file ids."""
+    name = "local"
+    
+    def __init__(self, directory: str = "./uploaded_files"):
+        self.directory = directory
+        self.uploads = 0
+    
+    def _path(self, file_id: str) -> str:
+        return os.path.join(self.directory, file_id)
+    
+    def upload(self, data: bytes, filename: str, ttl_seconds: int) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        file_id = f"file-{uuid.uuid4().hex}"
+        with open(self._path(file_id), 'wb') as f:
+            f.write(data)
+        self.uploads += 1
+        return file_id
+    
+    def get(self, file_id: str) -> Optional[bytes]:
+        try:
+            with open(self._path(file_id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def delete(self, file_id: str):
+        if os.path.exists(self._path(file_id)):
+            os.remove(self._path(file_id))
+    
+    def is_missing_file(self, error: Exception, file_id: str) -> bool:
+        return isinstance(error, FileNotFoundError)
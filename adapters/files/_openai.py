@@ -0,0 +1,28 @@
+from typing import Optional
+from adapters.files.base import FileService
+from openai import BadRequestError, NotFoundError, OpenAI
+
+
+class _OpenAIFiles(FileService):
+    name = "openai"
+    
+    def __init__(self, client: Optional[OpenAI] = None):
+        self.client = client or OpenAI()
+    
+    def upload(self, data: bytes, filename: str, ttl_seconds: int) -> str:
+        uploaded = self.client.files.create(
+            file=(filename, data, "application/pdf"),
+            purpose="user_data",
+            expires_after={"anchor": "created_at", "seconds": ttl_seconds},
+        )
+        return uploaded.id
+    
+    def delete(self, file_id: str):
+        try:
+            self.client.files.delete(file_id)
+        except NotFoundError:
+            pass 
+    
+    def is_missing_file(self, error: Exception, file_id: str) -> bool:
+        # Expired or deleted files are reported as not found, or as an invalid request naming the file
+        return isinstance(error, NotFoundError) or (isinstance(error, BadRequestError) and file_id in str(error)) 
@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+
+
+class FileService(ABC):
+    # Identifies the provider in file handle cache keys, handles are only valid there
+    name: str = "files"
+    
+    @abstractmethod
+    def upload(self, data: bytes, filename: str, ttl_seconds: int) -> str:
+        """Upload a file the provider keeps for ttl_seconds and return its file id."""
+        pass 
+    
+    @abstractmethod
+    def delete(self, file_id: str):
+        """Delete an uploaded file, ignoring files that are already gone."""
+        pass 
+    
+    def is_missing_file(self, error: Exception, file_id: str) -> bool:
+        """Whether a request referencing file_id failed because the provider no longer has the file."""
+        return False 
@@ -0,0 +1,161 @@
+"""
+Cache of files uploaded to an LLM provider, keyed by document content hash.
+
+A document analysed repeatedly is uploaded once; later requests reference the
+provider's file id instead of shipping the document in the request body again.
+Handles are stored one JSON file per key, so workers sharing the directory never
+overwrite each other's uploads.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from adapters.files.base import FileService
+
+
+# Directory of the handles, one subdirectory per provider
+FILE_HANDLE_DIR = "./cached_files"
+# How long the provider keeps an uploaded file
+FILE_HANDLE_TTL_SECONDS = 7 * 24 * 3600
+# Handles are dropped this long before the provider expires the file, so a request
+# never references a file that disappears while it is being processed
+FILE_HANDLE_EXPIRY_MARGIN = 3600
+
+
+class FileHandleCache:
+    """Provider file ids of uploaded documents, persisted on disk one file per key."""
+
+    def __init__(self, file_service: FileService, directory: str = FILE_HANDLE_DIR,
+                 ttl_seconds: int = FILE_HANDLE_TTL_SECONDS):
+        """
+        Initialize the cache.
+
+        Args:
+            file_service (FileService): Provider the files are uploaded to
+            directory (str): Directory holding the handles, created on first write
+            ttl_seconds (int): How long the provider keeps each upload
+        """
+        self.file_service = file_service
+        self.ttl_seconds = ttl_seconds
+        self.directory = os.path.join(directory, file_service.name)
+        self.stats = {'hits': 0, 'misses': 0, 'uploads': 0, 'expired': 0, 'invalidated': 0}
+        self._lock = threading.Lock()
+        self._import_index(os.path.join(directory, f"{file_service.name}.json"))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _import_index(self, index_path: str):
+        # Earlier versions kept every handle of a provider in one index file
+        try:
+            with open(index_path, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable file handle index {index_path}: {str(e)}")
+            entries = {}
+        for key, entry in entries.items():
+            if not os.path.exists(self._path(key)):
+                self._write(key, entry)
+        try:
+            os.remove(index_path)
+        except FileNotFoundError:
+            # Another worker imported it first
+            pass
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable file handle {key}: {str(e)}")
+            return None
+
+    def _write(self, key: str, entry: Dict[str, Any]):
+        # Written atomically so other workers never read a partial handle
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _remove(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            # Another worker removed it first
+            return False
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the upload of a document.
+
+        Args:
+            key (str): Content hash of the document, plus anything that changes what was uploaded
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry (file_id, expires_at and the metadata given at
+                upload), or None if the document was never uploaded or its handle expired
+        """
+        entry = self._read(key)
+        with self._lock:
+            if entry is not None and entry['expires_at'] <= time.time():
+                # The provider deletes the file itself; forget the handle
+                self._remove(key)
+                self.stats['expired'] += 1
+                entry = None
+            self.stats['hits' if entry is not None else 'misses'] += 1
+        return entry
+
+    def upload(self, key: str, data: bytes, filename: str, **metadata) -> str:
+        """
+        Upload a document and remember its handle.
+
+        Args:
+            key (str): Key the handle is stored under, see lookup
+            data (bytes): File contents
+            filename (str): Name the file is uploaded under
+            **metadata: JSON-serialisable values returned with the entry by lookup
+
+        Returns:
+            str: The provider's file id
+        """
+        uploaded_at = time.time()
+        file_id = self.file_service.upload(data, filename, self.ttl_seconds)
+        self._write(key, {
+            **metadata,
+            'file_id': file_id,
+            'expires_at': uploaded_at + self.ttl_seconds - FILE_HANDLE_EXPIRY_MARGIN,
+        })
+        with self._lock:
+            self.stats['uploads'] += 1
+        return file_id
+
+    def invalidate(self, key: str):
+        """
+        Forget a handle and delete its file, e.g. after the provider rejected the file id.
+
+        Args:
+            key (str): Key the handle is stored under
+        """
+        entry = self._read(key)
+        if entry is None or not self._remove(key):
+            return
+        with self._lock:
+            self.stats['invalidated'] += 1
+        try:
+            self.file_service.delete(entry['file_id'])
+        except Exception as e:
+            print(f"Warning: Could not delete uploaded file {entry['file_id']}: {str(e)}")
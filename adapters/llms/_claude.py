@@ -14,6 +14,11 @@ class CLAUDE_CONFIG(Enum):
     MODEL_ID = "claude-3-7-sonnet-20250219"
     
     
+class ClaudeText(str):
+    """Text of a non-streaming response, carrying why the model stopped."""
+    stop_reason = None
+
+
 class AnthropicAdapter(LargeLanguageModel):
     
     def __init__(self):
@@ -65,6 +70,31 @@ class AnthropicAdapter(LargeLanguageModel):
             if text.type == "content_block_delta":
                 yield text.delta.text   
     
+    @staticmethod
+    def _split_payload(payload):
+        """
+        Split a payload into the system prompt and the conversation.
+        
+        Args:
+            payload: get_payload output, or a list of chat messages whose leading
+                "system" messages form the system prompt
+            
+        Returns:
+            Tuple of the system prompt and the remaining messages
+        """
+        if isinstance(payload, dict):
+            return payload['system'], payload['user_prompt']
+        system = [message['content'] for message in payload if message['role'] == "system"]
+        messages = [message for message in payload if message['role'] != "system"]
+        return "\n\n".join(system), messages
+    
+    @staticmethod
+    def _cached_system(system):
+        """Mark the system prompt, the static prefix of every call, as a prompt cache breakpoint."""
+        if not isinstance(system, str) or not system:
+            return system
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    
     def get_payload(self, system_prompt, user_prompt):
         return {
             "system": system_prompt, 
@@ -85,21 +115,52 @@ class AnthropicAdapter(LargeLanguageModel):
             Exception: If there's an issue with the request
         """
         try:
-            user = payload['user_prompt']
-            system = payload['system']
+            system, user = self._split_payload(payload)
             response = self.anthropic_client.messages.create(
                 model = CLAUDE_CONFIG.MODEL_ID.value,
-                system = system,
+                system = self._cached_system(system),
                 messages = user,
                 max_tokens=CLAUDE_CONFIG.MAX_TOKENS.value,
                 temperature=CLAUDE_CONFIG.TEMPERATURE.value,
                 top_k=CLAUDE_CONFIG.TOP_K.value,
                 top_p=CLAUDE_CONFIG.TOP_P.value, 
             )
-            return response.content[0].text
+            usage = response.usage
+            cache_read = usage.cache_read_input_tokens or 0
+            cache_write = usage.cache_creation_input_tokens or 0
+            # input_tokens only counts the tokens after the last cache breakpoint
+            self.report_prompt_cache(CLAUDE_CONFIG.MODEL_ID.value, usage.input_tokens + cache_read + cache_write,
+                                     cache_read, cache_write)
+            text = ClaudeText(response.content[0].text)
+            text.stop_reason = response.stop_reason
+            return text
             
         except Exception as e:
             raise e
+    
+    def cache_identity(self):
+        return {
+            "provider": "anthropic",
+            "model": CLAUDE_CONFIG.MODEL_ID.value,
+            "params": {
+                "max_tokens": CLAUDE_CONFIG.MAX_TOKENS.value,
+                "temperature": CLAUDE_CONFIG.TEMPERATURE.value,
+                "top_k": CLAUDE_CONFIG.TOP_K.value,
+                "top_p": CLAUDE_CONFIG.TOP_P.value,
+            },
+        }
+    
+    def is_cacheable_response(self, response: str) -> bool:
+        # Responses cut off at max_tokens or a stop sequence are not reused
+        return getattr(response, 'stop_reason', None) == "end_turn"
+    
+    def serialize_response(self, response: str) -> str:
+        return str(response)
+    
+    def deserialize_response(self, data: str) -> str:
+        text = ClaudeText(data)
+        text.stop_reason = "end_turn"
+        return text
 
 anthropic = AnthropicAdapter()
 # anthropic.stream({"role": "user", "content": "hi"})
\ No newline at end of file
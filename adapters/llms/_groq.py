@@ -1,12 +1,15 @@
 import os
 
 from groq import Groq, AsyncGroq
+from groq.types.chat import ChatCompletion
 
 from typing import List
 from adapters.llms.base import LargeLanguageModel 
 
 
 class _Groq(LargeLanguageModel):
+    non_streaming_params = {"temperature": 0, "max_completion_tokens": 50000}
+    
     def __init__(self, model_name: str = "gpt-5"):
         self.client = Groq(
             # This is the default and can be omitted
@@ -25,10 +28,28 @@ class _Groq(LargeLanguageModel):
             ) 
     
     def get_non_streaming_response(self, payload: List[dict]):
-        return self.client.chat.completions.create(
+        # Groq caches prompt prefixes automatically on supported models; there is no request parameter
+        response = self.client.chat.completions.create(
                 messages=payload,
                 model=self.model_name,
-                temperature=0,
-                max_completion_tokens=50000,
+                **self.non_streaming_params,
                 # reasoning_effort='medium'
-            )
\ No newline at end of file
+            )
+        if response.usage is not None:
+            # Reported by the API but not yet modelled by the SDK's CompletionUsage
+            details = getattr(response.usage, 'prompt_tokens_details', None) or {}
+            cached_tokens = details.get('cached_tokens') if isinstance(details, dict) else getattr(details, 'cached_tokens', 0)
+            self.report_prompt_cache(self.model_name, response.usage.prompt_tokens, cached_tokens or 0)
+        return response
+    
+    def cache_identity(self):
+        return {"provider": "groq", "model": self.model_name, "params": self.non_streaming_params}
+    
+    def is_cacheable_response(self, response: ChatCompletion) -> bool:
+        return response.choices[0].finish_reason == "stop"
+    
+    def serialize_response(self, response: ChatCompletion) -> str:
+        return response.model_dump_json()
+    
+    def deserialize_response(self, data: str) -> ChatCompletion:
+        return ChatCompletion.model_validate_json(data)
\ No newline at end of file
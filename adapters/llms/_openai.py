@@ -1,11 +1,15 @@
 from typing import List
-from adapters.llms.base import LargeLanguageModel 
+from adapters.files._openai import _OpenAIFiles
+from adapters.llms.base import LargeLanguageModel, prompt_cache_key
 from openai import OpenAI
+from openai.types.responses import Response
 from utils.schemas import LeaseDocument
 import json 
 
 
 class _OpenAI(LargeLanguageModel):
+    non_streaming_params = {"max_output_tokens": 19999}
+    
     def __init__(self, model_name: str = "gpt-5-nano"):
         self.client = OpenAI()
         self.model_name = model_name
@@ -19,9 +23,34 @@ class _OpenAI(LargeLanguageModel):
         )
     
     def get_non_streaming_response(self, payload: List[dict]):
-        return self.client.responses.create(
+        # Prompts over 1024 tokens are cached by prefix; keying calls by their system messages
+        # routes calls that share them to the same cache
+        response = self.client.responses.create(
             model=self.model_name,
             input=payload,
-            max_output_tokens=19999,
-        
-        ) 
\ No newline at end of file
+            prompt_cache_key=prompt_cache_key(payload),
+            **self.non_streaming_params,
+        )
+        if response.usage is not None:
+            details = response.usage.input_tokens_details
+            self.report_prompt_cache(self.model_name, response.usage.input_tokens, details.cached_tokens if details else 0)
+        return response
+    
+    def get_file_service(self) -> _OpenAIFiles:
+        return _OpenAIFiles(self.client)
+    
+    def cache_identity(self):
+        # Without a pinned temperature calls are sampled, and replaying one sample would hide
+        # the model's variation; gpt-5 models accept no temperature, so their calls are not cached
+        if self.non_streaming_params.get("temperature") != 0:
+            return None
+        return {"provider": "openai", "model": self.model_name, "params": self.non_streaming_params}
+    
+    def is_cacheable_response(self, response: Response) -> bool:
+        return response.status == "completed"
+    
+    def serialize_response(self, response: Response) -> str:
+        return response.model_dump_json()
+    
+    def deserialize_response(self, data: str) -> Response:
+        return Response.model_validate_json(data)
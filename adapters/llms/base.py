@@ -1,7 +1,33 @@
-import os 
 import json 
+import hashlib
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List, Optional
+from adapters.files.base import FileService
+
+
+# Input tokens of all provider calls, and how many were read from or written to the
+# providers' prompt caches
+_prompt_cache_lock = threading.Lock()
+_prompt_cache_totals = {'calls': 0, 'input_tokens': 0, 'cached_input_tokens': 0, 'cache_write_tokens': 0}
+
+
+def prompt_cache_stats() -> Dict[str, Any]:
+    """Return the input token totals of all provider calls and the share served from prompt caches."""
+    with _prompt_cache_lock:
+        totals = dict(_prompt_cache_totals)
+    totals['cached_share'] = round(totals['cached_input_tokens'] / totals['input_tokens'], 4) if totals['input_tokens'] else None
+    return totals
+
+
+def prompt_cache_key(payload: List[dict]) -> str:
+    """Key the leading system messages of a payload, the static prefix calls of one prompt share."""
+    prefix = []
+    for message in payload:
+        if message.get("role") != "system":
+            break
+        prefix.append(message)
+    return hashlib.sha256(json.dumps(prefix, sort_keys=True).encode('utf-8')).hexdigest()[:32]
 
 
 class LargeLanguageModel(ABC):
@@ -13,5 +39,36 @@ class LargeLanguageModel(ABC):
     def get_non_streaming_response(self, payload: List[dict]):
         pass 
     
+    def get_file_service(self) -> Optional[FileService]:
+        """Return the service documents can be uploaded to once and referenced by file id, if the provider has one."""
+        return None
+    
+    def cache_identity(self) -> Optional[Dict[str, Any]]:
+        """Return the provider, model and parameters that determine a non-streaming response, or None if responses must not be cached, e.g. when calls are sampled rather than run at temperature 0."""
+        return None
     
+    def is_cacheable_response(self, response: Any) -> bool:
+        """Return whether a non-streaming response is complete enough to be reused, e.g. not cut off at the token limit.
 
+        Adapters that cache responses override this with their provider's completion check,
+        along with serialize_response and deserialize_response.
+        """
+        return False
+    
+    def serialize_response(self, response: Any) -> str:
+        """Encode a non-streaming response as text for the response cache."""
+        raise NotImplementedError
+    
+    def deserialize_response(self, data: str) -> Any:
+        """Rebuild a non-streaming response from serialize_response output."""
+        raise NotImplementedError
+    
+    def report_prompt_cache(self, model: str, input_tokens: int, cached_input_tokens: int, cache_write_tokens: int = 0):
+        """Log how many input tokens of a call were read from the provider's prompt cache, and add them to prompt_cache_stats."""
+        with _prompt_cache_lock:
+            _prompt_cache_totals['calls'] += 1
+            _prompt_cache_totals['input_tokens'] += input_tokens
+            _prompt_cache_totals['cached_input_tokens'] += cached_input_tokens
+            _prompt_cache_totals['cache_write_tokens'] += cache_write_tokens
+        print(f"Prompt cache ({model}): {cached_input_tokens} of {input_tokens} input tokens cached, "
+              f"{input_tokens - cached_input_tokens} uncached, {cache_write_tokens} written")
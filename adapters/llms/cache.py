@@ -0,0 +1,269 @@
+"""
+Disk cache of non-streaming LLM responses.
+
+Re-running an analysis on the same document sends the provider a payload it has
+already answered. Responses are stored under a hash of the provider, model,
+parameters and payload, so identical calls are answered from disk instead.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from adapters.files.base import FileService
+from adapters.llms.base import LargeLanguageModel
+
+
+# Directory of the response cache used by the API
+RESPONSE_CACHE_DIR = "./cached_llm"
+# Responses older than this are not reused
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+# Least recently used responses are evicted beyond this total size
+RESPONSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResponseCache:
+    """Serialized responses on disk, one JSON file per call, with hit-rate counters."""
+
+    def __init__(self, directory: str = RESPONSE_CACHE_DIR, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str): Directory holding the entries, created on first write
+            ttl_seconds (float): Age after which a response is no longer reused
+            max_bytes (int): Total size of the entries kept
+        """
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0, 'expired': 0, 'evictions': 0,
+                          'saved_seconds': 0.0}
+
+    @classmethod
+    def from_env(cls) -> Optional['ResponseCache']:
+        """Build the cache from the optional LLM_CACHE env var, e.g. {"ttl_hours": 24, "max_mb": 256}; None if {"enabled": false}."""
+        config: dict = json.loads(os.environ.get('LLM_CACHE') or '{}')
+        if not config.get('enabled', True):
+            return None
+        return cls(
+            directory=config.get('directory', RESPONSE_CACHE_DIR),
+            ttl_seconds=config['ttl_hours'] * 3600 if 'ttl_hours' in config else RESPONSE_CACHE_TTL_SECONDS,
+            max_bytes=int(config['max_mb'] * 1024 * 1024) if 'max_mb' in config else RESPONSE_CACHE_MAX_BYTES,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters of the cache.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, calls that bypassed the cache, stored responses,
+                expired and evicted entries, the hit rate of cacheable calls and the
+                provider time that hits saved
+        """
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'saved_seconds': round(self._counters['saved_seconds'], 3),
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else None,
+            }
+
+    def count(self, counter: str, amount: float = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    @staticmethod
+    def key(identity: Dict[str, Any], payload: Any) -> str:
+        """
+        Hash a call.
+
+        Args:
+            identity (Dict[str, Any]): Provider, model and parameters, see LargeLanguageModel.cache_identity
+            payload: Request payload
+
+        Returns:
+            str: Hex digest of the identity and payload
+        """
+        encoded = json.dumps({'identity': identity, 'payload': payload}, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a response.
+
+        Args:
+            key (str): Call hash, see key
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry (serialized response, provider seconds and
+                creation time), or None if missing, expired or unreadable
+        """
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.count('misses')
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable response cache entry {key}: {str(e)}")
+            self.count('misses')
+            return None
+        if time.time() - entry['created_at'] > self.ttl_seconds:
+            self._remove(key)
+            self.count('expired')
+            self.count('misses')
+            return None
+        # The modification time records the last use, for eviction
+        os.utime(self._path(key))
+        self.count('hits')
+        self.count('saved_seconds', entry['seconds'])
+        return entry
+
+    def put(self, key: str, response: str, seconds: float):
+        """
+        Save a response atomically, then evict the least recently used beyond max_bytes.
+
+        Args:
+            key (str): Call hash, see key
+            response (str): Serialized response
+            seconds (float): Time the provider took to answer
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'created_at': time.time(), 'seconds': seconds, 'response': response}, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.count('stores')
+        self.evict()
+
+    def _remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> List[str]:
+        """
+        Remove the least recently used entries until the rest fit in max_bytes.
+
+        Returns:
+            List[str]: Keys of the removed entries
+        """
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    try:
+                        stat = os.stat(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, name[:-len(".json")]))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            evicted = []
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(key)
+                total -= size
+                evicted.append(key)
+            self._counters['evictions'] += len(evicted)
+            return evicted
+
+
+class CachedLLM(LargeLanguageModel):
+    """An LLM adapter whose non-streaming responses are answered from a ResponseCache when possible."""
+
+    def __init__(self, llm: LargeLanguageModel, cache: ResponseCache):
+        """
+        Wrap an adapter.
+
+        Args:
+            llm (LargeLanguageModel): Adapter making the provider calls
+            cache (ResponseCache): Cache of its responses
+        """
+        self.llm = llm
+        self.cache = cache
+
+    def __getattr__(self, name: str):
+        # Provider-specific helpers (e.g. process_response) are used as on the wrapped adapter
+        return getattr(self.llm, name)
+
+    def get_streaming_response(self, payload: List[dict]):
+        return self.llm.get_streaming_response(payload)
+
+    def get_non_streaming_response(self, payload: List[dict], cache: bool = True):
+        """
+        Answer a call from the cache, or from the provider and store the response.
+
+        Args:
+            payload: Request payload
+            cache (bool): False to always call the provider and leave the cache untouched,
+                e.g. when a fresh answer is wanted
+
+        Returns:
+            The provider's response, as returned by the wrapped adapter
+        """
+        identity = self.llm.cache_identity()
+        if not cache or identity is None:
+            self.cache.count('bypassed')
+            return self.llm.get_non_streaming_response(payload)
+
+        key = self.cache.key(identity, payload)
+        entry = self.cache.get(key)
+        if entry is not None:
+            try:
+                return self.llm.deserialize_response(entry['response'])
+            except Exception as e:
+                print(f"Warning: Could not rebuild cached response {key}, calling the provider: {str(e)}")
+
+        started = time.perf_counter()
+        response = self.llm.get_non_streaming_response(payload)
+        try:
+            if self.llm.is_cacheable_response(response):
+                self.cache.put(key, self.llm.serialize_response(response), time.perf_counter() - started)
+        except Exception as e:
+            print(f"Warning: Could not cache response {key}: {str(e)}")
+        return response
+
+    def get_file_service(self) -> Optional[FileService]:
+        return self.llm.get_file_service()
+
+    def cache_identity(self) -> Optional[Dict[str, Any]]:
+        return self.llm.cache_identity()
+
+    def is_cacheable_response(self, response: Any) -> bool:
+        return self.llm.is_cacheable_response(response)
+
+    def serialize_response(self, response: Any) -> str:
+        return self.llm.serialize_response(response)
+
+    def deserialize_response(self, data: str) -> Any:
+        return self.llm.deserialize_response(data)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_loaded = False
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, creating it from the environment on first use; None when disabled."""
+    global _response_cache, _response_cache_loaded
+    if not _response_cache_loaded:
+        _response_cache = ResponseCache.from_env()
+        _response_cache_loaded = True
+    return _response_cache
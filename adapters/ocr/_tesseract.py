@@ -0,0 +1,30 @@
+import shutil
+import subprocess
+
+from adapters.ocr.base import OCREngine
+
+
+class _Tesseract(OCREngine):
+    def __init__(self, language: str = "eng", timeout: int = 120):
+        # Runs the local tesseract binary, so OCR threads are not serialised on the GIL
+        self.language = language
+        self.timeout = timeout
+        self.name = f"tesseract-{language}"
+    
+    def available(self) -> bool:
+        return shutil.which("tesseract") is not None
+        
+    def extract_text(self, image: bytes) -> str:
+        try:
+            result = subprocess.run(
+                ["tesseract", "stdin", "stdout", "-l", self.language],
+                input=image,
+                capture_output=True,
+                timeout=self.timeout,
+                check=True,
+            )
+        except FileNotFoundError:
+            raise RuntimeError("tesseract is not installed; install it or configure another OCR provider")
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"tesseract failed: {e.stderr.decode(errors='replace').strip()}")
+        return result.stdout.decode("utf-8", errors="replace")
@@ -0,0 +1,17 @@
+from abc import ABC, abstractmethod
+
+
+class OCREngine(ABC):
+    # Identifies the engine and its settings in OCR cache keys
+    name: str = "ocr"
+    
+    @abstractmethod
+    def extract_text(self, image: bytes) -> str:
+        """Return the text recognised in a PNG page image."""
+        pass 
+    
+    def available(self) -> bool:
+        """Return whether the engine can run here, e.g. that its binary is installed."""
+        return True
+    
+    
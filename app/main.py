@@ -9,7 +9,12 @@ import json
 from fastapi.responses import StreamingResponse
 
 from app.routers import companies, debug, lease_abstraction, minimum_lease_terms
+from adapters.llms.base import prompt_cache_stats
+from adapters.llms.cache import get_response_cache
 from utils.constants import CORS_CONFIG
+from utils.helpers import ocr_status
+from utils.parsers.chunk_cache import get_chunk_cache
+from utils.parsers.service import get_parsing_service
   
 app = FastAPI()
 
@@ -63,11 +68,23 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
+    ocr = ocr_status()
     return {
-        "status": "healthy",
+        # Degraded when OCR is configured but its engine cannot run, so scans would parse empty
+        "status": "degraded" if ocr and not ocr["available"] else "healthy",
         "timestamp": time.time(),
         "environment": os.environ.get("ENVIRONMENT", "unknown"),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        # Parses in flight and queued behind busy workers
+        "parsing": get_parsing_service().stats(),
+        # Chunk cache hits, misses and evictions per tier
+        "chunk_cache": get_chunk_cache().stats(),
+        # LLM response cache hit rate and provider time saved
+        "llm_cache": get_response_cache().stats() if get_response_cache() else None,
+        # Input tokens served from the providers' prompt caches
+        "prompt_cache": prompt_cache_stats(),
+        # Configured OCR engine and whether it is installed, None when OCR is off
+        "ocr": ocr
     }
     
 @app.post('/sample-stream')
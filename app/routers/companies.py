@@ -1,15 +1,14 @@
 import os
 from datetime import datetime
 import json
-import pickle
 from http import HTTPStatus
 from fastapi import File, Form, UploadFile
 from fastapi.responses import JSONResponse
 from fastapi.routing import APIRouter
 
 from utils.constants import AnalysisType
-from utils.helpers import content_from_doc, get_db_adapter, get_llm_adapter, load_or_process_pdf, run_all_analyses, run_single_analysis
-from utils.parsers.pdf import PDFChunker
+from utils.helpers import content_from_doc, get_db_adapter, get_llm_adapter, load_or_process_pdf, preflight_rejection, run_all_analyses, run_single_analysis, stream_or_load_pdf
+from utils.parsers.service import get_parsing_service
 from utils.references import amendments, cam
 from utils.schemas import CreateRequest
 
@@ -48,6 +47,18 @@ async def get_single_company(company_uid: str):
 async def get_analysis(company_uid: str):
     return database_adapter.get_single({"uid": company_uid})
 
+@router.post("/{company_uid}/documents/preflight")
+async def get_document_preflight(company_uid: str, file: UploadFile = File(...)):
+    """Inspect a PDF in milliseconds: page count, text density, tables, scans and estimated cost"""
+    report = await get_parsing_service().preflight(file)
+    rejection = preflight_rejection(report)
+    return {
+        "filename": file.filename,
+        "accepted": rejection is None,
+        "reason": rejection[1] if rejection else None,
+        "preflight": report
+    }
+
 @router.post("/{company_uid}/documents/analyze")
 async def get_document_analysis(
     company_uid: str,
@@ -71,9 +82,18 @@ async def get_document_analysis(
                 status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        # Load or process PDF
-        file_content = await file.read()
-        chunks = await load_or_process_pdf(file.filename or "", file_content)
+        # Reject encrypted, unreadable or oversized documents before paying for a parse and LLM calls
+        report = await get_parsing_service().preflight(file)
+        rejection = preflight_rejection(report)
+        if rejection:
+            status, reason = rejection
+            return JSONResponse(
+                content={"error": reason, "preflight": report},
+                status_code=status.value
+            )
+        
+        # Load or process PDF, reading the upload's spooled file without copying it
+        chunks = await load_or_process_pdf(file.filename or "", file)
         if documentType == "lease":
             # Perform requested analysis
             if requested_analysis == AnalysisType.ALL:
@@ -183,26 +203,20 @@ async def get_cam_rules(
                 status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as fp:
-                chunks = pickle.load(fp)
-        
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as fp:
-                pickle.dump(chunks, fp)
-        
         documents = content_from_doc([6, 7])
         message_content = None  # Initialize to avoid NameError if chunks is empty
         previous_cam = None
-        for i, chunk in enumerate(chunks):
+        previous_chunk = None
+        # Chunks stream in while the PDF is still parsing, so the first pages go to the model early.
+        # Short pages are merged into token-budget chunks, so a lease takes fewer sequential calls.
+        async for chunk in stream_or_load_pdf(assets.filename or "", assets, chunking="tokens"):
+            i = chunk.chunk_id - 1
+            pages = chunk.page_numbers
+            current_pages = ", ".join(str(page) for page in pages)
             chunk_data = f"""
-                Here is the content from page {chunk.page_number} of the lease document:
+                Here is the content from page(s) {current_pages} of the lease document:
                 
-                Page number: {chunk.page_number}
+                Page number(s): {current_pages}
                 Text content: {chunk.original_page_text} # full page for next, and previous 
                 """
                 
@@ -212,8 +226,11 @@ async def get_cam_rules(
                 # if not os.path.exists('./cam_result'):
                 #     os.makedirs('./cam_result', exist_ok=True)
                     
-            system_prompt = system.format(CURRENT_PAGE_NUMBER = str(i + 1), PREVIOUS_PAGE_NUMBER = str(i), NEXT_PAGE_NUMBER = str(i + 2), NEXT_PAGE_CONTENT = None,
-                                        PREVIOUS_PAGE_CONTENT = None if i == 0 else chunks[i - 1].original_page_text, CURRENT_PAGE_CONTENT = chunk.original_page_text, PREVIOUSLY_EXTRACTED_CAM_RULES = previous_cam)
+            # The template's text before its first page field is identical on every call, so it
+            # is the prefix providers serve from their prompt cache
+            system_prompt = system.format(CURRENT_PAGE_NUMBER = current_pages, PREVIOUS_PAGE_NUMBER = str(pages[0] - 1), NEXT_PAGE_NUMBER = str(pages[-1] + 1), NEXT_PAGE_CONTENT = None,
+                                        PREVIOUS_PAGE_CONTENT = None if previous_chunk is None else previous_chunk.original_page_text, CURRENT_PAGE_CONTENT = chunk.original_page_text, PREVIOUSLY_EXTRACTED_CAM_RULES = previous_cam)
+            previous_chunk = chunk
         
             payload = [
                     {
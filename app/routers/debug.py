@@ -8,19 +8,16 @@ from fastapi import (
     File,
     UploadFile,
 )
-import pickle 
 from dotenv import load_dotenv
 from fastapi.responses import JSONResponse
 from utils.logs import logger
-from utils.helpers import combined_analysis, content_from_doc, get_llm_adapter, update_result_json, compile_iterative_outputs
-from utils.parsers.pdf import PDFChunker
+from utils.helpers import combined_analysis, content_from_doc, get_fresh_response, load_or_process_pdf, update_result_json, compile_iterative_outputs
 from utils.references import audit, cam, chargeSchedules, executive_summary, leaseInformation, misc, space, amendments
 from utils.schemas import SaveZod
 import time 
 load_dotenv()
 router = APIRouter()
-
-llm_adapter = get_llm_adapter()
+# These endpoints re-run analyses to inspect the model's answer, so calls skip the response cache
 
 @router.post("/info")
 async def get_lease_abstraction(
@@ -31,16 +28,7 @@ async def get_lease_abstraction(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         # Convert chunks to JSON-serializable format
         data = "Given below is the data of a Lease PDF"
@@ -71,7 +59,7 @@ async def get_lease_abstraction(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
 
         message_content = response.choices[0].message.content
 
@@ -96,16 +84,7 @@ async def get_space(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         
         # Convert chunks to JSON-serializable format
@@ -137,7 +116,7 @@ async def get_space(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
 
         message_content = response.choices[0].message.content
 
@@ -162,16 +141,7 @@ async def get_sched(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         # Convert chunks to JSON-serializable format
         data = "Given below is the data of a Lease PDF"
@@ -202,7 +172,7 @@ async def get_sched(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
 
         message_content = response.choices[0].message.content
 
@@ -227,16 +197,7 @@ async def get_misc(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         # Convert chunks to JSON-serializable format
         data = "Given below is the data of a Lease PDF"
@@ -267,7 +228,7 @@ async def get_misc(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
 
         message_content = response.choices[0].message.content
 
@@ -292,16 +253,7 @@ async def get_exec_summary(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         # Convert chunks to JSON-serializable format
         data = "Given below is the data of a Lease PDF"
@@ -332,7 +284,7 @@ async def get_exec_summary(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
 
         message_content = response.choices[0].message.content
 
@@ -357,16 +309,7 @@ async def get_audit_details(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         # Convert chunks to JSON-serializable format
         data = "Given below is the data of a Lease PDF"
@@ -395,7 +338,7 @@ async def get_audit_details(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
 
         message_content = response.choices[0].message.content
 
@@ -428,16 +371,7 @@ async def get_cam(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-    if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-        print('Found the PDF analysis << --')
-        with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-            chunks = pickle.load(file)
-    else:
-        chunker = PDFChunker(overlap_percentage=0.2)
-        # Process the PDF from bytes
-        chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-        with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-            pickle.dump(chunks, file)
+    chunks = await load_or_process_pdf(assets.filename or "", assets)
     
     # Convert chunks to JSON-serializable format
     data = "Given below is the data of a Lease PDF"
@@ -494,7 +428,7 @@ async def get_cam(
         }
         
     
-    response = llm_adapter.get_non_streaming_response(payload)
+    response = get_fresh_response(payload)
     return json.loads(response)
     message_content = response.choices[0].message.content
     with open('./full-output.txt', 'w') as fp:
@@ -521,16 +455,7 @@ async def get_cam(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-    if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-        print('Found the PDF analysis << --')
-        with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-            chunks = pickle.load(file)
-    else:
-        chunker = PDFChunker(overlap_percentage=0.2)
-        # Process the PDF from bytes
-        chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-        with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-            pickle.dump(chunks, file)
+    chunks = await load_or_process_pdf(assets.filename or "", assets)
     
     # Initialize empty result dictionary for iterative updates
     documents = content_from_doc([6, 7])
@@ -568,7 +493,7 @@ async def get_cam(
                 ]            
 
             # Update the result dictionary with this chunk's response
-                response = llm_adapter.get_non_streaming_response(payload)
+                response = get_fresh_response(payload)
                 message_content = response.choices[0].message.content
                 print('stanley', message_content)
                 
@@ -637,16 +562,7 @@ async def amendment_analysis(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
 
-        if os.path.exists(f'./cached_pdfs/{assets.filename}.pkl'):
-            print('Found the PDF analysis << --')
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'rb') as file:
-                chunks = pickle.load(file)
-        else:
-            chunker = PDFChunker(overlap_percentage=0.2)
-            # Process the PDF from bytes
-            chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-            with open(f'./cached_pdfs/{assets.filename}.pkl', 'wb') as file:
-                pickle.dump(chunks, file)
+        chunks = await load_or_process_pdf(assets.filename or "", assets)
         
         data = "Given below is the data of a Amendment file of a particular Lease\n"
         for i, chunk in enumerate(chunks):
@@ -689,7 +605,7 @@ async def amendment_analysis(
             }
         ]
         
-        response = llm_adapter.get_non_streaming_response(payload)
+        response = get_fresh_response(payload)
         message_content = response.choices[0].message.content
         
 
@@ -1,7 +1,7 @@
-import base64
 import re
 import json 
 import os 
+import time
 from http import HTTPStatus
 from fastapi import (
     APIRouter,
@@ -11,8 +11,9 @@ from fastapi import (
 from dotenv import load_dotenv
 from fastapi.responses import JSONResponse
 from utils.logs import logger
-from utils.helpers import get_llm_adapter
-from utils.parsers.pdf import PDFChunker
+from utils.helpers import get_llm_adapter, get_ocr_adapter, get_pdf_response, prepare_pdf_input
+from utils.parsers.page_store import get_page_store
+from utils.parsers.service import get_parsing_service
 from utils.prompts import LEASE_ANALYSIS
 # from utils.prompts import AMENDMENT_ANALYSIS
 from utils.references import leaseInformation
@@ -20,6 +21,7 @@ load_dotenv()
 router = APIRouter()
 
 llm_adapter = get_llm_adapter()
+parsing_service = get_parsing_service()
 
 @router.post("")
 async def get_lease_abstraction(
@@ -31,18 +33,20 @@ async def get_lease_abstraction(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
         
-        chunker = PDFChunker(overlap_percentage=0.2)
-        
-        # Process the PDF from bytes
-        chunks = chunker.process_pdf(await assets.read(), extract_tables=True)
-        
-        # Convert chunks to JSON-serializable format
+        # Stream chunks from the parsing service, straight from the uploaded file, so the first pages
+        # reach the model while later ones parse. Short pages are merged into token-budget chunks, and
+        # pages already seen in an earlier upload of the lease are reused from the page store.
         chunks_data = []
         lease = {}
-        for chunk in chunks:
+        # Built once so every chunk's call starts with the same bytes, served from the provider's prompt cache
+        system_prompt = LEASE_ANALYSIS['system'].format(reference = leaseInformation.field_description, JSON_STRUCTURE = leaseInformation.structure)  # will be filled by Ashruth 
+        async for chunk in parsing_service.aiter_chunks(assets, extract_tables=True, overlap_percentage=0.2,
+                                                        chunking="tokens", ocr_engine=get_ocr_adapter(),
+                                                        page_store=get_page_store()):
             chunks_data.append({
                 "chunk_id": chunk.chunk_id,
                 "page_number": chunk.page_number,
+                "page_numbers": chunk.page_numbers,
                 "text": chunk.original_page_text,
                 "previous_overlap": chunk.previous_overlap,
                 "next_overlap": chunk.next_overlap,
@@ -51,13 +55,13 @@ async def get_lease_abstraction(
             print(chunk)
             payload = [
                 {
-                    "role": "system", "content": LEASE_ANALYSIS['system'].format(reference = leaseInformation.field_description, JSON_STRUCTURE = leaseInformation.structure)  # will be filled by Ashruth 
+                    "role": "system", "content": system_prompt
                 },
                 {
                     "role": "user", "content": f"""
                                         Here is the page content from where you have to extract details 
                                         
-                                        Page number : {chunk.page_number},
+                                        Page number(s) : {", ".join(str(page) for page in chunk.page_numbers)},
                                         text : {chunk.original_page_text}
                                         previous overlap : {chunk.previous_overlap}
                                         next overlap : {chunk.next_overlap}
@@ -168,37 +172,38 @@ async def amendment_analysis(
                 input_json = raw_text
         except Exception:
             input_json = None
-        # Read amendment file and create base64 for the payload
-        data = await amendment.read()
-        base64_string = base64.b64encode(data).decode("utf-8")
+        # Slim the amendment file and upload it once; repeated analyses reference the upload
         amendment_filename = amendment.filename or "amendment.pdf"
+        pdf_payload = await prepare_pdf_input(amendment, amendment_filename)
 
         # Load schema for amendment analysis as JSON_STRUCTURE
         with open("./utils/references/lease_abstraction.json") as file:
             original_lease_data_template = json.load(file)
 
-        payload = [
-            {"role": "system", "content": AMENDMENT_ANALYSIS['system'].format(INPUT_JSON = json.dumps(input_json), JSON_STRUCTURE = json.dumps(original_lease_data_template), DOCUMENT_NAME = amendment_filename)},
-            {
-                "role": "user", "content": 
-                [
-                    {
-                        "type": "input_file", 
-                        "filename": amendment_filename,
-                        "file_data": f"data:application/pdf;base64,{base64_string}"
-                    },
-                    {
-                        "type": "input_text", 
-                        "text": AMENDMENT_ANALYSIS['user']
-                    }
-                ]
-            }
-        ]
+        system_prompt = AMENDMENT_ANALYSIS['system'].format(INPUT_JSON = json.dumps(input_json), JSON_STRUCTURE = json.dumps(original_lease_data_template), DOCUMENT_NAME = amendment_filename)
+        # Rebuilt if the provider has lost the uploaded file and the PDF is uploaded again
+        def build_payload(pdf_payload):
+            return [
+                {"role": "system", "content": system_prompt},
+                {
+                    "role": "user", "content": 
+                    [
+                        pdf_payload.input_content(amendment_filename),
+                        {
+                            "type": "input_text", 
+                            "text": AMENDMENT_ANALYSIS['user']
+                        }
+                    ]
+                }
+            ]
         
-        print(payload[0]['content'])
+        print(system_prompt)
         print('i got here')
         print('streaming start')
-        response = llm_adapter.get_non_streaming_response(payload)
+        request_started = time.perf_counter()
+        pdf_payload, response = await get_pdf_response(amendment, pdf_payload, build_payload, amendment_filename)
+        logger.info(f"LLM request with {pdf_payload.mode} payload ({pdf_payload.payload_bytes} bytes, "
+                    f"{pdf_payload.bytes_saved} saved) took {time.perf_counter() - request_started:.2f}s")
         full_text_response = response.output_text
         # for event in response:
         #     if event.type == "response.output_text.delta":
@@ -1,6 +1,6 @@
-import base64
 import json 
 import os 
+import time
 from http import HTTPStatus
 from fastapi import (
     APIRouter,
@@ -11,13 +11,11 @@ from fastapi import (
 from dotenv import load_dotenv
 from fastapi.responses import JSONResponse
 from utils.logs import logger
-from utils.helpers import get_llm_adapter
+from utils.helpers import get_pdf_response, prepare_pdf_input
 from utils.prompts import LEASE_ANALYSIS
 load_dotenv()
 router = APIRouter()
 
-llm_adapter = get_llm_adapter()
-
 @router.post("")
 async def get_minimum_lease_terms(
     background_task: BackgroundTasks,
@@ -28,31 +26,33 @@ async def get_minimum_lease_terms(
             return JSONResponse(
                 content={"error": {"asset": "is invalid"}}, status_code=HTTPStatus.BAD_REQUEST.value
             )
-        data = await asset.read()
-        base64_string = base64.b64encode(data).decode("utf-8")
+        # Downsampled images, subset fonts and no dead objects, uploaded once and referenced by file id
+        pdf_payload = await prepare_pdf_input(asset, "draconomicon.pdf")
         
         with open("./utils/references/original_lease_data.json") as file:
             original_lease_data_template = json.load(file)
             
-        payload = [
-            {"role": "system", "content": LEASE_ANALYSIS['system'].format(JSON_STRUCTURE = json.dumps(original_lease_data_template))},
-            {
-                "role": "user", "content": 
-                [
-                    {
-                        "type": "input_file", 
-                        "filename": "draconomicon.pdf",
-                        "file_data": f"data:application/pdf;base64,{base64_string}"
-                    },
-                    {
-                        "type": "input_text", 
-                        "text": LEASE_ANALYSIS['user']
-                    }
-                ]
-            }
-        ]
-        print(payload[0]['content'])
-        response = llm_adapter.get_non_streaming_response(payload)
+        system_prompt = LEASE_ANALYSIS['system'].format(JSON_STRUCTURE = json.dumps(original_lease_data_template))
+        # Rebuilt if the provider has lost the uploaded file and the PDF is uploaded again
+        def build_payload(pdf_payload):
+            return [
+                {"role": "system", "content": system_prompt},
+                {
+                    "role": "user", "content": 
+                    [
+                        pdf_payload.input_content("draconomicon.pdf"),
+                        {
+                            "type": "input_text", 
+                            "text": LEASE_ANALYSIS['user']
+                        }
+                    ]
+                }
+            ]
+        print(system_prompt)
+        request_started = time.perf_counter()
+        pdf_payload, response = await get_pdf_response(asset, pdf_payload, build_payload, "draconomicon.pdf")
+        logger.info(f"LLM request with {pdf_payload.mode} payload ({pdf_payload.payload_bytes} bytes, "
+                    f"{pdf_payload.bytes_saved} saved) took {time.perf_counter() - request_started:.2f}s")
         
         background_task.add_task(
             save_response_to_file, 
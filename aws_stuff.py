@@ -1,23 +1,20 @@
-import boto3
-
-def extract_paragraphs_from_pdf(pdf_path):
-    textract = boto3.client("textract", region_name = "us-east-1")
-
-    # Read file bytes
-    with open(pdf_path, "rb") as f:
-        pdf_bytes = f.read()
-
-    # Analyze document with layout to get paragraph blocks
-    response = textract.analyze_document(
-        Document={"Bytes": pdf_bytes},
-        FeatureTypes=["LAYOUT"]
-    )
-
-    # Extract paragraph blocks
-    paragraphs = []
-    for block in response["Blocks"]:
-        if block["BlockType"] == "PARAGRAPH":
-            paragraphs.append(block["Text"])
+import os
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+from utils.parsers.pdf import PARALLEL_MIN_PAGES, PDFChunker
+
+def extract_paragraphs_from_pdf(pdf_path, workers: Optional[int] = None):
+    # Paragraphs come from the PDF's own text layout, segmented locally and in parallel
+    # per page range, instead of a Textract LAYOUT call per document
+    if workers is None:
+        # One worker per PARALLEL_MIN_PAGES pages, up to the CPU count, so short documents
+        # are segmented serially instead of starting a process pool
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+        workers = max(1, min(os.cpu_count() or 1, page_count // PARALLEL_MIN_PAGES))
+    paragraphs = [text for _, text in PDFChunker(workers=workers).extract_paragraphs(pdf_path)]
 
     # Number and print them
     for i, paragraph in enumerate(paragraphs, start=1):
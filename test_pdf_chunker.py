@@ -0,0 +1,683 @@
+"""
+Tests for the PDFChunker parser using synthetic lease PDFs.
+"""
+import asyncio
+import io
+import json
+import os
+import pickle
+import tempfile
+
+import fitz
+import pytest
+from openai.types.responses import Response
+
+from adapters.files._local import _LocalFiles
+from adapters.files.cache import FILE_HANDLE_EXPIRY_MARGIN, FileHandleCache
+from adapters.llms._claude import AnthropicAdapter, ClaudeText
+from adapters.llms._openai import _OpenAI
+from adapters.llms.base import LargeLanguageModel, prompt_cache_key, prompt_cache_stats
+from adapters.llms.cache import CachedLLM, ResponseCache
+from adapters.ocr.base import OCREngine
+from utils.parsers import pdf as pdf_parser
+from utils.parsers.benchmark import make_synthetic_lease, make_synthetic_rent_schedule
+from utils.parsers.chunk_cache import ChunkCache, ChunkCacheService
+from utils.parsers.chunk_store import dumps_chunks, open_chunks
+from utils.parsers.page_store import PageStore
+from utils.parsers.payload import prepare_pdf_payload, request_with_pdf
+from utils.parsers.pdf import PDFChunk, PDFChunker, chunk_pages, chunk_table_budget, estimate_tokens, load_chunks
+from utils.parsers.service import ParsingService
+
+
+def test_tables_detected_once_per_page(monkeypatch):
+    """parse_pdf followed by get_table_info runs find_tables once per page"""
+    pdf_bytes = make_synthetic_lease(pages=6, table_every=2)
+    calls = []
+    original_find_tables = fitz.Page.find_tables
+
+    def counting_find_tables(page, *args, **kwargs):
+        calls.append(page.number)
+        return original_find_tables(page, *args, **kwargs)
+
+    monkeypatch.setattr(fitz.Page, "find_tables", counting_find_tables)
+
+    chunker = PDFChunker(table_detection="always")
+    pages_data = chunker.parse_pdf(pdf_bytes, extract_tables=True)
+    table_info = chunker.get_table_info(pdf_bytes)
+
+    assert sorted(calls) == list(range(6))
+    assert table_info == {1: 1, 2: 0, 3: 1, 4: 0, 5: 1, 6: 0}
+    assert "TABLE 1:" in pages_data[0][1]
+    assert "TABLE 1:" not in pages_data[1][1]
+
+
+def test_parallel_parse_matches_serial():
+    """Page ranges parsed in worker processes reconcile to the serial output"""
+    pdf_bytes = make_synthetic_lease(pages=9, table_every=2)
+
+    serial = PDFChunker().parse_pdf(pdf_bytes, extract_tables=True)
+    parallel = PDFChunker(workers=3, parallel_min_pages=1).parse_pdf(pdf_bytes, extract_tables=True)
+
+    assert parallel == serial
+
+
+def test_streamed_chunks_match_process_pdf():
+    """iter_chunks and aiter_chunks yield the same chunks as process_pdf"""
+    pdf_bytes = make_synthetic_lease(pages=5, table_every=2)
+
+    async def collect():
+        return [chunk async for chunk in PDFChunker().aiter_chunks(pdf_bytes)]
+
+    expected = PDFChunker().process_pdf(pdf_bytes)
+    assert list(PDFChunker().iter_chunks(pdf_bytes)) == expected
+    assert asyncio.run(collect()) == expected
+
+
+def test_table_prefilter_skips_prose_pages():
+    """auto mode only runs find_tables on pages with ruling lines and finds the same tables"""
+    pdf_bytes = make_synthetic_lease(pages=6, table_every=3)
+
+    always = PDFChunker(table_detection="always")
+    auto = PDFChunker(table_detection="auto")
+
+    assert auto.parse_pdf(pdf_bytes) == always.parse_pdf(pdf_bytes)
+    assert auto.parse_stats == {'pages': 6, 'table_detection_pages': 2, 'table_detection_skipped': 4, 'ocr_pages': 0,
+                                'pages_reused': 0, 'table_budget_exceeded': 0}
+    assert always.parse_stats['table_detection_skipped'] == 0
+    assert always.parse_timings['find_tables_seconds'] > auto.parse_timings['find_tables_seconds'] > 0
+
+    never = PDFChunker(table_detection="never")
+    assert never.parse_pdf(pdf_bytes) == PDFChunker().parse_pdf(pdf_bytes, extract_tables=False)
+
+
+def test_parse_from_spooled_upload_file():
+    """Spooled upload files, memoryviews and paths parse the same as bytes"""
+    pdf_bytes = make_synthetic_lease(pages=3)
+    expected = PDFChunker().parse_pdf(pdf_bytes)
+
+    for max_size in (10, 10 * 1024 * 1024):  # rolled over to disk, and still in memory
+        spooled = tempfile.SpooledTemporaryFile(max_size=max_size)
+        spooled.write(pdf_bytes)
+        assert PDFChunker().parse_pdf(spooled) == expected
+        spooled.close()
+
+    assert PDFChunker().parse_pdf(memoryview(pdf_bytes)) == expected
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as fp:
+        fp.write(pdf_bytes)
+        fp.flush()
+        assert PDFChunker().parse_pdf(fp.name) == expected
+
+
+def test_compact_chunks_share_page_text():
+    """Chunks reference one page buffer and old pickled cache entries are upgraded on load"""
+    chunks = PDFChunker().create_chunks([(1, "a" * 100), (2, "b" * 50), (3, "c" * 10)])
+    assert len({id(chunk._document) for chunk in chunks}) == 1
+    assert chunks[1].previous_overlap == "a" * 20
+    assert chunks[1].next_overlap == "c" * 2
+    assert chunks[0].previous_overlap is None and chunks[2].next_overlap is None
+
+    # Pickled the way the old dataclass PDFChunk was: its fields as instance state
+    class _LegacyChunk:
+        def __init__(self, **fields):
+            self.fields = fields
+
+        def __reduce__(self):
+            return PDFChunk.__new__, (PDFChunk,), self.fields
+
+    pages = ["a" * 100, "b" * 50, "c" * 10]
+    raw = pickle.dumps([
+        _LegacyChunk(page_number=i + 1, chunk_id=i + 1, overlap_info={'has_previous': i > 0}, original_page_text=text,
+                     previous_overlap=pages[i - 1][-len(pages[i - 1]) // 5:] if i > 0 else None,
+                     next_overlap=pages[i + 1][:len(pages[i + 1]) // 5] if i < 2 else None)
+        for i, text in enumerate(pages)
+    ])
+    legacy = pickle.loads(raw)
+    assert len({id(chunk._document) for chunk in legacy}) == 3
+    upgraded = load_chunks(io.BytesIO(raw))
+
+    assert upgraded == legacy
+    assert len({id(chunk._document) for chunk in upgraded}) == 1
+    assert load_chunks(io.BytesIO(pickle.dumps(upgraded))) == upgraded
+
+
+def test_token_budget_chunks_keep_page_provenance():
+    """Token chunking merges short pages, splits long ones and keeps every page's text"""
+    pages = [(1, "Signature page.\n"), (2, "Witness.\n"), (3, "Rent schedule paragraph.\n\n" * 200), (4, "Exhibit B.\n")]
+    chunker = PDFChunker(chunking="tokens", max_chunk_tokens=500)
+    chunks = chunker.create_chunks(pages)
+
+    assert chunks[0].page_numbers[:2] == [1, 2]
+    assert len([chunk for chunk in chunks if 3 in chunk.page_numbers]) > 1
+    assert all(estimate_tokens(chunk.original_page_text) <= 500 for chunk in chunks)
+    assert chunk_pages(chunks) == pages
+    for chunk in chunks:
+        for span in chunk.overlap_info['spans']:
+            assert f"--- Page {span['page']} ---" in chunk.original_page_text[:span['start']]
+
+    pdf_bytes = make_synthetic_lease(pages=6)
+    assert list(chunker.iter_chunks(pdf_bytes)) == chunker.process_pdf(pdf_bytes)
+
+
+class _CountingOCR(OCREngine):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract_text(self, image):
+        self.calls += 1
+        return "Scanned amendment text"
+
+
+def test_ocr_only_runs_on_image_only_pages(tmp_path, monkeypatch):
+    """Scanned pages go through the OCR engine once; text pages and repeat parses skip it"""
+    monkeypatch.setattr(pdf_parser, "OCR_CACHE_DIR", str(tmp_path))
+    doc = fitz.open(stream=make_synthetic_lease(pages=2, table_every=0))
+    scan = doc.new_page()
+    scan.insert_image(scan.rect, pixmap=doc[0].get_pixmap(dpi=72))
+    pdf_bytes = doc.tobytes()
+
+    engine = _CountingOCR()
+    chunker = PDFChunker(ocr_engine=engine)
+    pages = chunker.parse_pdf(pdf_bytes)
+
+    assert pages[2] == (3, "Scanned amendment text")
+    assert pages[:2] == PDFChunker(ocr=False).parse_pdf(pdf_bytes)[:2]
+    assert chunker.parse_stats['ocr_pages'] == 1 and engine.calls == 1
+    # Without a configured engine OCR is off
+    assert PDFChunker().parse_pdf(pdf_bytes)[2] == (3, "")
+
+    PDFChunker(ocr_engine=engine).parse_pdf(pdf_bytes)
+    assert engine.calls == 1
+
+
+def test_parallel_workers_use_configured_ocr_engine(tmp_path, monkeypatch):
+    """Worker processes look pages up under the chunker's OCR engine, as serial parsing stores them"""
+    monkeypatch.setattr(pdf_parser, "OCR_CACHE_DIR", str(tmp_path / "ocr"))
+    pdf_bytes = make_synthetic_lease(pages=4, table_every=0)
+    store = PageStore(str(tmp_path / "pages"))
+
+    PDFChunker(ocr_engine=_CountingOCR(), page_store=store).parse_pdf(pdf_bytes)
+    chunker = PDFChunker(workers=2, parallel_min_pages=1, ocr_engine=_CountingOCR(), page_store=store)
+    chunker.parse_pdf(pdf_bytes)
+
+    assert chunker.parse_stats['pages_reused'] == 4
+
+
+def test_multi_page_table_stitched_on_origin_page():
+    """A rent schedule spanning pages is emitted once, merged, on its first page"""
+    pdf_bytes = make_synthetic_rent_schedule(pages=3, rows_per_page=20)
+    pages = PDFChunker().parse_pdf(pdf_bytes)
+
+    assert pages[0][1].count("TABLE 1:") == 1
+    assert "Month 52" in pages[0][1].split("TABLE 1:")[1]
+    assert pages[0][1].count("Period | Monthly Rent") == 1
+    assert "Month" not in pages[1][1] and "TABLE" not in pages[2][1]
+    assert "agree to the schedule above" in pages[2][1]
+    assert list(PDFChunker().iter_pages(pdf_bytes)) == pages
+    assert PDFChunker(workers=2, parallel_min_pages=1).parse_pdf(pdf_bytes) == pages
+
+
+def test_boilerplate_stripped_from_prompt_text():
+    """Running headers, page numbers and initials lines are stripped; source_text restores them"""
+    pdf_bytes = make_synthetic_lease(pages=6, running_headers=True)
+    originals = [text for _, text in PDFChunker(strip_boilerplate=False).parse_pdf(pdf_bytes)]
+
+    chunker = PDFChunker()
+    chunks = chunker.process_pdf(pdf_bytes)
+
+    assert chunker.boilerplate_report['lines_removed'] == 18
+    assert chunker.boilerplate_report['tokens_saved'] > 0
+    assert all("CONFIDENTIAL" not in chunk.original_page_text for chunk in chunks)
+    assert all("Initials" not in chunk.next_overlap for chunk in chunks[:-1])
+    assert [chunk.source_text for chunk in chunks] == originals
+    assert list(chunker.iter_chunks(pdf_bytes)) == chunks
+    assert [chunk.source_text for chunk in load_chunks(io.BytesIO(pickle.dumps(chunks)))] == originals
+
+
+def test_repeated_schedule_rows_are_not_boilerplate():
+    """Schedule rows and table cells in the margins are kept; only the page number footer is stripped"""
+    doc = fitz.open()
+    for page_index in range(8):
+        page = doc.new_page()
+        for row in range(6):
+            month = page_index * 6 + row + 1
+            page.insert_text((72, 28 + 11 * row), f"Month {month}    ${10000 + 250 * month:,.2f}", fontsize=9)
+        page.insert_text((72, 300), "The Base Rent schedule continues on the following page.", fontsize=10)
+        page.insert_text((72, page.rect.height - 40), f"Page {page_index + 1} of 8", fontsize=8)
+    chunker = PDFChunker()
+    chunks = chunker.process_pdf(doc.tobytes())
+
+    assert chunker.boilerplate_report['patterns'] == ["bottom: page # of #"]
+    assert chunker.boilerplate_report['lines_removed'] == 8
+    assert "Month 41    $20,250.00" in chunks[6].original_page_text
+
+    doc = fitz.open()
+    for page_index in range(6):
+        page = doc.new_page()
+        # The same ruled table in the top margin of every page
+        for row, (period, rent) in enumerate([("Period", "Monthly Rent"), ("Year 1", "$10,000.00")]):
+            page.insert_text((76, 41 + 16 * row), period, fontsize=9)
+            page.insert_text((206, 41 + 16 * row), rent, fontsize=9)
+        for y in (30, 46, 62):
+            page.draw_line((72, y), (332, y))
+        for x in (72, 202, 332):
+            page.draw_line((x, 30), (x, 62))
+        page.insert_text((72, 300), "Body text of the page.", fontsize=10)
+    chunker = PDFChunker()
+    chunker.process_pdf(doc.tobytes())
+
+    assert chunker.boilerplate_report['lines_removed'] == 0
+
+
+def test_revised_document_reuses_stored_pages(tmp_path):
+    """Only pages whose content changed are extracted again"""
+    original = make_synthetic_lease(pages=6, table_every=2)
+    doc = fitz.open(stream=original)
+    doc[3].insert_text((72, 700), "Amended: Base Rent increases by 3% annually.", fontsize=10)
+    revised = doc.tobytes()
+
+    store = PageStore(str(tmp_path))
+    PDFChunker(page_store=store).parse_pdf(original)
+    chunker = PDFChunker(page_store=store)
+    pages = chunker.parse_pdf(revised)
+
+    assert chunker.parse_stats['pages_reused'] == 5
+    assert pages == PDFChunker().parse_pdf(revised)
+    assert "Amended: Base Rent" in pages[3][1]
+    assert list(PDFChunker(page_store=store).iter_pages(revised)) == pages
+
+    # Pages are stored without pickle, and evicted least recently used first beyond max_bytes
+    entries = list(tmp_path.iterdir())
+    assert len(entries) == 7 and all(path.suffix == ".page" for path in entries)
+    os.utime(entries[0], (1, 1))
+    assert PageStore(str(tmp_path), max_bytes=sum(path.stat().st_size for path in entries[1:])).evict() == [entries[0].stem]
+
+
+def test_pages_drawn_through_form_xobjects_hash_their_content(tmp_path):
+    """Pages whose text sits in a form XObject are only reused when the form's content matches"""
+    def stamped(amount):
+        template = fitz.open()
+        template.new_page().insert_text((72, 100), f"Base Rent: {amount} per month", fontsize=12)
+        doc = fitz.open()
+        page = doc.new_page()
+        page.show_pdf_page(page.rect, template, 0)
+        return doc.tobytes()
+
+    store = PageStore(str(tmp_path))
+    PDFChunker(page_store=store).parse_pdf(stamped("$10,000"))
+    chunker = PDFChunker(page_store=store)
+    pages = chunker.parse_pdf(stamped("$99,999"))
+
+    assert chunker.parse_stats['pages_reused'] == 0
+    assert "$99,999" in pages[0][1]
+    chunker = PDFChunker(page_store=store)
+    assert chunker.parse_pdf(stamped("$99,999")) == pages and chunker.parse_stats['pages_reused'] == 1
+
+    # Deep and cyclic object graphs are walked without recursion, and pages sharing objects
+    # hash the same with the document's memo as on their own
+    doc = fitz.open(stream=stamped("$99,999"))
+    doc.insert_pdf(fitz.open(stream=stamped("$99,999")))
+    chain = [doc.get_new_xref() for _ in range(3000)]
+    for xref, following in zip(chain, chain[1:] + chain[:1]):
+        doc.update_object(xref, f"<< /Next {following} 0 R >>")
+    kind, resources = doc.xref_get_key(doc[0].xref, "Resources")
+    assert kind == "xref"
+    doc.xref_set_key(int(resources.split()[0]), "Chain", f"{chain[0]} 0 R")
+    memo = {}
+    hashes = [PDFChunker()._page_hash(doc, page, memo) for page in doc]
+    assert hashes == [PDFChunker()._page_hash(doc, page) for page in doc] and hashes[0] != hashes[1]
+
+
+def test_parsing_service_keeps_event_loop_responsive():
+    """Parsing runs on the service's executor while the event loop keeps ticking"""
+    pdf_bytes = make_synthetic_lease(pages=12, table_every=1)
+    service = ParsingService(workers=1)
+
+    async def run():
+        ticks = 0
+        parse = asyncio.ensure_future(service.process_pdf(pdf_bytes))
+        await asyncio.sleep(0)
+        in_flight = service.stats()['in_flight']
+        while not parse.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        return ticks, in_flight, await parse
+
+    ticks, in_flight, chunks = asyncio.run(run())
+    assert ticks > 5 and in_flight == 1
+    assert chunks == PDFChunker().process_pdf(pdf_bytes)
+    assert service.stats() == {'executor': 'thread', 'workers': 1, 'in_flight': 0, 'queued': 0,
+                               'completed': 1, 'failed': 0}
+
+
+def test_table_formats_and_token_costs():
+    """Compact table formats cost fewer tokens than the legacy banners and keep every cell"""
+    pdf_bytes = make_synthetic_lease(pages=3, table_every=1)
+    costs = PDFChunker().table_format_costs(pdf_bytes)
+    assert costs['tsv'] < costs['markdown'] < costs['legacy']
+
+    rows = [["Period", "Rent"], ["Year 1", None], ["Year 2", "$1 | $2"]]
+    chunker = PDFChunker()
+    assert chunker._format_table(rows, 1) == "TABLE 1:\n| Period | Rent |\n|---|---|\n| Year 1 |  |\n| Year 2 | $1 \\| $2 |"
+    assert chunker._format_table(rows, 1, "tsv") == "TABLE 1 (TSV):\nPeriod\tRent\nYear 1\t\nYear 2\t$1 | $2"
+    assert chunker._format_table(rows, 1, "json") == 'TABLE 1 (JSON):\n{"columns":["Period","Rent"],"rows":[["Year 1",""],["Year 2","$1 | $2"]]}'
+    assert "Row 1:" in PDFChunker(table_format="legacy").parse_pdf(pdf_bytes)[0][1]
+
+
+def test_table_detection_time_budgets(monkeypatch):
+    """Pages predicted to blow the table budget keep their plain text and are flagged on their chunks"""
+    # Predictions scaled up with the budget, so a loaded machine cannot push the regular
+    # table page over its real-time budget while the hatched page is still predicted over it
+    monkeypatch.setattr(pdf_parser, "TABLE_SECONDS_PER_DRAWING_ITEM", pdf_parser.TABLE_SECONDS_PER_DRAWING_ITEM * 10)
+    doc = fitz.open(stream=make_synthetic_lease(pages=2, table_every=1))
+    doc[1].insert_text((72, 700), "Site plan hatching follows.", fontsize=10)
+    shape = doc[1].new_shape()
+    for i in range(4000):
+        shape.draw_line((20 + i % 500, 20), (21 + i % 500, 30 + i // 500))
+    shape.finish()
+    shape.commit()
+    pdf_bytes = doc.tobytes()
+
+    chunker = PDFChunker(page_time_budget=5.0)
+    chunks = chunker.process_pdf(pdf_bytes)
+    assert chunker.table_budget_pages == {2: "page_drawings"}
+    assert "TABLE 1:" in chunks[0].original_page_text and "TABLE" not in chunks[1].original_page_text
+    assert chunks[1].overlap_info['table_budget_exceeded'] == {2: "page_drawings"}
+    assert 'table_budget_exceeded' not in chunks[0].overlap_info
+    assert list(chunker.iter_chunks(pdf_bytes)) == chunks
+
+    unbounded = PDFChunker(page_time_budget=None)
+    unbounded.parse_pdf(pdf_bytes)
+    assert unbounded.table_budget_pages == {} and unbounded.parse_stats['table_detection_pages'] == 2
+    exhausted = PDFChunker(document_time_budget=0)
+    assert exhausted.parse_pdf(pdf_bytes) == PDFChunker(table_detection="never").parse_pdf(pdf_bytes)
+    assert exhausted.table_budget_pages == {1: "document_time", 2: "document_time"}
+
+
+def test_preflight_reports_without_parsing(tmp_path):
+    """Preflight samples pages for text, tables and scans, and flags encrypted or broken files"""
+    pdf_bytes = make_synthetic_lease(pages=12, table_every=2)
+    report = PDFChunker().preflight(pdf_bytes, sample_pages=4)
+    assert report['pages'] == 12 and report['sampled_pages'] == [1, 5, 8, 12]
+    assert report['table_likelihood'] == 0.5 and report['scanned_ratio'] == 0.0
+    parsed_tokens = sum(estimate_tokens(text) for _, text in PDFChunker().parse_pdf(pdf_bytes))
+    assert 0.7 < report['estimated_tokens'] / parsed_tokens < 1.3
+    assert report['problems'] == []
+
+    encrypted = str(tmp_path / "encrypted.pdf")
+    fitz.open(stream=pdf_bytes).save(encrypted, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw="tenant", owner_pw="owner")
+    assert PDFChunker().preflight(encrypted)['problems'] == ["encrypted"]
+    assert PDFChunker().preflight(b"not a pdf")['readable'] is False
+
+
+def test_paragraph_segmentation_from_layout():
+    """Paragraphs are split on gaps, indents and headings, and token chunks break between them"""
+    doc = fitz.open()
+    body = ("ARTICLE 4. RENT\n\n    4.1 Tenant shall pay Base Rent monthly in advance on the first day of each month "
+            "during the Term without notice, demand, deduction or set-off.\n    4.2 Additional Rent includes "
+            "Tenant's Share of Operating Expenses and Taxes, payable as estimated by Landlord.\n\n")
+    for _ in range(2):
+        doc.new_page().insert_textbox(fitz.Rect(72, 72, 540, 700), body * 3, fontsize=10)
+    pdf_bytes = doc.tobytes()
+
+    paragraphs = PDFChunker().extract_paragraphs(pdf_bytes)
+    assert len(paragraphs) == 18 and paragraphs[0] == (1, "ARTICLE 4. RENT")
+    assert paragraphs[1][1].startswith("4.1 Tenant") and paragraphs[1][1].endswith("set-off.")
+    assert PDFChunker(workers=2, parallel_min_pages=1).extract_paragraphs(pdf_bytes) == paragraphs
+
+    chunker = PDFChunker(paragraph_breaks=True, chunking="tokens", max_chunk_tokens=60)
+    plain = PDFChunker().parse_pdf(pdf_bytes)
+    assert [text.replace("\n\n", "\n") for _, text in chunker.parse_pdf(pdf_bytes)] == [text for _, text in plain]
+    for chunk in chunker.process_pdf(pdf_bytes):
+        text = chunk.original_page_text
+        assert all(text[:span['end']].endswith("\n\n") or span['end'] == len(text) for span in chunk.overlap_info['spans'])
+
+
+def test_slim_payload_downsamples_images_once():
+    """Slim payloads shrink print-resolution images once each and keep every page's text"""
+    pdf_bytes = make_synthetic_lease(pages=8, image_every=4)
+    payload = prepare_pdf_payload(pdf_bytes, "slim")
+    assert payload.mode == "slim" and payload.bytes_saved > 0.9 * len(pdf_bytes)
+
+    slim = fitz.open(stream=payload.data)
+    assert [page.get_text() for page in slim] == [page.get_text() for page in fitz.open(stream=pdf_bytes)]
+    assert {(image['width'], image['height']) for page in slim for image in page.get_image_info()} == {(312, 208)}
+    assert payload.input_content("lease.pdf")['file_data'].startswith("data:application/pdf;base64,")
+
+    text = prepare_pdf_payload(pdf_bytes, "text")
+    assert text.mode == "text" and text.input_content("lease.pdf")['text'].count("--- Page ") == 8
+    assert prepare_pdf_payload(make_synthetic_lease(pages=2), "slim").mode in ("slim", "pdf")
+
+
+def test_file_handles_upload_each_document_once(tmp_path):
+    """A document is uploaded once per mode and referenced by file id until its handle expires"""
+    files = _LocalFiles(str(tmp_path / "uploads"))
+    handles = FileHandleCache(files, directory=str(tmp_path / "handles"))
+    pdf_bytes = make_synthetic_lease(pages=4, image_every=2)
+
+    first = prepare_pdf_payload(pdf_bytes, "slim", handles, "lease.pdf")
+    assert first.mode == "slim" and files.get(first.file_id) == first.data
+    assert first.input_content("lease.pdf") == {"type": "input_file", "file_id": first.file_id}
+
+    # A fresh cache (another worker) reads the persisted index and skips preparing the PDF
+    again = prepare_pdf_payload(io.BytesIO(pdf_bytes), "slim", FileHandleCache(files, directory=str(tmp_path / "handles")))
+    assert (again.file_id, again.mode, again.payload_bytes) == (first.file_id, "slim", 0)
+    assert prepare_pdf_payload(pdf_bytes, "pdf", handles).file_id != first.file_id
+    assert files.uploads == 2
+
+    # Workers started before each other's uploads keep both handles
+    worker_a = FileHandleCache(files, directory=str(tmp_path / "shared"))
+    worker_b = FileHandleCache(files, directory=str(tmp_path / "shared"))
+    worker_a.upload("a", b"%PDF-a", "a.pdf")
+    worker_b.upload("b", b"%PDF-b", "b.pdf")
+    assert worker_a.lookup("b") is not None and worker_b.lookup("a") is not None
+
+    expiring = FileHandleCache(files, directory=str(tmp_path / "expiring"), ttl_seconds=FILE_HANDLE_EXPIRY_MARGIN)
+    prepare_pdf_payload(pdf_bytes, "slim", expiring)
+    assert prepare_pdf_payload(pdf_bytes, "slim", expiring).file_id is not None
+    assert expiring.stats == {'hits': 0, 'misses': 2, 'uploads': 2, 'expired': 1, 'invalidated': 0}
+
+    # A file the provider lost is forgotten, uploaded again and the request retried once
+    sent = []
+    def request(pdf_payload):
+        sent.append(pdf_payload.file_id)
+        if files.get(pdf_payload.file_id) is None:
+            raise FileNotFoundError(pdf_payload.file_id)
+        return "answer"
+    files.delete(first.file_id)
+    retried, answer = request_with_pdf(pdf_bytes, first, request, handles, "slim", "lease.pdf")
+    assert answer == "answer" and sent == [first.file_id, retried.file_id] and retried.file_id != first.file_id
+    assert handles.stats['invalidated'] == 1 and handles.lookup(first.handle_key)['file_id'] == retried.file_id
+
+
+def test_chunk_cache_is_content_addressed(tmp_path):
+    """Cache entries follow the PDF bytes and chunker settings, not the upload's filename"""
+    cache = ChunkCache(str(tmp_path))
+    pdf_bytes = make_synthetic_lease(pages=3)
+    key = ChunkCache.key(pdf_bytes, 0.2, True)
+    assert cache.get(key) is None
+
+    chunks = PDFChunker(overlap_percentage=0.2).process_pdf(pdf_bytes)
+    cache.put(key, chunks, "lease.pdf", 1.5)
+    # A renamed copy (here an upload-like file object) of the same bytes is a hit
+    assert [c.original_page_text for c in cache.get(ChunkCache.key(io.BytesIO(pdf_bytes), 0.2, True))] == [c.original_page_text for c in chunks]
+    assert ChunkCache.key(pdf_bytes, 0.1, True) != key and ChunkCache.key(pdf_bytes, 0.2, False) != key
+    assert ChunkCache.key(make_synthetic_lease(pages=4), 0.2, True) != key
+
+    metadata = cache.metadata(key)
+    assert (metadata['filename'], metadata['pages'], metadata['chunks'], metadata['parse_seconds']) == ("lease.pdf", 3, 3, 1.5)
+    assert metadata['entry_bytes'] == (tmp_path / f"{key}.chunks").stat().st_size
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".chunks", ".json"]
+
+
+def test_chunk_cache_service_tiers_and_eviction(tmp_path):
+    """Hot documents come from memory; both tiers stay within their byte bounds"""
+    documents = [make_synthetic_lease(pages=pages) for pages in (2, 3, 4)]
+    chunks = [PDFChunker().process_pdf(pdf_bytes) for pdf_bytes in documents]
+    entry_bytes = [len(dumps_chunks(document_chunks)) for document_chunks in chunks]
+
+    async def run():
+        # Memory holds the two newest documents, disk everything but the oldest
+        cache = ChunkCacheService(str(tmp_path), memory_bytes=entry_bytes[1] + entry_bytes[2],
+                                  disk_bytes=entry_bytes[1] + entry_bytes[2], max_age_seconds=None)
+        keys = [await cache.key(pdf_bytes, 0.2, True) for pdf_bytes in documents]
+        assert await cache.get(keys[0]) is None
+        for key, document_chunks in zip(keys, chunks):
+            await cache.put(key, document_chunks)
+
+        assert len(await cache.get(keys[2])) == 4
+        assert await cache.get(keys[0]) is None
+        assert cache.stats()['memory_entries'] == 2 and cache.stats()['memory_bytes'] <= cache.memory_bytes
+
+        # A new process starts with an empty memory tier and reads from disk once
+        restarted = ChunkCacheService(str(tmp_path), disk_bytes=None, max_age_seconds=None)
+        assert len(await restarted.get(keys[1])) == 3 and len(await restarted.get(keys[1])) == 3
+        # Chunks kept in memory hold no mapping of the file, which eviction may remove
+        remembered = restarted._memory[keys[1]][0]
+        assert isinstance(remembered[0]._document.pages._buffer, bytes)
+
+        stale = ChunkCacheService(str(tmp_path), memory_bytes=0, max_age_seconds=0)
+        await stale.put(keys[0], chunks[0])
+        assert [p.name for p in tmp_path.iterdir()] == []
+        return cache.stats(), restarted.stats(), stale.stats()
+
+    stats, restarted_stats, stale_stats = asyncio.run(run())
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 0, 2)
+    assert (stats['memory_evictions'], stats['disk_evictions']) == (1, 1)
+    assert (restarted_stats['memory_hits'], restarted_stats['disk_hits']) == (1, 1)
+    assert stale_stats['disk_evictions'] == 3
+
+
+def test_chunk_store_round_trip_and_migration(tmp_path):
+    """Store files load without pickle to equal chunks, and old pickle entries are converted or dropped"""
+    chunker = PDFChunker(overlap_percentage=0.2, chunking="tokens", max_chunk_tokens=300)
+    chunks = chunker.create_chunks([(1, "Rent é " * 200), (2, "b" * 50), (3, "c" * 900)], table_budget={2: "page_time"})
+    path = tmp_path / "entry.chunks"
+    path.write_bytes(dumps_chunks(chunks))
+    loaded = open_chunks(str(path))
+    assert loaded == chunks and chunk_table_budget(loaded) == {2: "page_time"}
+    assert load_chunks(io.BytesIO(pickle.dumps(loaded))) == chunks
+
+    path.write_bytes(b"not a chunk store file")
+    with pytest.raises(ValueError):
+        open_chunks(str(path))
+    path.unlink()
+
+    # A content-addressed pickle entry keeps its key; a filename-keyed one records no parser
+    # version, so it is dropped rather than served as the current parser's output
+    pdf_path = tmp_path / "lease.pdf"
+    pdf_path.write_bytes(make_synthetic_lease(pages=2))
+    legacy = PDFChunker(overlap_percentage=0.2).process_pdf(str(pdf_path))
+    cache_dir = tmp_path / "cache"
+    cache = ChunkCache(str(cache_dir))
+    key = ChunkCache.key(str(pdf_path), 0.2, True)
+    cache.put(key, legacy, "lease.pdf", 1.5)
+    os.remove(cache._path(key))
+    (cache_dir / f"{key}.pkl").write_bytes(pickle.dumps(legacy))
+    (cache_dir / "lease.pdf.pkl").write_bytes(pickle.dumps(legacy))
+
+    report = cache.migrate_pickles()
+    assert report == {'converted': [f"{key}.pkl"], 'dropped': ["lease.pdf.pkl"], 'failed': []}
+    assert cache.get(key) == legacy and cache.metadata(key)['filename'] == "lease.pdf"
+    assert not list(cache_dir.glob("*.pkl"))
+
+
+class _EchoLLM(LargeLanguageModel):
+    def __init__(self):
+        self.calls = 0
+        self.temperature = 0
+
+    def get_streaming_response(self, payload):
+        raise NotImplementedError
+
+    def get_non_streaming_response(self, payload):
+        self.calls += 1
+        return {"text": payload[-1]["content"].upper(), "complete": "truncate" not in payload[-1]["content"]}
+
+    def cache_identity(self):
+        return {"provider": "echo", "model": "echo-1", "params": {"temperature": self.temperature}}
+
+    def is_cacheable_response(self, response):
+        return response["complete"]
+
+    def serialize_response(self, response):
+        return json.dumps(response)
+
+    def deserialize_response(self, data):
+        return json.loads(data)
+
+
+def test_llm_responses_cached_per_call(tmp_path, monkeypatch):
+    """Identical calls are answered from disk; parameters, opt-out, truncation and TTL force a provider call"""
+    echo = _EchoLLM()
+    llm = CachedLLM(echo, ResponseCache(str(tmp_path)))
+    payload = [{"role": "user", "content": "abstract this lease"}]
+
+    assert llm.get_non_streaming_response(payload) == {"text": "ABSTRACT THIS LEASE", "complete": True}
+    assert llm.get_non_streaming_response(payload)["text"] == "ABSTRACT THIS LEASE" and echo.calls == 1
+    assert llm.get_non_streaming_response(payload, cache=False) and echo.calls == 2
+    echo.temperature = 0.7
+    llm.get_non_streaming_response(payload)
+    truncated = [{"role": "user", "content": "truncate"}]
+    llm.get_non_streaming_response(truncated)
+    llm.get_non_streaming_response(truncated)
+    assert echo.calls == 5
+    stats = llm.cache.stats()
+    assert (stats['hits'], stats['misses'], stats['bypassed'], stats['stores'], stats['hit_rate']) == (1, 4, 1, 2, 0.2)
+
+    # Expired entries are dropped; the byte bound keeps only the most recently used
+    expired = CachedLLM(echo, ResponseCache(str(tmp_path), ttl_seconds=0))
+    expired.get_non_streaming_response(payload)
+    assert echo.calls == 6 and expired.cache.stats()['expired'] == 1
+    bounded = ResponseCache(str(tmp_path), max_bytes=1)
+    bounded.put("latest", "{}", 0.1)
+    assert [p.name for p in tmp_path.iterdir()] == [] and bounded.stats()['evictions'] == 3
+
+    # Claude responses are reused only when the model ended its turn; adapters without a
+    # completion check are never cached
+    claude = AnthropicAdapter.__new__(AnthropicAdapter)
+    truncated = ClaudeText("{\"rent\": ")
+    truncated.stop_reason = "max_tokens"
+    assert not claude.is_cacheable_response(truncated)
+    assert claude.is_cacheable_response(claude.deserialize_response(claude.serialize_response(ClaudeText("{}"))))
+    assert not LargeLanguageModel.is_cacheable_response(echo, {"complete": True})
+
+    # Sampled calls (no temperature pinned to 0) are never answered from the cache
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    assert _OpenAI().cache_identity() is None
+
+
+def test_prompt_prefix_caching_requests_and_usage(monkeypatch):
+    """Calls sharing a system prompt share a prompt cache key and breakpoint; cached tokens are reported"""
+    system = {"role": "system", "content": "Extract the lease fields as JSON."}
+    first = [system, {"role": "user", "content": "Page 1"}]
+    second = [system, {"role": "user", "content": "Page 2"}]
+    assert prompt_cache_key(first) == prompt_cache_key(second)
+    assert prompt_cache_key(first) != prompt_cache_key([{"role": "system", "content": "Other"}, first[1]])
+
+    sent = []
+
+    class _Responses:
+        def create(self, **request):
+            sent.append(request)
+            return Response.model_validate({
+                "id": "resp_1", "object": "response", "created_at": 1, "model": "gpt-5-nano", "status": "completed",
+                "output": [], "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+                "usage": {"input_tokens": 2000, "output_tokens": 10, "total_tokens": 2010,
+                          "input_tokens_details": {"cached_tokens": 1536}, "output_tokens_details": {"reasoning_tokens": 0}},
+            })
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    llm = _OpenAI()
+    monkeypatch.setattr(llm.client, "responses", _Responses())
+    before = prompt_cache_stats()
+    llm.get_non_streaming_response(first)
+    assert sent[0]["prompt_cache_key"] == prompt_cache_key(second) and sent[0]["input"][0] == system
+    after = prompt_cache_stats()
+    assert (after['input_tokens'] - before['input_tokens'], after['cached_input_tokens'] - before['cached_input_tokens']) == (2000, 1536)
+
+    system_prompt, messages = AnthropicAdapter._split_payload(first)
+    assert messages == [first[1]]
+    assert AnthropicAdapter._cached_system(system_prompt) == [
+        {"type": "text", "text": system["content"], "cache_control": {"type": "ephemeral"}}]
@@ -10,6 +10,17 @@ CORS_CONFIG = {
     "allow_headers": ["*"],
 }
 
+# Documents are rejected before parsing when their preflight report exceeds these limits
+PREFLIGHT_LIMITS = {
+    "max_pages": 1000,
+    "max_estimated_tokens": 1_000_000,
+    "max_estimated_parse_seconds": 600,
+}
+
+# How PDFs sent to the model as input_file are prepared: "pdf", "slim" or "text"
+# (see utils/parsers/payload.PAYLOAD_MODES)
+PDF_PAYLOAD_MODE = "slim"
+
 class AnalysisType(str, Enum):
     INFO = "info"
     SPACE = "space"
@@ -3,21 +3,30 @@ import asyncio
 import os 
 import json
 import shutil
-from typing import Any, Dict, List
+import time
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 import json 
-import pickle 
 from typing import Dict, Any, List
 from adapters.database._local import _Local
 from adapters.database.base import Database
+from adapters.files.cache import FILE_HANDLE_TTL_SECONDS, FileHandleCache
 from adapters.llms._claude import AnthropicAdapter
 from adapters.llms._groq import _Groq
 from adapters.llms._openai import _OpenAI
 from adapters.llms._perplexity import _Perplexity
 from adapters.llms.base import LargeLanguageModel
+from adapters.llms.cache import CachedLLM, get_response_cache
+from adapters.ocr._tesseract import _Tesseract
+from adapters.ocr.base import OCREngine
 from dotenv import load_dotenv
 
-from utils.constants import ANALYSIS_CONFIG, AnalysisType
-from utils.parsers.pdf import PDFChunker
+from utils.constants import ANALYSIS_CONFIG, PDF_PAYLOAD_MODE, PREFLIGHT_LIMITS, AnalysisType
+from utils.parsers.chunk_cache import get_chunk_cache
+from utils.parsers.page_store import get_page_store
+from utils.parsers.payload import PDFPayload, prepare_pdf_payload, request_with_pdf
+from utils.parsers.pdf import PDFChunker, PDFSource, chunk_pages, chunk_table_budget
+from utils.parsers.service import get_parsing_service
 from utils.references import audit 
 
 load_dotenv()
@@ -25,16 +34,42 @@ def get_llm_adapter() -> LargeLanguageModel:
     llm_details = json.loads(str(os.environ.get('LLM')))
     print(llm_details, ' --=>>>>> <<<<==== ---')
     if llm_details['provider'] == "openai":
-        return _OpenAI()
+        llm = _OpenAI()
     elif llm_details['provider'] == "groq":
-        return _Groq()
+        llm = _Groq()
     elif llm_details['provider'] == "claude":
-        return AnthropicAdapter()
+        llm = AnthropicAdapter()
     else:
-        return _Perplexity()
+        llm = _Perplexity()
+    # Identical non-streaming calls are answered from the shared response cache unless LLM_CACHE disables it
+    response_cache = get_response_cache()
+    return CachedLLM(llm, response_cache) if response_cache is not None else llm
+
+
+def get_fresh_response(payload: List[dict]) -> Any:
+    """Call the provider even when an identical call is cached, for endpoints that re-run an analysis to get a new answer"""
+    if isinstance(llm_adapter, CachedLLM):
+        return llm_adapter.get_non_streaming_response(payload, cache=False)
+    return llm_adapter.get_non_streaming_response(payload)
+
+
+def get_file_handle_cache() -> Optional[FileHandleCache]:
+    # FILES is optional configuration; without it documents are uploaded to the LLM provider
+    # when it has a file service. "none" always sends documents inline.
+    provider_config: dict = json.loads(os.environ.get('FILES') or '{"provider": "llm"}')
+    if provider_config['provider'] == "none":
+        return None
+    # Only the LLM provider's own file service issues ids its requests can reference
+    file_service = llm_adapter.get_file_service()
+    if file_service is None:
+        return None
+    return FileHandleCache(file_service, ttl_seconds=provider_config.get('ttl_seconds', FILE_HANDLE_TTL_SECONDS))
 
 
 llm_adapter = get_llm_adapter()
+file_handles = get_file_handle_cache()
+parsing_service = get_parsing_service()
+chunk_cache = get_chunk_cache()
 def build_chunk_data(chunks: List) -> str:
     """Convert chunks to formatted string data"""
     data = "Given below is the data of a Lease PDF\n"
@@ -68,26 +103,107 @@ def get_db_adapter() -> Database:
         return _Local()
     return _Local()
 
-async def load_or_process_pdf(filename: str, file_content: bytes) -> List:
-    """Load cached PDF chunks or process new PDF"""
-    cache_path = f'./cached_pdfs/{filename}.pkl'
-    
-    if os.path.exists(cache_path):
-        print(f'Found cached PDF analysis for {filename}')
-        with open(cache_path, 'rb') as f:
-            return pickle.load(f)
+def get_ocr_adapter() -> Optional[OCREngine]:
+    # OCR is opt-in: image-only pages are only OCR'd when the OCR env var names an engine
+    if not os.environ.get('OCR'):
+        return None
+    provider_config: dict = json.loads(str(os.environ.get('OCR')))
+    if provider_config['provider'] == "tesseract":
+        return _Tesseract(language=provider_config.get('language', 'eng'))
+    return _Tesseract()
+
+def ocr_status() -> Optional[Dict[str, Any]]:
+    """Return the configured OCR engine and whether it can run, or None when OCR is off"""
+    engine = get_ocr_adapter()
+    if engine is None:
+        return None
+    return {"engine": engine.name, "available": engine.available()}
+
+def preflight_rejection(report: Dict[str, Any]) -> Optional[Tuple[HTTPStatus, str]]:
+    """Return the status and reason to reject a document with, given its preflight report, or None to accept it"""
+    if not report['readable']:
+        return HTTPStatus.UNPROCESSABLE_ENTITY, "PDF could not be read"
+    if report['encrypted']:
+        return HTTPStatus.UNPROCESSABLE_ENTITY, "PDF is password protected"
+    if report['pages'] == 0:
+        return HTTPStatus.UNPROCESSABLE_ENTITY, "PDF has no pages"
+    if report['pages'] > PREFLIGHT_LIMITS['max_pages']:
+        return (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"PDF has {report['pages']} pages, the limit is {PREFLIGHT_LIMITS['max_pages']}")
+    if report['estimated_tokens'] > PREFLIGHT_LIMITS['max_estimated_tokens']:
+        return (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"PDF has ~{report['estimated_tokens']} tokens, the limit is {PREFLIGHT_LIMITS['max_estimated_tokens']}")
+    if report['estimated_parse_seconds'] > PREFLIGHT_LIMITS['max_estimated_parse_seconds']:
+        return (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"PDF would take ~{round(report['estimated_parse_seconds'])}s to parse, "
+                f"the limit is {PREFLIGHT_LIMITS['max_estimated_parse_seconds']}s")
+    return None
+
+async def prepare_pdf_input(pdf_source: PDFSource, filename: str, mode: str = PDF_PAYLOAD_MODE) -> PDFPayload:
+    """Slim a PDF (or render it as text) for an input_file request and upload it once to the provider, off the event loop"""
+    loop = asyncio.get_running_loop()
+    pdf_payload = await loop.run_in_executor(None, prepare_pdf_payload, pdf_source, mode, file_handles, filename)
+    print(f"PDF payload: {pdf_payload.report()}, file handles: {file_handles.stats if file_handles else None}")
+    return pdf_payload
+
+async def get_pdf_response(pdf_source: PDFSource, pdf_payload: PDFPayload, build_payload: Callable[[PDFPayload], Any],
+                           filename: str, mode: str = PDF_PAYLOAD_MODE) -> Tuple[PDFPayload, Any]:
+    """Send the request build_payload makes around a prepared PDF off the event loop, uploading the PDF again once if the provider lost its file"""
+    loop = asyncio.get_running_loop()
+    request = lambda payload: llm_adapter.get_non_streaming_response(build_payload(payload))
+    return await loop.run_in_executor(None, request_with_pdf, pdf_source, pdf_payload, request, file_handles, mode, filename)
+
+async def load_or_process_pdf(filename: str, pdf_source: PDFSource, overlap_percentage: float = 0.2,
+                              extract_tables: bool = True) -> List:
+    """Load cached PDF chunks or process new PDF, keyed by the PDF's content and the chunker settings"""
+    cache_key = await chunk_cache.key(pdf_source, overlap_percentage, extract_tables)
+    chunks = await chunk_cache.get(cache_key)
+    if chunks is not None:
+        print(f'Found cached PDF analysis for {filename}: {chunk_cache.stats()}')
+        return chunks
     
     print(f'Processing new PDF: {filename}')
-    chunker = PDFChunker(overlap_percentage=0.2)
-    chunks = chunker.process_pdf(file_content, extract_tables=True)
-    
-    # Cache the chunks
-    os.makedirs('./cached_pdfs', exist_ok=True)
-    with open(cache_path, 'wb') as f:
-        pickle.dump(chunks, f)
-    
+    started = time.perf_counter()
+    # Parse on the shared parsing service so the event loop keeps serving other requests
+    chunks = await parsing_service.process_pdf(pdf_source, extract_tables=extract_tables,
+                                               overlap_percentage=overlap_percentage,
+                                               ocr_engine=get_ocr_adapter(), page_store=get_page_store())
+    await chunk_cache.put(cache_key, chunks, filename, time.perf_counter() - started)
     return chunks        
 
+async def stream_or_load_pdf(filename: str, pdf_source: PDFSource, chunking: str = "page") -> AsyncIterator:
+    """Yield cached PDF chunks, or stream them while the PDF is parsed and cache them at the end.
+    
+    The cache always holds one chunk per page; with chunking="tokens" the chunks are
+    packed into token-budget chunks on the way out.
+    """
+    cache_key = await chunk_cache.key(pdf_source, 0.2, True)
+    chunks = await chunk_cache.get(cache_key)
+    if chunks is not None:
+        print(f'Found cached PDF analysis for {filename}: {chunk_cache.stats()}')
+        if chunking != "page" and chunks:
+            chunks = PDFChunker(overlap_percentage=0.2, chunking=chunking).create_chunks(
+                chunk_pages(chunks), chunks[0].boilerplate, chunk_table_budget(chunks)
+            )
+        for chunk in chunks:
+            yield chunk
+        return
+    
+    print(f'Streaming new PDF: {filename}')
+    started = time.perf_counter()
+    chunks = []
+    async for chunk in parsing_service.aiter_chunks(pdf_source, extract_tables=True, overlap_percentage=0.2,
+                                                    chunking=chunking, ocr_engine=get_ocr_adapter(),
+                                                    page_store=get_page_store()):
+        chunks.append(chunk)
+        yield chunk
+    
+    # Cache the chunks once the whole document has been parsed
+    if chunking != "page" and chunks:
+        chunks = PDFChunker(overlap_percentage=0.2).create_chunks(chunk_pages(chunks), chunks[0].boilerplate,
+                                                                  chunk_table_budget(chunks))
+    await chunk_cache.put(cache_key, chunks, filename, time.perf_counter() - started)
+
 async def perform_standard_analysis(
     analysis_type: AnalysisType,
     chunks: List
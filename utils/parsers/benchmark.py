@@ -0,0 +1,583 @@
+"""
+Throughput benchmarks for PDFChunker.
+
+Usage:
+    python -m utils.parsers.benchmark                  # synthetic lease
+    python -m utils.parsers.benchmark lease.pdf --json # real documents
+    python -m utils.parsers.benchmark --pdf-dir ./data --prefilter-recall
+    python -m utils.parsers.benchmark lease.pdf --intake
+    python -m utils.parsers.benchmark --suite --pdf-dir ./data --output bench.json
+    python -m utils.parsers.benchmark lease.pdf --table-formats
+    python -m utils.parsers.benchmark --page-extraction   # dense synthetic pages
+    python -m utils.parsers.benchmark lease.pdf --payload
+    python -m utils.parsers.benchmark lease.pdf --payload --payload-requests  # calls the OpenAI API
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import fitz  # PyMuPDF
+
+from utils.parsers.chunk_cache import CHUNK_CACHE_DIR, ChunkCache
+from utils.parsers.chunk_store import open_chunks
+from utils.parsers.payload import PAYLOAD_MODES, prepare_pdf_payload
+from utils.parsers.pdf import PDFChunker, chunk_pages, load_chunks
+
+
+# Asks for a short answer, so request timings are dominated by uploading and reading the document
+PAYLOAD_BENCHMARK_PROMPT = "Reply with the number of pages in this document and nothing else."
+
+
+def make_synthetic_lease(pages: int = 40, table_every: int = 3, rows: int = 12, cols: int = 4,
+                         running_headers: bool = False, image_every: int = 0) -> bytes:
+    """
+    Build a lease-like PDF with prose on every page and ruled tables on some pages.
+
+    Args:
+        pages (int): Number of pages to generate
+        table_every (int): Put a table on every n-th page (0 for no tables)
+        rows (int): Rows per table, header included
+        cols (int): Columns per table
+        running_headers (bool): Add a running header, a page number footer and an initials line
+        image_every (int): Put a print-resolution (600 dpi) site plan image on every n-th page (0 for none)
+
+    Returns:
+        bytes: The generated PDF
+    """
+    doc = fitz.open()
+    site_plan = None
+    if image_every:
+        site_plan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 2400, 1600), False)
+        site_plan.set_rect(site_plan.irect, (235, 230, 220))
+        for x in range(0, 2400, 120):
+            site_plan.set_rect(fitz.IRect(x, 0, x + 6, 1600), (90, 90, 90))
+    prose = (
+        "Tenant shall pay to Landlord, without notice or demand, Base Rent in monthly installments "
+        "in advance on the first day of each calendar month during the Term. "
+    )
+    for page_index in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 380), f"Section {page_index + 1}. " + prose * 6, fontsize=10)
+        if running_headers:
+            page.insert_text((72, 40), "ACME HOLDINGS LLC - OFFICE LEASE - CONFIDENTIAL", fontsize=8)
+            page.insert_text((72, page.rect.height - 50), f"Page {page_index + 1} of {pages}", fontsize=8)
+            page.insert_text((400, page.rect.height - 30), "Initials: ______ ______", fontsize=8)
+
+        if image_every and page_index % image_every == 0:
+            page.insert_image(fitz.Rect(72, 640, 472, 740), pixmap=site_plan)
+
+        if table_every and page_index % table_every == 0:
+            left, top, cell_w, cell_h = 72, 400, 468 / cols, 20
+            for r in range(rows + 1):
+                page.draw_line((left, top + r * cell_h), (left + cols * cell_w, top + r * cell_h))
+            for c in range(cols + 1):
+                page.draw_line((left + c * cell_w, top), (left + c * cell_w, top + rows * cell_h))
+            for r in range(rows):
+                for c in range(cols):
+                    label = f"Header {c + 1}" if r == 0 else f"${(r * 1000 + c):,}.00"
+                    page.insert_text((left + c * cell_w + 4, top + r * cell_h + 14), label, fontsize=9)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_synthetic_rent_schedule(pages: int = 3, rows_per_page: int = 20, cols: int = 4,
+                                 repeat_header: bool = True) -> bytes:
+    """
+    Build a PDF whose rent schedule table runs from the bottom of page 1 across every later page.
+
+    Args:
+        pages (int): Number of pages the table spans
+        rows_per_page (int): Data rows drawn on each continuation page
+        cols (int): Columns per table
+        repeat_header (bool): Repeat the header row at the top of each continuation page
+
+    Returns:
+        bytes: The generated PDF
+    """
+    doc = fitz.open()
+    header = ["Period", "Monthly Rent", "Annual Rent", "Rate PSF"][:cols] + [f"Col {c + 1}" for c in range(4, cols)]
+    row_number = 0
+    for page_index in range(pages):
+        page = doc.new_page()
+        if page_index == 0:
+            page.insert_textbox(fitz.Rect(72, 72, 520, 300), "EXHIBIT B - BASE RENT SCHEDULE. " * 12, fontsize=10)
+            top, data_rows = 500, 12
+        else:
+            top, data_rows = 60, rows_per_page
+        rows = ([header] if page_index == 0 or repeat_header else []) + [
+            [f"Month {row_number + r + 1}"] + [f"${(row_number + r) * 100 + c:,}.00" for c in range(1, cols)]
+            for r in range(data_rows)
+        ]
+        row_number += data_rows
+
+        left, cell_w, cell_h = 72, 450 / cols, 16
+        bottom = top + len(rows) * cell_h
+        for r in range(len(rows) + 1):
+            page.draw_line((left, top + r * cell_h), (left + cols * cell_w, top + r * cell_h))
+        for c in range(cols + 1):
+            page.draw_line((left + c * cell_w, top), (left + c * cell_w, bottom))
+        for r, row in enumerate(rows):
+            for c, label in enumerate(row):
+                page.insert_text((left + c * cell_w + 4, top + r * cell_h + 12), label, fontsize=9)
+        if page_index == pages - 1:
+            page.insert_text((72, bottom + 40), "Landlord and Tenant agree to the schedule above.", fontsize=10)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _two_pass_parse(chunker: PDFChunker, pdf_source: Union[str, bytes]) -> List:
+    """Replay the old parse cost: a discarded find_tables pass before the real parse."""
+    doc = chunker._open_document(pdf_source)
+    for page in doc:
+        page.find_tables()
+    doc.close()
+    return chunker.parse_pdf(pdf_source, extract_tables=True)
+
+
+def benchmark_table_detection(pdf_source: Union[str, bytes], repeat: int = 3) -> Dict[str, Any]:
+    """
+    Compare pages/sec of the old two-pass table detection, the single pass and the prefiltered pass.
+
+    Args:
+        pdf_source: File path or PDF bytes
+        repeat (int): Runs per mode; the best run is reported
+
+    Returns:
+        Dict[str, Any]: Page count and pages/sec per mode
+    """
+    page_count = len(PDFChunker().parse_pdf(pdf_source, extract_tables=False))
+    modes = {
+        'two_pass': lambda: _two_pass_parse(PDFChunker(table_detection="always"), pdf_source),
+        'single_pass': lambda: PDFChunker(table_detection="always").parse_pdf(pdf_source, extract_tables=True),
+        'prefiltered': lambda: PDFChunker(table_detection="auto").parse_pdf(pdf_source, extract_tables=True),
+    }
+
+    result: Dict[str, Any] = {'pages': page_count}
+    for mode, run in modes.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        result[mode] = {'seconds': round(best, 4), 'pages_per_sec': round(page_count / best, 2)}
+
+    result['speedup'] = round(result['two_pass']['seconds'] / result['single_pass']['seconds'], 2)
+    return result
+
+
+def benchmark_payload(pdf_source: Union[str, bytes], send: Optional[Callable[[List[dict]], Any]] = None) -> Dict[str, Any]:
+    """
+    Compare the request payload of each PDF payload mode.
+
+    With send, every mode's payload is also sent in a short request, so the change in
+    request latency is measured rather than inferred from the body size.
+
+    Args:
+        pdf_source: File path or PDF bytes
+        send (Optional[Callable[[List[dict]], Any]]): Sends a non-streaming request, e.g. an
+            uncached adapter's get_non_streaming_response
+
+    Returns:
+        Dict[str, Any]: Per mode: bytes, bytes saved, preparation time and the time to
+            base64-encode and serialize the request content; with send, the request time and
+            its change against the unmodified "pdf" payload
+    """
+    result: Dict[str, Any] = {}
+    for mode in PAYLOAD_MODES:
+        pdf_payload = prepare_pdf_payload(pdf_source, mode)
+        start = time.perf_counter()
+        content = pdf_payload.input_content("lease.pdf")
+        body = json.dumps(content)
+        report = pdf_payload.report()
+        report['request_body_bytes'] = len(body)
+        report['encode_seconds'] = round(time.perf_counter() - start, 4)
+        if send is not None:
+            start = time.perf_counter()
+            send([{"role": "user", "content": [content, {"type": "input_text", "text": PAYLOAD_BENCHMARK_PROMPT}]}])
+            report['request_seconds'] = round(time.perf_counter() - start, 4)
+        result[mode] = report
+    if send is not None:
+        for report in result.values():
+            report['request_seconds_change'] = round(report['request_seconds'] - result['pdf']['request_seconds'], 4)
+    return result
+
+
+def _best_seconds(run, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_page_extraction(pdf_source: Union[str, bytes], repeat: int = 3) -> Dict[str, Any]:
+    """
+    Time PDFChunker._read_pages, and the part of it the shared TextPage saves.
+
+    _read_pages is timed end to end with table detection on every page and with text
+    only. find_tables builds its own character map and reads the page's full drawings
+    itself, so neither is shared. What sharing saves is the layout analysis behind the
+    text around each page's topmost table, timed on its own: read from the page's
+    TextPage, against a fresh analysis as before.
+
+    Args:
+        pdf_source: File path or PDF bytes
+        repeat (int): Runs per measurement; the best run is reported
+
+    Returns:
+        Dict[str, Any]: Page count, _read_pages ms/page with tables and text only, the
+            text-around-table ms/page fresh and shared, and the saving as a share of
+            _read_pages with tables
+    """
+    doc = fitz.open(pdf_source) if isinstance(pdf_source, str) else fitz.open(stream=pdf_source)
+    try:
+        pages = len(doc)
+        chunker = PDFChunker(table_detection="always")
+        per_page = lambda seconds: round(1000 * seconds / pages, 2)
+        result: Dict[str, Any] = {
+            'pages': pages,
+            'read_pages_ms_per_page': {
+                'tables': per_page(_best_seconds(lambda: chunker._read_pages(doc, 0, pages, True), repeat)),
+                'text': per_page(_best_seconds(lambda: chunker._read_pages(doc, 0, pages, False), repeat)),
+            },
+        }
+
+        table_pages = []
+        for page in doc:
+            tables = chunker._find_page_tables(page) or []
+            if tables:
+                bbox = min(tables, key=lambda table: table.bbox[1]).bbox
+                table_pages.append((page, bbox, page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)))
+        fresh = _best_seconds(lambda: [chunker._text_outside(page, bbox) for page, bbox, _ in table_pages], repeat)
+        shared = _best_seconds(lambda: [chunker._text_outside(page, bbox, textpage)
+                                        for page, bbox, textpage in table_pages], repeat)
+        result['text_outside_ms_per_page'] = {'fresh': per_page(fresh), 'shared': per_page(shared)}
+        result['saved_share'] = round((fresh - shared) / pages / (result['read_pages_ms_per_page']['tables'] / 1000), 4)
+    finally:
+        doc.close()
+    return result
+
+
+def check_table_prefilter(pdf_source: Union[str, bytes]) -> Dict[str, Any]:
+    """
+    Measure the "auto" table prefilter against running find_tables on every page.
+
+    Args:
+        pdf_source: File path or PDF bytes
+
+    Returns:
+        Dict[str, Any]: Pages skipped, tables found per mode and the pages where auto missed tables
+    """
+    always = PDFChunker(table_detection="always")
+    auto = PDFChunker(table_detection="auto")
+    expected = always.get_table_info(pdf_source)
+    start = time.perf_counter()
+    auto.parse_pdf(pdf_source, extract_tables=True)
+    auto_seconds = time.perf_counter() - start
+    found = auto.get_table_info(pdf_source)
+
+    missed_pages = [page for page, count in expected.items() if found.get(page, 0) < count]
+    return {
+        'pages': auto.parse_stats['pages'],
+        'pages_skipped': auto.parse_stats['table_detection_skipped'],
+        'tables_always': sum(expected.values()),
+        'tables_auto': sum(found.values()),
+        'recall': round(1 - len(missed_pages) / max(1, sum(1 for count in expected.values() if count)), 4),
+        'missed_pages': missed_pages,
+        'auto_seconds': round(auto_seconds, 4),
+    }
+
+
+def _measure_intake(pdf_path: str, mode: str, results) -> None:
+    """Child process: parse one PDF through one intake mode and report the RSS growth in MB."""
+    source: Any = pdf_path
+    if mode == 'spooled_file':
+        # What an UploadFile holds for a large upload: a spooled file rolled over to disk
+        source = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        with open(pdf_path, 'rb') as fp:
+            shutil.copyfileobj(fp, source)
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode == 'read_bytes':
+        # The old router path: await file.read() into one bytes object
+        with open(pdf_path, 'rb') as fp:
+            source = fp.read()
+    PDFChunker().parse_pdf(source, extract_tables=True)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((peak - baseline) / 1024)  # ru_maxrss is in KB on Linux
+
+
+def benchmark_intake(pdf_path: str) -> Dict[str, Any]:
+    """
+    Measure peak RSS growth of one parse per intake mode, each in a fresh process.
+
+    Args:
+        pdf_path (str): PDF file to parse
+
+    Returns:
+        Dict[str, Any]: File size and peak RSS growth in MB per intake mode
+    """
+    context = multiprocessing.get_context('spawn')
+    report: Dict[str, Any] = {'file_mb': round(os.path.getsize(pdf_path) / (1024 * 1024), 2)}
+    for mode in ('read_bytes', 'spooled_file', 'path'):
+        results = context.Queue()
+        process = context.Process(target=_measure_intake, args=(pdf_path, mode, results))
+        process.start()
+        report[f'{mode}_peak_rss_mb'] = round(results.get(), 2)
+        process.join()
+    return report
+
+
+def _cached_filenames(cache_dir: str) -> Dict[str, str]:
+    """Map chunk cache entry files to the filename each document was uploaded under."""
+    cache = ChunkCache(cache_dir)
+    filenames = {}
+    for name in sorted(os.listdir(cache_dir)):
+        key, extension = os.path.splitext(name)
+        if extension in (".chunks", ".pkl"):
+            # Entries written before the cache was content-addressed are keyed by filename
+            filenames[name] = (cache.metadata(key) or {}).get('filename') or key
+    return filenames
+
+
+def cached_pdf_paths(pdf_dir: str, cache_dir: str = CHUNK_CACHE_DIR) -> List[str]:
+    """
+    Locate the original PDFs behind the entries in the chunk cache.
+
+    Args:
+        pdf_dir (str): Directory holding the uploaded lease PDFs
+        cache_dir (str): Chunk cache directory
+
+    Returns:
+        List[str]: Paths of the PDFs that exist in pdf_dir
+    """
+    names = sorted(set(_cached_filenames(cache_dir).values()))
+    return [os.path.join(pdf_dir, name) for name in names if os.path.exists(os.path.join(pdf_dir, name))]
+
+
+# Synthetic documents of the parse suite: page counts, table density and multi-page tables
+SYNTHETIC_SUITE = {
+    'prose-10p': lambda: make_synthetic_lease(pages=10, table_every=0),
+    'lease-40p': lambda: make_synthetic_lease(pages=40, table_every=3),
+    'dense-tables-40p': lambda: make_synthetic_lease(pages=40, table_every=1),
+    'lease-200p': lambda: make_synthetic_lease(pages=200, table_every=3),
+    'rent-schedule-10p': lambda: make_synthetic_rent_schedule(pages=10),
+}
+
+
+def _measure_parse(pdf_path: str, extract_tables: bool, repeat: int, results) -> None:
+    """Child process: parse one PDF and report throughput, time split, peak RSS and chunk counts."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    chunker = PDFChunker()
+    best, timings, pages_data = float('inf'), {}, []
+    for _ in range(repeat):
+        # A fresh chunker per run so cached table analysis never makes a run look faster
+        chunker = PDFChunker()
+        start = time.perf_counter()
+        pages_data = chunker.parse_pdf(pdf_path, extract_tables=extract_tables)
+        elapsed = time.perf_counter() - start
+        if elapsed < best:
+            best, timings = elapsed, dict(chunker.parse_timings)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results.put({
+        'pages': len(pages_data),
+        'seconds': round(best, 4),
+        'pages_per_sec': round(len(pages_data) / best, 2) if best else None,
+        'get_text_seconds': round(timings.get('get_text_seconds', 0.0), 4),
+        'find_tables_seconds': round(timings.get('find_tables_seconds', 0.0), 4),
+        'table_detection_skipped': chunker.parse_stats['table_detection_skipped'],
+        # ru_maxrss is a high-water mark in KB on Linux; small parses never exceed the import peak
+        'peak_rss_mb': round(peak / 1024, 2),
+        'import_rss_mb': round(baseline / 1024, 2),
+        'chunks': len(chunker.create_chunks(pages_data)),
+        'token_chunks': len(PDFChunker(chunking="tokens").create_chunks(pages_data)),
+    })
+
+
+def benchmark_parse(pdf_path: str, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Benchmark one PDF with table extraction on and off, each in a fresh process.
+
+    Args:
+        pdf_path (str): PDF file to parse
+        repeat (int): Parses per setting; the fastest is reported
+
+    Returns:
+        Dict[str, Any]: Results keyed by "tables_on" and "tables_off"
+    """
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    for label, extract_tables in (('tables_on', True), ('tables_off', False)):
+        results = context.Queue()
+        process = context.Process(target=_measure_parse, args=(pdf_path, extract_tables, repeat, results))
+        process.start()
+        report[label] = results.get()
+        process.join()
+    return report
+
+
+def benchmark_cached_chunks(cache_dir: str = CHUNK_CACHE_DIR) -> Dict[str, Any]:
+    """
+    Report page and token-budget chunk counts for every entry in the chunk cache.
+
+    Args:
+        cache_dir (str): Chunk cache directory
+
+    Returns:
+        Dict[str, Any]: Pages, chunk counts and characters per cached entry, keyed by
+            the document's filename and, for content-addressed entries, the cache key
+    """
+    report = {}
+    for name, filename in _cached_filenames(cache_dir).items():
+        key, extension = os.path.splitext(name)
+        if extension == ".chunks":
+            pages_data = chunk_pages(open_chunks(os.path.join(cache_dir, name)))
+        else:
+            with open(os.path.join(cache_dir, name), 'rb') as f:
+                pages_data = chunk_pages(load_chunks(f))
+        report[filename if filename == key else f"{filename} ({key})"] = {
+            'pages': len(pages_data),
+            'chars': sum(len(text) for _, text in pages_data),
+            'chunks': len(pages_data),
+            'token_chunks': len(PDFChunker(chunking="tokens").create_chunks(pages_data)),
+        }
+    return report
+
+
+def run_suite(pdf_paths: List[str], repeat: int = 3, cache_dir: str = CHUNK_CACHE_DIR) -> Dict[str, Any]:
+    """
+    Run the full parser benchmark suite.
+
+    Args:
+        pdf_paths (List[str]): Real PDFs to benchmark next to the synthetic ones
+        repeat (int): Parses per document and setting
+        cache_dir (str): Chunk cache directory for the chunk count report
+
+    Returns:
+        Dict[str, Any]: Environment, synthetic and document results, and cached chunk counts
+    """
+    report: Dict[str, Any] = {
+        'environment': {
+            'python': platform.python_version(),
+            'pymupdf': fitz.VersionBind,
+            'cpus': os.cpu_count(),
+        },
+        'synthetic': {},
+        'documents': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, build in SYNTHETIC_SUITE.items():
+            path = os.path.join(tmp_dir, f"{name}.pdf")
+            with open(path, 'wb') as fp:
+                fp.write(build())
+            report['synthetic'][name] = benchmark_parse(path, repeat)
+    for path in pdf_paths:
+        report['documents'][os.path.basename(path)] = benchmark_parse(path, repeat)
+    if os.path.isdir(cache_dir):
+        report['cached_chunks'] = benchmark_cached_chunks(cache_dir)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDFChunker")
+    parser.add_argument("pdfs", nargs="*", help="PDF files to benchmark (default: a synthetic lease)")
+    parser.add_argument("--pdf-dir", help="Also benchmark the PDFs behind ./cached_pdfs found in this directory")
+    parser.add_argument("--prefilter-recall", action="store_true",
+                        help="Check the auto table prefilter against find_tables on every page")
+    parser.add_argument("--intake", action="store_true",
+                        help="Measure peak RSS per intake mode (bytes, spooled upload file, path)")
+    parser.add_argument("--table-formats", action="store_true",
+                        help="Report the estimated token cost of the tables in each table format")
+    parser.add_argument("--page-extraction", action="store_true",
+                        help="Time _read_pages and the text-around-table work the shared TextPage saves (default: dense pages)")
+    parser.add_argument("--payload", action="store_true",
+                        help="Compare request payload bytes of the pdf, slim and text payload modes")
+    parser.add_argument("--payload-requests", action="store_true",
+                        help="With --payload, also time a real uncached OpenAI request per payload mode")
+    parser.add_argument("--suite", action="store_true",
+                        help="Run the full suite: synthetic variants and given PDFs, tables on and off (JSON)")
+    parser.add_argument("--output", help="Write the --suite JSON report to this file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    paths = list(args.pdfs) + (cached_pdf_paths(args.pdf_dir) if args.pdf_dir else [])
+
+    if args.suite:
+        output = json.dumps(run_suite(paths, args.repeat), indent=2)
+        if args.output:
+            with open(args.output, 'w') as fp:
+                fp.write(output + "\n")
+        print(output)
+        return
+    sources = {path: path for path in paths} or {"synthetic-40p": make_synthetic_lease()}
+
+    if args.intake:
+        report = {}
+        for name, source in sources.items():
+            if isinstance(source, bytes):
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as fp:
+                    fp.write(source)
+                report[name] = benchmark_intake(fp.name)
+                os.remove(fp.name)
+            else:
+                report[name] = benchmark_intake(source)
+        print(json.dumps(report, indent=2))
+        return
+
+    if args.table_formats:
+        report = {name: PDFChunker().table_format_costs(source) for name, source in sources.items()}
+        print(json.dumps(report, indent=2))
+        return
+
+    if args.payload:
+        if not paths:
+            sources = {"synthetic-40p-images": make_synthetic_lease(image_every=4)}
+        send = None
+        if args.payload_requests:
+            # Sent straight to the provider, so the response cache cannot answer a request
+            from adapters.llms._openai import _OpenAI
+            send = _OpenAI().get_non_streaming_response
+        report = {name: benchmark_payload(source, send) for name, source in sources.items()}
+        print(json.dumps(report, indent=2))
+        return
+
+    if args.page_extraction:
+        if not paths:
+            sources = {"synthetic-dense-20p": make_synthetic_lease(pages=20, table_every=1, rows=40, cols=6)}
+        report = {name: benchmark_page_extraction(source, args.repeat) for name, source in sources.items()}
+        print(json.dumps(report, indent=2))
+        return
+
+    if args.prefilter_recall:
+        report = {name: check_table_prefilter(source) for name, source in sources.items()}
+        print(json.dumps(report, indent=2))
+        return
+
+    report = {name: benchmark_table_detection(source, args.repeat) for name, source in sources.items()}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for name, result in report.items():
+        print(f"{name}: {result['pages']} pages")
+        print(f"  two-pass:    {result['two_pass']['pages_per_sec']} pages/sec")
+        print(f"  single-pass: {result['single_pass']['pages_per_sec']} pages/sec ({result['speedup']}x)")
+        print(f"  prefiltered: {result['prefiltered']['pages_per_sec']} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Disk cache of parsed documents, addressed by content.
+
+Entries are keyed by the SHA-256 of the PDF bytes and the settings the chunks were
+built with, so two different PDFs uploaded under one name never collide and a
+renamed copy of a parsed PDF is still a hit. Entries are chunk store files (see
+chunk_store), each with a JSON metadata file next to it.
+
+ChunkCacheService puts a byte-bounded in-process LRU of parsed chunk lists in front
+of the disk, which is itself bounded by size and by time since last use.
+
+Run as a module to convert the pickle entries written by earlier versions:
+    python -m utils.parsers.chunk_cache ./cached_pdfs
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.parsers.chunk_store import dumps_chunks, open_chunks
+from utils.parsers.pdf import PARSER_VERSION, PDFChunk, PDFChunker, PDFSource, chunk_pages, load_chunks
+
+
+# Directory of the chunk cache used by the API
+CHUNK_CACHE_DIR = "./cached_pdfs"
+# Stored size of the chunk lists kept in memory (a document's chunks take about their
+# stored size once read, since they share one copy of the text)
+CHUNK_CACHE_MEMORY_BYTES = 256 * 1024 * 1024
+# Disk entries are evicted least recently used first beyond this total size, and once
+# they have not been read for CHUNK_CACHE_MAX_AGE_SECONDS
+CHUNK_CACHE_DISK_BYTES = 2 * 1024 * 1024 * 1024
+CHUNK_CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+
+class ChunkCache:
+    """Chunk store files on disk, one per document and chunker settings."""
+
+    def __init__(self, directory: str = CHUNK_CACHE_DIR, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str): Directory holding the entries, created on first write
+            max_bytes (Optional[int]): Total size of the entries kept by evict, None for unbounded
+            max_age_seconds (Optional[float]): Entries not read for this long are removed by
+                evict, None to keep them
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+    def _path(self, key: str, extension: str = "chunks") -> str:
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    @staticmethod
+    def key(pdf_source: PDFSource, overlap_percentage: float, extract_tables: bool) -> str:
+        """
+        Compute the key of a document parsed with the given settings.
+
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            overlap_percentage (float): Overlap the chunks are built with
+            extract_tables (bool): Whether tables are extracted
+
+        Returns:
+            str: Hex digest of the PDF bytes followed by the settings and PARSER_VERSION
+        """
+        digest = PDFChunker()._source_digest(pdf_source)
+        return f"{digest}-o{overlap_percentage:g}-{'tables' if extract_tables else 'text'}-v{PARSER_VERSION}"
+
+    def get(self, key: str, mapped: bool = True) -> Optional[List[PDFChunk]]:
+        """
+        Load an entry.
+
+        Args:
+            key (str): Entry key, see key
+            mapped (bool): Memory-map the entry, see chunk_store.open_chunks
+
+        Returns:
+            Optional[List[PDFChunk]]: The chunks, or None if missing or unreadable
+        """
+        try:
+            chunks = open_chunks(self._path(key), mapped)
+            # The modification time records the last use, for eviction
+            os.utime(self._path(key))
+            return chunks
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable chunk cache entry {key}: {str(e)}")
+            return None
+
+    def metadata(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the metadata of an entry.
+
+        Args:
+            key (str): Entry key, see key
+
+        Returns:
+            Optional[Dict[str, Any]]: Filename, page and chunk counts, parse time, entry size
+                and creation time, or None if missing or unreadable
+        """
+        try:
+            with open(self._path(key, "json"), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable chunk cache metadata {key}: {str(e)}")
+            return None
+
+    def _write(self, key: str, extension: str, data: bytes):
+        # Written to a temporary file and renamed, so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key, extension))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, key: str, chunks: List[PDFChunk], filename: str = "", parse_seconds: Optional[float] = None) -> int:
+        """
+        Save an entry and its metadata.
+
+        The metadata file is written after the chunks, so metadata always describes a
+        complete entry.
+
+        Args:
+            key (str): Entry key, see key
+            chunks (List[PDFChunk]): Chunks of one document
+            filename (str): Name the document was uploaded under, for reference only
+            parse_seconds (Optional[float]): Time spent parsing the document
+
+        Returns:
+            int: Size of the entry in bytes
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data = dumps_chunks(chunks)
+        self._write(key, "chunks", data)
+        metadata = {
+            'filename': filename,
+            'pages': len(chunk_pages(chunks)),
+            'chunks': len(chunks),
+            'parse_seconds': round(parse_seconds, 3) if parse_seconds is not None else None,
+            'entry_bytes': len(data),
+            'parser_version': PARSER_VERSION,
+            'created_at': time.time(),
+        }
+        self._write(key, "json", json.dumps(metadata).encode('utf-8'))
+        return len(data)
+
+    def evict(self) -> List[str]:
+        """
+        Remove entries not read within max_age_seconds, then the least recently used
+        entries until the rest fit in max_bytes.
+
+        Returns:
+            List[str]: Keys of the removed entries
+        """
+        if self.max_bytes is None and self.max_age_seconds is None:
+            return []
+        with self._lock:
+            entries: List[Tuple[float, int, str]] = []
+            try:
+                names = os.listdir(self.directory)
+            except FileNotFoundError:
+                return []
+            for name in names:
+                # Pickle entries of earlier versions count towards the bounds until migrated
+                key, extension = os.path.splitext(name)
+                if extension in (".chunks", ".pkl"):
+                    try:
+                        stat = os.stat(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, key))
+            entries.sort()
+
+            now, total = time.time(), sum(size for _, size, _ in entries)
+            evicted = []
+            for last_used, size, key in entries:
+                too_old = self.max_age_seconds is not None and now - last_used > self.max_age_seconds
+                too_big = self.max_bytes is not None and total > self.max_bytes
+                if not (too_old or too_big):
+                    continue
+                for extension in ("chunks", "pkl", "json"):
+                    if os.path.exists(self._path(key, extension)):
+                        os.remove(self._path(key, extension))
+                total -= size
+                evicted.append(key)
+            return evicted
+
+    def migrate_pickles(self, keep: bool = False) -> Dict[str, List[str]]:
+        """
+        Convert the pickle entries written by earlier versions to chunk store files.
+
+        Content-addressed entries (with a metadata file) keep their key, which names the
+        parser version that built them. Entries written before the cache was
+        content-addressed are named after the uploaded file and record no parser
+        version, so they cannot be keyed without claiming the current parser's output;
+        they are dropped and the documents are parsed again on their next upload.
+
+        Args:
+            keep (bool): Keep the pickle files after converting or dropping them
+
+        Returns:
+            Dict[str, List[str]]: Pickle files "converted", "dropped" (named after their file) and "failed"
+        """
+        report: Dict[str, List[str]] = {'converted': [], 'dropped': [], 'failed': []}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".pkl"):
+                continue
+            key = name[:-len(".pkl")]
+            metadata = self.metadata(key)
+            if metadata is None:
+                if not keep:
+                    os.remove(os.path.join(self.directory, name))
+                report['dropped'].append(name)
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    chunks = load_chunks(f)
+                self.put(key, chunks, metadata['filename'], metadata['parse_seconds'])
+            except Exception as e:
+                print(f"Warning: Could not convert chunk cache entry {name}: {str(e)}")
+                report['failed'].append(name)
+                continue
+            if not keep:
+                os.remove(os.path.join(self.directory, name))
+            report['converted'].append(name)
+        return report
+
+
+class ChunkCacheService:
+    """Chunk cache with an in-process LRU tier over the disk tier, with an awaitable API and counters."""
+
+    def __init__(self, directory: str = CHUNK_CACHE_DIR, memory_bytes: int = CHUNK_CACHE_MEMORY_BYTES,
+                 disk_bytes: Optional[int] = CHUNK_CACHE_DISK_BYTES,
+                 max_age_seconds: Optional[float] = CHUNK_CACHE_MAX_AGE_SECONDS):
+        """
+        Initialize the service.
+
+        Args:
+            directory (str): Directory of the disk tier
+            memory_bytes (int): Stored size of the chunk lists kept in memory, 0 to disable the memory tier
+            disk_bytes (Optional[int]): Total size of the disk tier, None for unbounded
+            max_age_seconds (Optional[float]): Disk entries not read for this long are removed,
+                None to keep them
+        """
+        self.disk = ChunkCache(directory, disk_bytes, max_age_seconds)
+        self.memory_bytes = memory_bytes
+        self._memory: 'OrderedDict[str, Tuple[List[PDFChunk], int]]' = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                          'memory_evictions': 0, 'disk_evictions': 0}
+
+    @classmethod
+    def from_env(cls) -> 'ChunkCacheService':
+        """Build the service from the optional CHUNK_CACHE env var, e.g. {"memory_mb": 128, "disk_mb": 1024, "max_age_days": 7}."""
+        config: dict = json.loads(os.environ.get('CHUNK_CACHE') or '{}')
+        mb = 1024 * 1024
+        return cls(
+            directory=config.get('directory', CHUNK_CACHE_DIR),
+            memory_bytes=int(config['memory_mb'] * mb) if 'memory_mb' in config else CHUNK_CACHE_MEMORY_BYTES,
+            disk_bytes=int(config['disk_mb'] * mb) if 'disk_mb' in config else CHUNK_CACHE_DISK_BYTES,
+            max_age_seconds=config['max_age_days'] * 24 * 3600 if 'max_age_days' in config else CHUNK_CACHE_MAX_AGE_SECONDS,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters and memory use of the cache.
+
+        Returns:
+            Dict[str, Any]: Hits per tier, misses, evictions per tier, and the entries and
+                bytes held in memory
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_used,
+                'memory_limit_bytes': self.memory_bytes,
+            }
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _remember(self, key: str, chunks: List[PDFChunk], size: int):
+        """Put chunks in the memory tier, evicting the least recently used beyond memory_bytes."""
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_used -= self._memory.pop(key)[1]
+            self._memory[key] = (chunks, size)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_used -= evicted_size
+                self._counters['memory_evictions'] += 1
+
+    async def key(self, pdf_source: PDFSource, overlap_percentage: float, extract_tables: bool) -> str:
+        """Hash the document off the event loop, see ChunkCache.key."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, ChunkCache.key, pdf_source, overlap_percentage, extract_tables)
+
+    async def get(self, key: str) -> Optional[List[PDFChunk]]:
+        """
+        Look an entry up in memory, then on disk (read off the event loop).
+
+        Args:
+            key (str): Entry key, see key
+
+        Returns:
+            Optional[List[PDFChunk]]: A new list of the cached chunks, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return list(entry[0])
+
+        loop = asyncio.get_running_loop()
+        metadata = await loop.run_in_executor(None, self.disk.metadata, key)
+        # Entries headed for the memory tier are read into memory: a mapping would keep the
+        # file open for as long as they stay cached, even after the file is evicted
+        remember = metadata is not None and metadata['entry_bytes'] <= self.memory_bytes
+        chunks = await loop.run_in_executor(None, self.disk.get, key, not remember)
+        if chunks is None:
+            self._count('misses')
+            return None
+        self._count('disk_hits')
+        if remember:
+            self._remember(key, chunks, metadata['entry_bytes'])
+        return list(chunks)
+
+    async def put(self, key: str, chunks: List[PDFChunk], filename: str = "", parse_seconds: Optional[float] = None):
+        """
+        Save an entry to both tiers, writing and evicting on disk off the event loop.
+
+        Args:
+            key (str): Entry key, see key
+            chunks (List[PDFChunk]): Chunks of one document
+            filename (str): Name the document was uploaded under, for reference only
+            parse_seconds (Optional[float]): Time spent parsing the document
+        """
+        loop = asyncio.get_running_loop()
+        size = await loop.run_in_executor(None, self.disk.put, key, chunks, filename, parse_seconds)
+        self._remember(key, list(chunks), size)
+        evicted = await loop.run_in_executor(None, self.disk.evict)
+        self._count('disk_evictions', len(evicted))
+
+
+_chunk_cache: Optional[ChunkCacheService] = None
+
+
+def get_chunk_cache() -> ChunkCacheService:
+    """Return the process-wide chunk cache, creating it from the environment on first use."""
+    global _chunk_cache
+    if _chunk_cache is None:
+        _chunk_cache = ChunkCacheService.from_env()
+    return _chunk_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert pickled chunk cache entries to chunk store files")
+    parser.add_argument("directory", nargs="?", default=CHUNK_CACHE_DIR, help="Chunk cache directory")
+    parser.add_argument("--keep", action="store_true", help="Keep the pickle files after converting or dropping them")
+    args = parser.parse_args()
+    print(json.dumps(ChunkCache(args.directory).migrate_pickles(args.keep), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Versioned, pickle-free file format for parsed documents.
+
+A store file holds every page's text once, UTF-8 encoded back to back in one blob,
+followed by a JSON index of byte offsets for the pages and of each chunk's overlaps,
+boilerplate lines and table flags. Files are opened with mmap and page text is only
+decoded when a chunk reads it, so a request touching a few pages of a large lease
+faults in just those pages; entries kept in memory are read without a mapping. Loading never executes code from the file, and the
+format does not change when PDFChunk's Python layout does.
+
+The page store keeps single extracted pages (PageRecord) in the same layout, under
+PAGE_RECORD_MAGIC, with the page and table texts in the blob.
+
+Layout:
+    header  CHUNK_STORE_MAGIC or PAGE_RECORD_MAGIC, format version (uint32), index offset
+            and length (uint64)
+    blob    page text
+    index   JSON, see _index and _record_index
+"""
+import json
+import mmap
+import struct
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from utils.parsers.pdf import DocumentText, PageRecord, PageTable, PDFChunk
+
+
+CHUNK_STORE_MAGIC = b"PDFCHUNK"
+PAGE_RECORD_MAGIC = b"PDFPAGE\0"
+# Bump when the layout or the index changes; files of other versions are rejected
+CHUNK_STORE_VERSION = 1
+_HEADER = struct.Struct("<8sIQQ")
+
+
+class _MappedPages(Sequence):
+    """Page texts of one document, decoded from the mapped (or read) blob on access."""
+
+    def __init__(self, buffer: Union[mmap.mmap, bytes], spans: List[Tuple[int, int]]):
+        self._buffer = buffer
+        self._spans = spans
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, length = self._spans[index]
+        return self._buffer[start:start + length].decode('utf-8')
+
+    def __reduce__(self):
+        # Pickled as a plain list, so chunks loaded from a store can still be pickled
+        return list, (list(self),)
+
+
+def _index(chunks: List[PDFChunk]) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Lay out the page text blob and the index of a list of chunks.
+
+    Args:
+        chunks (List[PDFChunk]): Chunks of one document, in order
+
+    Returns:
+        Tuple[bytes, Dict[str, Any]]: The blob, and an index of the documents (page numbers,
+            blob offsets relative to the blob, boilerplate) and chunks (document, page index,
+            overlap lengths, overlap_info)
+    """
+    blob = bytearray()
+    documents: List[Dict[str, Any]] = []
+    document_ids: Dict[int, int] = {}
+    records = []
+    for chunk in chunks:
+        document = chunk._document
+        if id(document) not in document_ids:
+            # Chunks normally share one DocumentText; old standalone entries each have their own
+            document_ids[id(document)] = len(documents)
+            pages = []
+            for text in document.pages:
+                encoded = text.encode('utf-8')
+                pages.append([len(blob), len(encoded)])
+                blob += encoded
+            documents.append({
+                'pages': pages,
+                'page_numbers': list(document.page_numbers),
+                'boilerplate': [[page, [list(line) for line in lines]] for page, lines in document.boilerplate.items()],
+            })
+        overlap_info = dict(chunk.overlap_info)
+        if 'table_budget_exceeded' in overlap_info:
+            # JSON object keys are strings; page numbers stay integers as pairs
+            overlap_info['table_budget_exceeded'] = [list(item) for item in overlap_info['table_budget_exceeded'].items()]
+        records.append({
+            'document': document_ids[id(document)],
+            'index': chunk._index,
+            'chunk_id': chunk.chunk_id,
+            'previous_chars': chunk._previous_chars,
+            'next_chars': chunk._next_chars,
+            'overlap_info': overlap_info,
+        })
+    return bytes(blob), {'documents': documents, 'chunks': records}
+
+
+def dumps_chunks(chunks: List[PDFChunk]) -> bytes:
+    """
+    Serialize chunks in the store format.
+
+    Args:
+        chunks (List[PDFChunk]): Chunks of one document, in order
+
+    Returns:
+        bytes: The store file contents
+    """
+    blob, index = _index(chunks)
+    encoded_index = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    header = _HEADER.pack(CHUNK_STORE_MAGIC, CHUNK_STORE_VERSION, _HEADER.size + len(blob), len(encoded_index))
+    return header + blob + encoded_index
+
+
+def _read_header(buffer, path: str, magic: bytes, kind: str) -> Tuple[int, int]:
+    """Check a store file's magic and format version; return its index offset and length."""
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f"{path} is not a {kind} file")
+    file_magic, version, index_offset, index_length = _HEADER.unpack(buffer[:_HEADER.size])
+    if file_magic != magic:
+        raise ValueError(f"{path} is not a {kind} file")
+    if version != CHUNK_STORE_VERSION:
+        raise ValueError(f"{path} has chunk store format version {version}, expected {CHUNK_STORE_VERSION}")
+    return index_offset, index_length
+
+
+def open_chunks(path: str, mapped: bool = True) -> List[PDFChunk]:
+    """
+    Open a store file as chunks whose page text is decoded on access.
+
+    A mapped file stays mapped, holding its file open, for as long as any of its chunks
+    is referenced; chunks kept indefinitely (e.g. in a memory cache) should be read
+    with mapped=False instead.
+
+    Args:
+        path (str): Store file
+        mapped (bool): Read page text from a memory map, or from a copy of the file in memory
+
+    Returns:
+        List[PDFChunk]: The chunks
+
+    Raises:
+        ValueError: If the file is not a store file or has another format version
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mapped else f.read()
+    index_offset, index_length = _read_header(buffer, path, CHUNK_STORE_MAGIC, "chunk store")
+    index = json.loads(buffer[index_offset:index_offset + index_length])
+
+    documents = []
+    for document in index['documents']:
+        pages = _MappedPages(buffer, [(_HEADER.size + start, length) for start, length in document['pages']])
+        boilerplate = {page: [tuple(line) for line in lines] for page, lines in document['boilerplate']}
+        documents.append(DocumentText(pages, document['page_numbers'], boilerplate))
+
+    chunks = []
+    for record in index['chunks']:
+        overlap_info = record['overlap_info']
+        if 'table_budget_exceeded' in overlap_info:
+            overlap_info['table_budget_exceeded'] = {page: reason for page, reason in overlap_info['table_budget_exceeded']}
+        chunks.append(PDFChunk.from_document(documents[record['document']], record['index'], record['chunk_id'],
+                                             overlap_info, record['previous_chars'], record['next_chars']))
+    return chunks
+
+
+def _record_index(record: PageRecord) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Lay out the text blob and the index of a page record.
+
+    Args:
+        record (PageRecord): Extracted page, after OCR
+
+    Returns:
+        Tuple[bytes, Dict[str, Any]]: The blob (page text, then each table's text_outside), and
+            the record's other fields with the blob offsets of those texts
+    """
+    blob = bytearray()
+
+    def span(text: Optional[str]) -> Optional[List[int]]:
+        if text is None:
+            return None
+        encoded = text.encode('utf-8')
+        blob.extend(encoded)
+        return [len(blob) - len(encoded), len(encoded)]
+
+    index = {
+        'page_number': record.page_number,
+        'text': span(record.text),
+        'height': record.height,
+        'tables': None if record.tables is None else [
+            {'index': table.index, 'bbox': list(table.bbox), 'rows': table.rows, 'text_outside': span(table.text_outside)}
+            for table in record.tables
+        ],
+        'table_detection_skipped': record.table_detection_skipped,
+        'ocr': record.ocr,
+        'text_seconds': record.text_seconds,
+        'margin_lines': None if record.margin_lines is None else [
+            [zone, line, list(bbox)] for zone, line, bbox in record.margin_lines
+        ],
+        'page_hash': record.page_hash,
+        'table_seconds': record.table_seconds,
+        'table_budget_exceeded': record.table_budget_exceeded,
+    }
+    return bytes(blob), index
+
+
+def dumps_page_record(record: PageRecord) -> bytes:
+    """
+    Serialize a page record in the store format; a pending OCR image is not kept.
+
+    Args:
+        record (PageRecord): Extracted page, after OCR
+
+    Returns:
+        bytes: The store file contents
+    """
+    blob, index = _record_index(record)
+    encoded_index = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    header = _HEADER.pack(PAGE_RECORD_MAGIC, CHUNK_STORE_VERSION, _HEADER.size + len(blob), len(encoded_index))
+    return header + blob + encoded_index
+
+
+def loads_page_record(data: bytes, path: str = "page record") -> PageRecord:
+    """
+    Rebuild a page record from store file contents.
+
+    Args:
+        data (bytes): Contents written by dumps_page_record
+        path (str): Where the contents were read from, for error messages
+
+    Returns:
+        PageRecord: The record
+
+    Raises:
+        ValueError: If the data is not a page record or has another format version
+    """
+    index_offset, index_length = _read_header(data, path, PAGE_RECORD_MAGIC, "page record")
+    index = json.loads(data[index_offset:index_offset + index_length])
+
+    def text(span: Optional[List[int]]) -> Optional[str]:
+        if span is None:
+            return None
+        start = _HEADER.size + span[0]
+        return data[start:start + span[1]].decode('utf-8')
+
+    tables = index['tables']
+    margin_lines = index['margin_lines']
+    return PageRecord(
+        page_number=index['page_number'],
+        text=text(index['text']),
+        height=index['height'],
+        tables=None if tables is None else [
+            PageTable(index=table['index'], bbox=tuple(table['bbox']), rows=table['rows'],
+                      text_outside=text(table['text_outside']))
+            for table in tables
+        ],
+        table_detection_skipped=index['table_detection_skipped'],
+        ocr=index['ocr'],
+        text_seconds=index['text_seconds'],
+        margin_lines=None if margin_lines is None else [(zone, line, tuple(bbox)) for zone, line, bbox in margin_lines],
+        page_hash=index['page_hash'],
+        table_seconds=index['table_seconds'],
+        table_budget_exceeded=index['table_budget_exceeded'],
+    )
@@ -0,0 +1,151 @@
+"""
+Disk store of extracted PDF pages, shared across documents.
+
+Pages are keyed by a hash of their content, so a re-uploaded or lightly
+edited lease only needs its new or changed pages extracted. Entries are page
+records in the chunk store format (see chunk_store), and the store is bounded
+like the chunk cache's disk tier: by total size and by time since last use.
+"""
+import json
+import os
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from utils.parsers.chunk_store import dumps_page_record, loads_page_record
+from utils.parsers.pdf import PageRecord
+
+
+# Directory of the page-level store used by the API
+PAGE_STORE_DIR = "./cached_pages"
+# Entries are evicted least recently used first beyond this total size, and once they
+# have not been read for PAGE_STORE_MAX_AGE_SECONDS
+PAGE_STORE_MAX_BYTES = 512 * 1024 * 1024
+PAGE_STORE_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+
+class PageStore:
+    """Page records on disk, one file per key."""
+
+    def __init__(self, directory: str = PAGE_STORE_DIR, max_bytes: Optional[int] = PAGE_STORE_MAX_BYTES,
+                 max_age_seconds: Optional[float] = PAGE_STORE_MAX_AGE_SECONDS):
+        """
+        Initialize the store.
+
+        Args:
+            directory (str): Directory holding the entries, created on first write
+            max_bytes (Optional[int]): Total size of the entries kept by evict, None for unbounded
+            max_age_seconds (Optional[float]): Entries not read for this long are removed by
+                evict, None to keep them
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    @classmethod
+    def from_env(cls) -> 'PageStore':
+        """Build the store from the optional PAGE_STORE env var, e.g. {"max_mb": 256, "max_age_days": 7}."""
+        config: dict = json.loads(os.environ.get('PAGE_STORE') or '{}')
+        return cls(
+            directory=config.get('directory', PAGE_STORE_DIR),
+            max_bytes=int(config['max_mb'] * 1024 * 1024) if 'max_mb' in config else PAGE_STORE_MAX_BYTES,
+            max_age_seconds=config['max_age_days'] * 24 * 3600 if 'max_age_days' in config else PAGE_STORE_MAX_AGE_SECONDS,
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.page")
+
+    def get(self, key: str) -> Optional[PageRecord]:
+        """
+        Load an entry.
+
+        Args:
+            key (str): Entry key
+
+        Returns:
+            Optional[PageRecord]: The stored record, or None if missing or unreadable
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                record = loads_page_record(f.read(), self._path(key))
+            # The modification time records the last use, for eviction
+            os.utime(self._path(key))
+            return record
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable page store entry {key}: {str(e)}")
+            return None
+
+    def put(self, key: str, record: PageRecord):
+        """
+        Save an entry, atomically so concurrent readers never see a partial file.
+
+        Args:
+            key (str): Entry key
+            record (PageRecord): Extracted page, after OCR
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dumps_page_record(record))
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self) -> List[str]:
+        """
+        Remove entries not read within max_age_seconds, then the least recently used
+        entries until the rest fit in max_bytes.
+
+        Pickle entries of earlier versions are never read again, so they go first.
+
+        Returns:
+            List[str]: Keys of the removed entries
+        """
+        if self.max_bytes is None and self.max_age_seconds is None:
+            return []
+        entries: List[Tuple[float, int, str]] = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            if name.endswith((".page", ".pkl")):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                last_used = 0.0 if name.endswith(".pkl") else stat.st_mtime
+                entries.append((last_used, stat.st_size, name))
+        entries.sort()
+
+        now, total = time.time(), sum(size for _, size, _ in entries)
+        evicted = []
+        for last_used, size, name in entries:
+            too_old = self.max_age_seconds is not None and now - last_used > self.max_age_seconds
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not (too_old or too_big):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= size
+            evicted.append(os.path.splitext(name)[0])
+        return evicted
+
+
+_page_store: Optional[PageStore] = None
+
+
+def get_page_store() -> PageStore:
+    """Return the process-wide page store, creating it from the environment on first use."""
+    global _page_store
+    if _page_store is None:
+        _page_store = PageStore.from_env()
+    return _page_store
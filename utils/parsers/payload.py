@@ -0,0 +1,284 @@
+"""
+Slimmed PDF payloads for LLM requests that embed the document as a base64 input_file.
+
+Uploaded PDFs often carry print-resolution scans and full embedded fonts that the model
+does not need. Before a PDF is base64-encoded into a request it can be rewritten with
+downsampled images, subset fonts and garbage-collected objects, or replaced by the text
+the parser extracts from it. With a file handle cache, the prepared PDF is uploaded
+to the provider once and later requests reference it by file id; request_with_pdf
+uploads it again if the provider has lost the file.
+"""
+import base64
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+
+from adapters.files.cache import FileHandleCache
+from utils.parsers.pdf import PAGE_MARKER, PDFChunker, PDFSource
+
+
+# Payload modes: "pdf" sends the upload unchanged, "slim" a rewritten copy of it, "text"
+# the extracted page text instead of a file (falls back to "slim" for scanned documents)
+PAYLOAD_MODES = ("pdf", "slim", "text")
+# Images placed at more than SLIM_IMAGE_DPI_THRESHOLD are resampled to SLIM_IMAGE_DPI
+# and re-encoded as JPEG at SLIM_JPEG_QUALITY
+SLIM_IMAGE_DPI_THRESHOLD = 200
+SLIM_IMAGE_DPI = 150
+SLIM_JPEG_QUALITY = 70
+# A text rendition is only used when pages carry this many characters on average
+TEXT_PAYLOAD_MIN_CHARS_PER_PAGE = 200
+
+
+@dataclass
+class PDFPayload:
+    """A PDF prepared for a request, with what the preparation saved."""
+    mode: str  # Mode actually used, see PAYLOAD_MODES
+    data: bytes  # PDF bytes, or UTF-8 text in "text" mode
+    original_bytes: int
+    seconds: float  # Time spent preparing the payload
+    file_id: Optional[str] = None  # Provider file id, when the PDF was uploaded instead of inlined
+    handle_key: Optional[str] = None  # Key of file_id in the file handle cache
+
+    @property
+    def payload_bytes(self) -> int:
+        # Bytes of document the request carries; none when it references an uploaded file
+        return 0 if self.file_id else len(self.data)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.payload_bytes
+
+    def report(self) -> Dict[str, Any]:
+        """Sizes and preparation time, for logs and benchmarks."""
+        return {
+            'mode': self.mode,
+            'original_bytes': self.original_bytes,
+            'payload_bytes': self.payload_bytes,
+            'bytes_saved': self.bytes_saved,
+            'saved_percent': round(100 * self.bytes_saved / max(1, self.original_bytes), 1),
+            'prepare_seconds': round(self.seconds, 4),
+            'file_id': self.file_id,
+        }
+
+    def input_content(self, filename: str) -> Dict[str, Any]:
+        """
+        Build the user message content item carrying the document.
+
+        Args:
+            filename (str): Name shown to the model for the file
+
+        Returns:
+            Dict[str, Any]: An input_file item referencing the uploaded file or carrying a base64
+                data URL, or an input_text item
+        """
+        if self.file_id:
+            return {"type": "input_file", "file_id": self.file_id}
+        if self.mode == "text":
+            return {"type": "input_text", "text": f"Document: {filename}\n\n{self.data.decode('utf-8')}"}
+        return {
+            "type": "input_file",
+            "filename": filename,
+            "file_data": f"data:application/pdf;base64,{base64.b64encode(self.data).decode('utf-8')}"
+        }
+
+
+def _downsample_images(doc, image_dpi: int, jpeg_quality: int) -> int:
+    """
+    Resample over-resolved images once each, at the resolution of their largest placement.
+    
+    Document.rewrite_images resamples an image once per page that shows it, so a logo
+    or site plan repeated across pages would lose resolution on every pass.
+    
+    Args:
+        doc: PyMuPDF document object, modified in place
+        image_dpi (int): Resolution images are downsampled to
+        jpeg_quality (int): JPEG quality of re-encoded images
+        
+    Returns:
+        int: Number of images replaced
+    """
+    placements: Dict[int, Any] = {}
+    for page in doc:
+        for info in page.get_image_info(xrefs=True):
+            xref, bbox = info['xref'], fitz.Rect(info['bbox'])
+            if xref and (xref not in placements or bbox.width > placements[xref][1].width):
+                placements[xref] = (page.number, bbox, info['width'], info['height'])
+    
+    replaced = 0
+    for xref, (page_number, bbox, width, height) in placements.items():
+        placed_dpi = max(width / max(bbox.width / 72, 1e-3), height / max(bbox.height / 72, 1e-3))
+        if placed_dpi <= SLIM_IMAGE_DPI_THRESHOLD or doc.xref_get_key(xref, "SMask")[0] != "null":
+            # Already at a sensible resolution, or transparent (JPEG has no alpha channel)
+            continue
+        scale = image_dpi / placed_dpi
+        pixmap = fitz.Pixmap(doc, xref)
+        if pixmap.colorspace is None or pixmap.colorspace.n not in (1, 3) or pixmap.alpha:
+            pixmap = fitz.Pixmap(fitz.csRGB, pixmap, 0)
+        pixmap = fitz.Pixmap(pixmap, max(1, round(width * scale)), max(1, round(height * scale)), None)
+        doc[page_number].replace_image(xref, stream=pixmap.tobytes("jpg", jpg_quality=jpeg_quality))
+        replaced += 1
+    return replaced
+
+
+def slim_pdf(pdf_source: PDFSource, image_dpi: int = SLIM_IMAGE_DPI, jpeg_quality: int = SLIM_JPEG_QUALITY) -> bytes:
+    """
+    Rewrite a PDF without the weight the model does not read.
+
+    Images above SLIM_IMAGE_DPI_THRESHOLD are downsampled, embedded fonts are subset to
+    the glyphs used, and unused or duplicate objects are dropped with compressed streams.
+
+    The file is not linearized: MuPDF no longer supports writing linearized files, and
+    linearization only helps viewers that stream a PDF over HTTP, not a request body the
+    provider receives whole.
+
+    Args:
+        pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+        image_dpi (int): Resolution images are downsampled to
+        jpeg_quality (int): JPEG quality of re-encoded images
+
+    Returns:
+        bytes: The slimmed PDF
+    """
+    doc = PDFChunker()._open_document(pdf_source)
+    try:
+        _downsample_images(doc, image_dpi, jpeg_quality)
+        doc.subset_fonts(fallback=True)
+        return doc.tobytes(garbage=3, deflate=True, deflate_images=True, deflate_fonts=True, use_objstms=1)
+    finally:
+        doc.close()
+
+
+def text_rendition(pdf_source: PDFSource) -> Optional[str]:
+    """
+    Render a PDF as the page-marked text the parser extracts, tables included.
+
+    Args:
+        pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+
+    Returns:
+        Optional[str]: Every page's text, each after a PAGE_MARKER line, or None if the pages
+            average fewer than TEXT_PAYLOAD_MIN_CHARS_PER_PAGE characters (e.g. scans)
+    """
+    pages = PDFChunker(ocr=False).parse_pdf(pdf_source)
+    if not pages or sum(len(text) for _, text in pages) / len(pages) < TEXT_PAYLOAD_MIN_CHARS_PER_PAGE:
+        return None
+    return "".join(PAGE_MARKER.format(page=page_num) + text for page_num, text in pages)
+
+
+def _prepare(original: bytes, mode: str, started: float) -> PDFPayload:
+    if mode == "text":
+        try:
+            text = text_rendition(original)
+            if text is not None:
+                return PDFPayload("text", text.encode('utf-8'), len(original), time.perf_counter() - started)
+        except Exception as e:
+            print(f"Warning: Could not build a text rendition, sending the PDF: {str(e)}")
+        mode = "slim"
+
+    if mode == "slim":
+        try:
+            slimmed = slim_pdf(original)
+            if len(slimmed) < len(original):
+                return PDFPayload("slim", slimmed, len(original), time.perf_counter() - started)
+        except Exception as e:
+            print(f"Warning: Could not slim the PDF, sending it unchanged: {str(e)}")
+
+    return PDFPayload("pdf", original, len(original), time.perf_counter() - started)
+
+
+def _read_bytes(source: Union[str, bytes, memoryview]) -> bytes:
+    """Read a source resolved by PDFChunker._resolve_source into the bytes a request carries."""
+    if isinstance(source, str):
+        with open(source, 'rb') as fp:
+            return fp.read()
+    return bytes(source)
+
+
+def prepare_pdf_payload(pdf_source: PDFSource, mode: str = "slim", file_handles: Optional[FileHandleCache] = None,
+                        filename: str = "document.pdf") -> PDFPayload:
+    """
+    Prepare a PDF for a request in the given mode.
+
+    Falls back to the original bytes when slimming fails or does not make the file
+    smaller, and from "text" to "slim" when the document has too little text.
+
+    With file_handles, a PDF payload is uploaded to the provider and referenced by file
+    id. A document uploaded before (same content and mode) is neither prepared nor
+    uploaded again while its handle is valid. Text payloads are always inlined.
+
+    Args:
+        pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+        mode (str): One of PAYLOAD_MODES
+        file_handles (Optional[FileHandleCache]): Cache of files uploaded to the provider
+        filename (str): Name the file is uploaded under
+
+    Returns:
+        PDFPayload: The payload and its size report
+
+    Raises:
+        ValueError: If mode is not a known payload mode
+    """
+    if mode not in PAYLOAD_MODES:
+        raise ValueError(f"mode must be one of {PAYLOAD_MODES}, got {mode!r}")
+
+    started = time.perf_counter()
+    chunker = PDFChunker()
+    source = chunker._resolve_source(pdf_source)
+    if file_handles is None:
+        return _prepare(_read_bytes(source), mode, started)
+
+    # Slimming is not byte-for-byte reproducible, so handles are keyed by the original
+    # document and the requested mode rather than by the uploaded bytes. The digest is
+    # streamed from disk, so a document already uploaded is never read into memory.
+    key = f"{chunker._source_digest(source)}-{mode}"
+    entry = file_handles.lookup(key)
+    if entry is not None:
+        original_bytes = os.path.getsize(source) if isinstance(source, str) else len(source)
+        return PDFPayload(entry['mode'], b"", original_bytes, time.perf_counter() - started, file_id=entry['file_id'],
+                          handle_key=key)
+
+    pdf_payload = _prepare(_read_bytes(source), mode, started)
+    if pdf_payload.mode != "text":
+        try:
+            pdf_payload.file_id = file_handles.upload(key, pdf_payload.data, filename, mode=pdf_payload.mode)
+            pdf_payload.handle_key = key
+        except Exception as e:
+            print(f"Warning: Could not upload the PDF, sending it inline: {str(e)}")
+        pdf_payload.seconds = time.perf_counter() - started
+    return pdf_payload
+
+
+def request_with_pdf(pdf_source: PDFSource, pdf_payload: PDFPayload, request: Callable[[PDFPayload], Any],
+                     file_handles: Optional[FileHandleCache] = None, mode: str = "slim",
+                     filename: str = "document.pdf") -> Tuple[PDFPayload, Any]:
+    """
+    Send a request carrying a prepared PDF, recovering once from a file the provider lost.
+
+    A handle can outlive its file when the provider expires it early or it is deleted.
+    If the request fails because the referenced file is gone, the handle is invalidated,
+    the PDF is prepared and uploaded again, and the request is retried once.
+
+    Args:
+        pdf_source: The PDF the payload was prepared from
+        pdf_payload (PDFPayload): Payload from prepare_pdf_payload
+        request (Callable[[PDFPayload], Any]): Sends the request built around a payload
+        file_handles (Optional[FileHandleCache]): Cache the payload's file id came from
+        mode (str): Mode the payload was requested in, see prepare_pdf_payload
+        filename (str): Name the file is uploaded under
+
+    Returns:
+        Tuple[PDFPayload, Any]: The payload finally sent, and the request's result
+    """
+    try:
+        return pdf_payload, request(pdf_payload)
+    except Exception as e:
+        if (pdf_payload.file_id is None or file_handles is None
+                or not file_handles.file_service.is_missing_file(e, pdf_payload.file_id)):
+            raise
+        print(f"Warning: Provider no longer has file {pdf_payload.file_id}, uploading the PDF again: {str(e)}")
+    file_handles.invalidate(pdf_payload.handle_key)
+    pdf_payload = prepare_pdf_payload(pdf_source, mode, file_handles, filename)
+    return pdf_payload, request(pdf_payload)
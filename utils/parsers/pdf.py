@@ -1,158 +1,1641 @@
+import asyncio
+import hashlib
 import io
+import json
+import math
+import os
+import pickle
+import re
 import sys
-from typing import Any, List, Dict, Tuple, Optional, Union
+import tempfile
+import threading
+from contextlib import contextmanager
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, BinaryIO, Iterable, Iterator, List, Dict, Tuple, Optional, Union
 from dataclasses import dataclass
 import fitz  # PyMuPDF
 
+from adapters.ocr.base import OCREngine
+if TYPE_CHECKING:
+    # page_store reads and writes this module's PageRecord
+    from utils.parsers.page_store import PageStore
+
+
+# Anything PDFChunker can read a PDF from. Objects exposing a ``file`` attribute,
+# such as FastAPI's UploadFile, are read through their underlying spooled file.
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, io.BytesIO, BinaryIO]
+
+
+# Bump when extraction output changes, so stored pages from older parsers are not reused
+PARSER_VERSION = 2
+# Number of documents whose table analysis is kept on a chunker instance
+TABLE_CACHE_SIZE = 4
+# Documents shorter than this are parsed serially even when workers > 1
+PARALLEL_MIN_PAGES = 32
+# Table detection modes: "auto" runs find_tables only on pages with ruling lines
+TABLE_DETECTION_MODES = ("auto", "always", "never")
+# Seconds find_tables may spend on one page, and on all pages of a document (wall clock
+# since the parse started); pages over budget keep their plain text without tables
+PAGE_TIME_BUDGET = 5.0
+DOCUMENT_TIME_BUDGET = 120.0
+# Measured find_tables cost per vector drawing item (line, rectangle, curve), used to
+# predict a page's detection time before running it; find_tables cannot be interrupted
+TABLE_SECONDS_PER_DRAWING_ITEM = 0.0002
+# Pages with less text than this whose images cover OCR_MIN_IMAGE_COVERAGE of the page are OCR'd
+OCR_MIN_TEXT_CHARS = 20
+OCR_MIN_IMAGE_COVERAGE = 0.5
+# Resolution pages are rendered at for OCR
+OCR_DPI = 300
+# Pages OCR'd concurrently per document
+OCR_WORKERS = 2
+# OCR text per rendered page, keyed by engine and the SHA-256 of the page image
+OCR_CACHE_DIR = "./cached_ocr"
+# A table continues on the next page if the column count matches, it resumes near the top
+# of the page, and either the header row repeats (share of equal cells) or it ended near
+# the bottom of the previous page
+TABLE_HEADER_SIMILARITY = 0.8
+TABLE_CONTINUATION_MARGIN = 0.2
+# Running headers and footers: lines in the top or bottom BOILERPLATE_MARGIN of the page
+# whose normalized text repeats at the same height (within BOILERPLATE_POSITION_TOLERANCE
+# points) on BOILERPLATE_MIN_PAGES pages and BOILERPLATE_MIN_SHARE of the first
+# BOILERPLATE_SAMPLE_PAGES pages are stripped from prompt text. Lines inside tables never are.
+BOILERPLATE_MARGIN = 0.12
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MIN_SHARE = 0.5
+BOILERPLATE_SAMPLE_PAGES = 8
+BOILERPLATE_POSITION_TOLERANCE = 4.0
+# Page number tokens, the only numbers folded when matching boilerplate lines: "Page 3",
+# "Page 3 of 40", "pg. 3/40", or a line holding nothing but a page number such as "- 3 -"
+_PAGE_NUMBER_TOKEN = re.compile(r'\b(?:page|pg\.?)\s*\d+(?:\s*(?:of|/)\s*\d+)?\b')
+_PAGE_NUMBER_LINE = re.compile(r'[-–—\s]*\d+(?:\s*(?:of|/)\s*\d+)?[-–—\s]*')
+# An indirect reference in PDF object source, "12 0 R"
+_PDF_REFERENCE = re.compile(r'\b(\d+) \d+ R\b')
+# Table serializations: "legacy" is the original banner format with Row N: prefixes
+TABLE_FORMATS = ("markdown", "tsv", "json", "legacy")
+# Chunking strategies: "page" makes one chunk per page, "tokens" packs pages into a token budget
+CHUNKING_MODES = ("page", "tokens")
+# Default token budget of a chunk in "tokens" mode, overlaps not included
+MAX_CHUNK_TOKENS = 6000
+# Average characters per token of English lease text, used by estimate_tokens
+CHARS_PER_TOKEN = 4
+# Header put before each page's text inside a token-budget chunk
+PAGE_MARKER = "--- Page {page} ---\n"
+# Paragraph segmentation: a line starts a new paragraph after a vertical gap larger than
+# PARAGRAPH_LINE_GAP line heights, a font size change, or, when the previous line ends a
+# sentence, a first-line indent of PARAGRAPH_INDENT points or a previous line that stopped
+# short of PARAGRAPH_SHORT_LINE of the paragraph width
+PARAGRAPH_LINE_GAP = 0.5
+PARAGRAPH_INDENT = 8.0
+PARAGRAPH_SHORT_LINE = 0.8
+PARAGRAPH_END_CHARS = ('.', ':', ';', '!', '?')
+# Pages preflight samples, spread evenly over the document
+PREFLIGHT_SAMPLE_PAGES = 8
+# Preflight latency model: fixed find_tables cost of a table page (on top of its drawing
+# items) and OCR cost of an image-only page
+PREFLIGHT_TABLE_PAGE_SECONDS = 0.1
+PREFLIGHT_OCR_PAGE_SECONDS = 3.0
+# Where oversized pages are split, best first: paragraph or table breaks, sentence ends, lines, words
+SPLIT_BOUNDARIES = ("\n\n", ".\n", "\n", " ")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many LLM tokens a text costs.
+    
+    Args:
+        text (str): The text
+        
+    Returns:
+        int: Estimated token count
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class DocumentText:
+    """Shared per-document buffer that holds each page's text exactly once."""
+    __slots__ = ('pages', 'page_numbers', 'boilerplate')
+    
+    def __init__(self, pages: Optional[List[str]] = None, page_numbers: Optional[List[int]] = None,
+                 boilerplate: Optional[Dict[int, List[Tuple[int, str]]]] = None):
+        self.pages: List[str] = pages if pages is not None else []
+        self.page_numbers: List[int] = page_numbers if page_numbers is not None else []
+        # Lines stripped from each page as (offset in the stripped page text, line)
+        self.boilerplate: Dict[int, List[Tuple[int, str]]] = boilerplate if boilerplate is not None else {}
+    
+    def append(self, page_number: int, text: str) -> int:
+        """Add a page and return its index in the buffer."""
+        self.pages.append(text)
+        self.page_numbers.append(page_number)
+        return len(self.pages) - 1
+    
+    def __getstate__(self):
+        return {'pages': self.pages, 'page_numbers': self.page_numbers, 'boilerplate': self.boilerplate}
+    
+    def __setstate__(self, state):
+        self.pages = state['pages']
+        self.page_numbers = state['page_numbers']
+        self.boilerplate = state.get('boilerplate', {})
+
 
-@dataclass
 class PDFChunk:
-    """Represents a chunk of PDF content with associated metadata."""
+    """
+    Represents a chunk of PDF content with associated metadata.
+    
+    Page text lives once in a DocumentText shared by all chunks of a document;
+    overlaps are stored as character counts and sliced from the neighbouring
+    pages on access, so neither memory nor the pickle cache holds them twice.
+    """
+    __slots__ = ('page_number', 'chunk_id', 'overlap_info', '_document', '_index', '_previous_chars', '_next_chars')
+    
+    def __init__(self, page_number: int, chunk_id: int, overlap_info: Dict[str, Any], original_page_text: str,
+                 previous_overlap: Optional[str] = None, next_overlap: Optional[str] = None):
+        # Standalone chunk: keep the overlaps as neighbour "pages" of a private buffer
+        document = DocumentText([previous_overlap or '', original_page_text, next_overlap or ''])
+        self._link(page_number, chunk_id, overlap_info, document, 1,
+                   None if previous_overlap is None else len(previous_overlap),
+                   None if next_overlap is None else len(next_overlap))
+    
+    @classmethod
+    def from_document(cls, document: DocumentText, index: int, chunk_id: int, overlap_info: Dict[str, Any],
+                      previous_chars: Optional[int], next_chars: Optional[int]) -> 'PDFChunk':
+        """
+        Create a chunk that references page text in a shared document buffer.
+        
+        Args:
+            document (DocumentText): Buffer holding the document's page text
+            index (int): Index of the chunk's page in the buffer
+            chunk_id (int): 1-based chunk id
+            overlap_info (Dict[str, Any]): Overlap metadata
+            previous_chars (Optional[int]): Characters taken from the end of the previous page, None for no overlap
+            next_chars (Optional[int]): Characters taken from the start of the next page, None for no overlap
+            
+        Returns:
+            PDFChunk: The chunk
+        """
+        chunk = cls.__new__(cls)
+        chunk._link(document.page_numbers[index], chunk_id, overlap_info, document, index, previous_chars, next_chars)
+        return chunk
+    
+    def _link(self, page_number, chunk_id, overlap_info, document, index, previous_chars, next_chars):
+        self.page_number = page_number
+        self.chunk_id = chunk_id
+        self.overlap_info = overlap_info
+        self._document = document
+        self._index = index
+        self._previous_chars = previous_chars
+        self._next_chars = next_chars
+    
+    @property
+    def original_page_text(self) -> str:
+        """The original page text without overlaps."""
+        return self._document.pages[self._index]
+    
+    @property
+    def source_text(self) -> str:
+        """The chunk text with stripped header and footer lines put back, for citation lookup."""
+        text = self.original_page_text
+        removed = self._document.boilerplate
+        if not removed:
+            return text
+        spans = self.overlap_info.get('spans') or [{'page': self.page_number, 'start': 0, 'end': len(text), 'offset': 0}]
+        parts = []
+        position = 0
+        for span in spans:
+            parts.append(text[position:span['start']])
+            parts.append(_restore_lines(text[span['start']:span['end']], removed.get(span['page'], []),
+                                        span.get('offset', 0)))
+            position = span['end']
+        parts.append(text[position:])
+        return "".join(parts)
+    
+    @property
+    def boilerplate(self) -> Dict[int, List[Tuple[int, str]]]:
+        """Header and footer lines stripped from the document's pages, by page number."""
+        return self._document.boilerplate
+    
+    @property
+    def page_numbers(self) -> List[int]:
+        """Pages covered by the chunk; several for a merged token-budget chunk."""
+        return self.overlap_info.get('pages') or [self.page_number]
+    
+    @property
+    def previous_overlap(self) -> Optional[str]:
+        """Overlap text from the previous chunk."""
+        if self._previous_chars is None:
+            return None
+        previous_text = self._document.pages[self._index - 1]
+        return previous_text[len(previous_text) - self._previous_chars:]
+    
+    @property
+    def next_overlap(self) -> Optional[str]:
+        """Overlap text from the next chunk."""
+        if self._next_chars is None:
+            return None
+        return self._document.pages[self._index + 1][:self._next_chars]
+    
+    def _fields(self) -> Tuple:
+        return (self.page_number, self.chunk_id, self.overlap_info, self.original_page_text,
+                self.previous_overlap, self.next_overlap)
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PDFChunk):
+            return NotImplemented
+        return self._fields() == other._fields()
+    
+    def __repr__(self) -> str:
+        return (f"PDFChunk(page_number={self.page_number!r}, chunk_id={self.chunk_id!r}, "
+                f"overlap_info={self.overlap_info!r}, original_page_text={self.original_page_text!r}, "
+                f"previous_overlap={self.previous_overlap!r}, next_overlap={self.next_overlap!r})")
+    
+    def __getstate__(self):
+        # Chunks of one document share a DocumentText, which pickle stores only once
+        return {
+            'page_number': self.page_number,
+            'chunk_id': self.chunk_id,
+            'overlap_info': self.overlap_info,
+            'document': self._document,
+            'index': self._index,
+            'previous_chars': self._previous_chars,
+            'next_chars': self._next_chars,
+        }
+    
+    def __setstate__(self, state):
+        if 'original_page_text' in state:
+            # Cache entry written by the old dataclass version of PDFChunk
+            self.__init__(**state)
+            return
+        self._link(state['page_number'], state['chunk_id'], state['overlap_info'], state['document'],
+                   state['index'], state['previous_chars'], state['next_chars'])
+
+
+def _restore_lines(text: str, removed: List[Tuple[int, str]], offset: int = 0) -> str:
+    """
+    Put stripped lines back into a piece of page text.
+    
+    Args:
+        text (str): Stripped text of the page, or of the part starting at offset
+        removed (List[Tuple[int, str]]): (offset in the stripped page text, line) pairs
+        offset (int): Where text starts in the stripped page text
+        
+    Returns:
+        str: The text as it was before stripping
+    """
+    end = offset + len(text)
+    parts = []
+    position = offset
+    for at, line in removed:
+        # A line at a piece boundary belongs to the earlier piece; one at 0 to the first
+        if offset < at <= end or at == offset == 0:
+            parts.append(text[position - offset:at - offset])
+            parts.append(line)
+            position = at
+    parts.append(text[position - offset:])
+    return "".join(parts)
+
+
+def load_chunks(file_obj: BinaryIO) -> List[PDFChunk]:
+    """
+    Load pickled chunks, upgrading entries written by the old dataclass PDFChunk.
+    
+    Old entries carry a private copy of every overlap; they are relinked into one
+    shared DocumentText so they take the same memory as freshly parsed chunks.
+    
+    Args:
+        file_obj (BinaryIO): Open pickle file
+        
+    Returns:
+        List[PDFChunk]: The chunks
+    """
+    chunks = pickle.load(file_obj)
+    if chunks and any(chunk._document is not chunks[0]._document for chunk in chunks):
+        chunks = _relink_chunks(chunks)
+    return chunks
+
+
+def chunk_pages(chunks: List[PDFChunk]) -> List[Tuple[int, str]]:
+    """
+    Recover the (page_number, text) pages that a list of chunks was built from.
+    
+    Works for both chunking modes: token-budget chunks record where each page's
+    text sits in the chunk, so split pages are joined back together.
+    
+    Args:
+        chunks (List[PDFChunk]): Chunks of one document, in order
+        
+    Returns:
+        List[Tuple[int, str]]: (page_number, text) tuples in page order
+    """
+    pages: Dict[int, str] = {}
+    for chunk in chunks:
+        spans = chunk.overlap_info.get('spans')
+        if not spans:
+            pages[chunk.page_number] = chunk.original_page_text
+            continue
+        text = chunk.original_page_text
+        for span in spans:
+            pages[span['page']] = pages.get(span['page'], '') + text[span['start']:span['end']]
+    return sorted(pages.items())
+
+
+def chunk_table_budget(chunks: List[PDFChunk]) -> Dict[int, str]:
+    """
+    Recover which pages of a list of chunks exceeded a table detection budget.
+    
+    Args:
+        chunks (List[PDFChunk]): Chunks of one document, in order
+        
+    Returns:
+        Dict[int, str]: Budget exceeded per page number, as in PDFChunker.table_budget_pages
+    """
+    return {page: reason for chunk in chunks
+            for page, reason in chunk.overlap_info.get('table_budget_exceeded', {}).items()}
+
+
+def _relink_chunks(chunks: List[PDFChunk]) -> List[PDFChunk]:
+    """Rebuild standalone chunks on one shared DocumentText, keeping any overlap that doesn't match a neighbour."""
+    document = DocumentText([chunk.original_page_text for chunk in chunks], [chunk.page_number for chunk in chunks])
+    relinked = []
+    for index, chunk in enumerate(chunks):
+        previous_overlap, next_overlap = chunk.previous_overlap, chunk.next_overlap
+        previous_ok = previous_overlap is None or (index > 0 and document.pages[index - 1].endswith(previous_overlap))
+        next_ok = next_overlap is None or (index < len(chunks) - 1 and document.pages[index + 1].startswith(next_overlap))
+        if not (previous_ok and next_ok):
+            relinked.append(chunk)
+            continue
+        relinked.append(PDFChunk.from_document(
+            document, index, chunk.chunk_id, chunk.overlap_info,
+            None if previous_overlap is None else len(previous_overlap),
+            None if next_overlap is None else len(next_overlap)
+        ))
+    return relinked
+
+
+@dataclass
+class PageTable:
+    """A table found on a page, with its cells extracted once."""
+    index: int  # 1-based position of the table on its page
+    bbox: Tuple[float, float, float, float]
+    rows: List[List[Optional[str]]]
+    text_outside: Optional[str] = None  # Page text without this table's lines; set for the topmost table
+
+
+
+@dataclass
+class PageRecord:
+    """Raw extraction result for one page, before tables are reconciled across pages."""
     page_number: int
-    chunk_id: int
-    overlap_info: Dict[str, Any]
-    original_page_text: str  # Store the original page text without overlaps
-    previous_overlap: Optional[str] = None  # Overlap text from previous chunk
-    next_overlap: Optional[str] = None  # Overlap text from next chunk
+    text: str
+    height: float
+    tables: Optional[List[PageTable]] = None
+    table_detection_skipped: bool = False  # True when the prefilter ruled out tables
+    ocr_image: Optional[bytes] = None  # PNG render of an image-only page, pending OCR
+    ocr: bool = False  # True when text came from OCR
+    text_seconds: float = 0.0  # Time spent in get_text
+    margin_lines: Optional[List[Tuple[str, str, Tuple[float, float, float, float]]]] = None  # (zone, line, bbox) header/footer candidates
+    page_hash: Optional[str] = None  # Content hash, set when a page store is used
+    from_store: bool = False  # True when the record was reused from the page store
+    table_seconds: float = 0.0  # Time spent deciding on and running find_tables
+    table_budget_exceeded: Optional[str] = None  # "page_drawings" | "document_time" | "page_time"
+
+
+def _paragraph_page_range(pdf_path: str, start: int, end: int, settings: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """Worker entry point: segment pages [start, end) of a PDF on disk into paragraphs."""
+    chunker = PDFChunker(**settings)
+    doc = fitz.open(pdf_path)
+    try:
+        return chunker._read_paragraphs(doc, start, end)
+    finally:
+        doc.close()
+
+
+def _parse_page_range(pdf_path: str, start: int, end: int, extract_tables: bool,
+                      settings: Dict[str, Any], table_deadline: Optional[float] = None) -> List[PageRecord]:
+    """Worker entry point: read pages [start, end) of a PDF on disk."""
+    chunker = PDFChunker(**settings)
+    chunker._table_deadline = table_deadline
+    doc = fitz.open(pdf_path)
+    try:
+        return chunker._read_pages(doc, start, end, extract_tables)
+    finally:
+        doc.close()
 
 
 class PDFChunker:
     """Main class for parsing and chunking PDF files."""
     
-    def __init__(self, overlap_percentage: float = 0.2):
+    def __init__(self, overlap_percentage: float = 0.2, workers: int = 1,
+                 parallel_min_pages: int = PARALLEL_MIN_PAGES, table_detection: str = "auto",
+                 chunking: str = "page", max_chunk_tokens: int = MAX_CHUNK_TOKENS,
+                 ocr: bool = True, ocr_engine: Optional[OCREngine] = None, ocr_workers: int = OCR_WORKERS,
+                 strip_boilerplate: bool = True, page_store: Optional['PageStore'] = None,
+                 table_format: str = "markdown", page_time_budget: Optional[float] = PAGE_TIME_BUDGET,
+                 document_time_budget: Optional[float] = DOCUMENT_TIME_BUDGET, paragraph_breaks: bool = False):
+        """
+        Initialize the PDF chunker.
+        
+        Args:
+            overlap_percentage (float): Percentage of overlap between chunks (default: 0.2 for 20%)
+            workers (int): Worker processes used to parse page ranges in parallel (default: 1, serial)
+            parallel_min_pages (int): Documents with fewer pages are always parsed serially
+            table_detection (str): "auto" runs find_tables only on pages whose vector graphics
+                could form a table, "always" runs it on every page, "never" skips it
+            chunking (str): "page" makes one chunk per page, "tokens" merges short consecutive
+                pages and splits oversized pages so each chunk fits max_chunk_tokens
+            max_chunk_tokens (int): Token budget of a chunk in "tokens" mode, overlaps not included
+            ocr (bool): Run OCR on image-only pages; pages with extractable text never are
+            ocr_engine (Optional[OCREngine]): OCR backend; without one, OCR is off and image-only
+                pages come back empty (default: None)
+            ocr_workers (int): Pages OCR'd concurrently
+            strip_boilerplate (bool): Remove running headers, footers and page numbers from the page
+                text; chunk.source_text keeps the original for citations
+            page_store (Optional[PageStore]): Store of extracted pages keyed by content hash; pages
+                already in it are reused instead of extracted again
+            table_format (str): How tables are written into page text: "markdown", "tsv",
+                "json" (compact rows) or "legacy"; see table_format_costs for their token cost
+            page_time_budget (Optional[float]): Seconds table detection may take on one page; pages
+                predicted to take longer from their drawing count are not searched for tables
+                (None: no limit)
+            document_time_budget (Optional[float]): Seconds after which the remaining pages of a
+                document are not searched for tables (None: no limit)
+            paragraph_breaks (bool): Put a blank line between the paragraphs found by layout
+                segmentation, so token chunking splits pages on paragraph boundaries
+                
+        Raises:
+            ValueError: If table_detection, chunking or table_format is not a known mode
+        """
+        if table_detection not in TABLE_DETECTION_MODES:
+            raise ValueError(f"table_detection must be one of {TABLE_DETECTION_MODES}, got {table_detection!r}")
+        if chunking not in CHUNKING_MODES:
+            raise ValueError(f"chunking must be one of {CHUNKING_MODES}, got {chunking!r}")
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"table_format must be one of {TABLE_FORMATS}, got {table_format!r}")
+        
+        self.overlap_percentage = overlap_percentage
+        self.workers = max(1, workers)
+        self.parallel_min_pages = parallel_min_pages
+        self.table_detection = table_detection
+        self.chunking = chunking
+        self.max_chunk_tokens = max_chunk_tokens
+        self.ocr = ocr and ocr_engine is not None
+        self.ocr_engine = ocr_engine
+        self.ocr_workers = max(1, ocr_workers)
+        self.strip_boilerplate = strip_boilerplate
+        self.page_store = page_store
+        self.table_format = table_format
+        self.page_time_budget = page_time_budget
+        self.document_time_budget = document_time_budget
+        self.paragraph_breaks = paragraph_breaks
+        # Lines and characters stripped as boilerplate during the most recent parse
+        self.boilerplate_report: Dict[str, Any] = {}
+        # Counters from the most recent parse, e.g. how many pages the table prefilter skipped
+        self.parse_stats: Dict[str, int] = {}
+        # Time spent in get_text and in table detection during the most recent parse
+        self.parse_timings: Dict[str, float] = {}
+        # Pages of the most recent parse whose tables were skipped or slow, with the budget
+        # they exceeded, as in PageRecord.table_budget_exceeded
+        self.table_budget_pages: Dict[int, str] = {}
+        # time.time() after which table detection stops for the document being parsed
+        self._table_deadline: Optional[float] = None
+        # Per-document table analysis keyed by the SHA-256 of the PDF bytes and the
+        # detection mode, so parse_pdf and get_table_info never run find_tables twice
+        self._table_cache: Dict[str, Dict[int, Optional[List[PageTable]]]] = {}
+        
+    def parse_pdf(self, pdf_source: PDFSource, extract_tables: bool = True) -> List[Tuple[int, str]]:
+        """
+        Parse a PDF file and extract text with page references.
+        
+        Args:
+            pdf_source: Can be:
+                - str / os.PathLike: Path to the PDF file
+                - bytes / bytearray / memoryview: PDF file content, read without copying
+                - io.BytesIO: PDF file as BytesIO object
+                - file object or UploadFile: read via its buffer or a memory map, without copying
+            extract_tables (bool): Whether to extract tables with proper formatting
+            
+        Returns:
+            List[Tuple[int, str]]: List of tuples containing (page_number, text)
+            
+        Raises:
+            ValueError: If the PDF source is invalid
+            Exception: If there's an error parsing the PDF
+        """
+        try:
+            cache_key = self._table_cache_key(pdf_source) if extract_tables else None
+            cached_tables = self._table_cache.get(cache_key) if extract_tables else None
+            
+            doc = self._open_document(pdf_source)
+            page_count = len(doc)
+            find_tables = extract_tables and cached_tables is None
+            self._start_table_budget()
+            
+            if self.workers > 1 and page_count >= self.parallel_min_pages:
+                doc.close()
+                records = self._read_pages_parallel(pdf_source, page_count, find_tables)
+            else:
+                records = self._read_pages(doc, 0, page_count, find_tables)
+                doc.close()
+            
+            self._apply_ocr(records)
+            self._store_pages(records, find_tables)
+            self._evict_page_store()
+            self._reset_parse_stats()
+            for record in records:
+                self._count_page(record)
+            
+            if not extract_tables:
+                patterns = self._find_boilerplate(records[:BOILERPLATE_SAMPLE_PAGES])
+                return [(record.page_number, self._strip_page_boilerplate(record, record.text, patterns))
+                        for record in records]
+            
+            # Tables were found once per page; tracking and text building share the result
+            if cached_tables is None:
+                page_tables = {record.page_number: record.tables for record in records}
+                if not self.table_budget_pages:
+                    self._cache_page_tables(cache_key, page_tables)
+            else:
+                page_tables = cached_tables
+                # Boilerplate matching skips lines inside tables, so cached tables go on the records
+                for record in records:
+                    record.tables = page_tables.get(record.page_number)
+            patterns = self._find_boilerplate(records[:BOILERPLATE_SAMPLE_PAGES])
+            
+            page_heights = {record.page_number: record.height for record in records}
+            table_tracker = self._analyze_multi_page_tables(page_tables, page_heights)
+            
+            pages_data = []
+            for record in records:
+                text = self._extract_text_with_tables_and_tracking(
+                    record.text, record.page_number, table_tracker, page_tables.get(record.page_number)
+                )
+                pages_data.append((record.page_number, self._strip_page_boilerplate(record, text, patterns)))
+            
+            return pages_data
+            
+        except Exception as e:
+            raise Exception(f"Error parsing PDF: {str(e)}")
+    
+    def _read_pages(self, doc, start: int, end: int, extract_tables: bool) -> List[PageRecord]:
+        """
+        Extract the text, and optionally the tables, of pages [start, end).
+        
+        Args:
+            doc: PyMuPDF document object
+            start (int): First page index (0-based)
+            end (int): Page index to stop before
+            extract_tables (bool): Whether to run table detection
+            
+        Returns:
+            List[PageRecord]: One record per page, in page order
+        """
+        records = []
+        # Object digests shared by the pages' hashes
+        hash_memo: Dict[int, str] = {}
+        for page_num in range(start, end):
+            page = doc.load_page(page_num)
+            page_hash = None
+            if self.page_store is not None:
+                page_hash = self._page_hash(doc, page, hash_memo)
+                stored = self.page_store.get(self._page_store_key(page_hash, extract_tables))
+                if stored is not None:
+                    stored.page_number = page_num + 1
+                    stored.from_store = True
+                    records.append(stored)
+                    continue
+            
+            started = time.perf_counter()
+            # Layout analysis runs once per page: the page text, the margin blocks and the
+            # text around a table are all read from this TextPage
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            text = self._paragraph_text(textpage) if self.paragraph_breaks else page.get_text(textpage=textpage)
+            margin_lines = self._margin_lines(page, textpage) if self.strip_boilerplate else None
+            text_seconds = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            # The budget and the prefilter count drawings cheaply; full drawings are only built by
+            # find_tables, on the pages it runs on
+            tables, detect_tables, budget_exceeded = None, False, None
+            if extract_tables:
+                drawings = self._page_drawings(page)
+                detect_tables, budget_exceeded = self._should_detect_tables(page, drawings)
+                tables = self._find_page_tables(page, textpage) if detect_tables else []
+            table_seconds = time.perf_counter() - started
+            if detect_tables and self.page_time_budget is not None and table_seconds > self.page_time_budget:
+                # Already spent: the tables are kept, but the page is flagged as slow
+                budget_exceeded = "page_time"
+            
+            records.append(PageRecord(
+                page_number=page_num + 1,  # Page numbers start from 1
+                text=text,
+                height=page.rect.height,
+                tables=tables,
+                table_detection_skipped=extract_tables and not detect_tables,
+                ocr_image=self._render_for_ocr(page, text),
+                margin_lines=margin_lines,
+                page_hash=page_hash,
+                text_seconds=text_seconds,
+                table_seconds=table_seconds,
+                table_budget_exceeded=budget_exceeded
+            ))
+        return records
+    
+    def _page_hash(self, doc, page, memo: Optional[Dict[int, str]] = None) -> str:
+        """
+        Hash what a page's extraction depends on: its page box, content stream and the resources
+        and annotations it uses.
+        
+        Args:
+            doc: PyMuPDF document object
+            page: PyMuPDF page object
+            memo (Optional[Dict[int, str]]): Digests of the document's objects by object number,
+                shared across its pages so fonts and images are hashed once per document
+            
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        memo = {} if memo is None else memo
+        digest = hashlib.sha256()
+        digest.update(repr(tuple(page.rect)).encode())
+        digest.update(page.read_contents())
+        # Resources may be inherited from the page tree
+        xref, resources = page.xref, ('null', 'null')
+        while xref and resources[0] == 'null':
+            resources = doc.xref_get_key(xref, "Resources")
+            parent = doc.xref_get_key(xref, "Parent")
+            xref = int(parent[1].split()[0]) if parent[0] == 'xref' else 0
+        digest.update(self._hash_objects(doc, resources[1], memo).encode())
+        digest.update(self._hash_objects(doc, doc.xref_get_key(page.xref, "Annots")[1], memo).encode())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _hash_objects(doc, source: str, memo: Dict[int, str]) -> str:
+        """
+        Hash a PDF object's source and every object and stream it references.
+        
+        Form XObjects, fonts, images and annotation appearances are all reached this way.
+        An object's digest covers its source with references replaced by the digests of
+        the objects they point to, so the same page keeps its hash when another document
+        numbers its objects differently. The graph is walked with an explicit stack, since
+        PDF object graphs can be arbitrarily deep; a reference back to an object still being
+        hashed is hashed as its distance up the stack.
+        
+        Args:
+            doc: PyMuPDF document object
+            source (str): PDF source of the object, e.g. a resource dictionary
+            memo (Dict[int, str]): Digests of objects already hashed, by object number; objects
+                on a reference cycle are only memoized from the object the cycle was entered at
+            
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        def frame(xref: Optional[int], source: str) -> list:
+            digest = hashlib.sha256(_PDF_REFERENCE.sub("R", source).encode())
+            references = iter([int(match.group(1)) for match in _PDF_REFERENCE.finditer(source)])
+            # Object number, pending references, digest, stack depth, shallowest object referenced back
+            return [xref, references, digest, len(stack), len(stack)]
+        
+        stack: List[list] = []
+        stack.append(frame(None, source))
+        depths: Dict[int, int] = {}
+        while True:
+            xref, references, digest, depth, reached = stack[-1]
+            child = next(references, None)
+            if child is None:
+                stack.pop()
+                if xref is not None:
+                    del depths[xref]
+                    if doc.xref_is_stream(xref):
+                        digest.update(doc.xref_stream_raw(xref) or b'')
+                value = digest.hexdigest()
+                if not stack:
+                    return value
+                if xref is not None and reached >= depth:
+                    memo[xref] = value
+                stack[-1][2].update(value.encode())
+                stack[-1][4] = min(stack[-1][4], reached)
+            elif child in memo:
+                digest.update(memo[child].encode())
+            elif child in depths:
+                digest.update(f"@{depth - depths[child]}".encode())
+                stack[-1][4] = min(reached, depths[child])
+            elif not 0 < child < doc.xref_length() or doc.xref_get_key(child, "Type")[1] in ("/Page", "/Pages"):
+                # Annotations reference their page; the page tree is not part of a page's content
+                digest.update(b"-")
+            else:
+                depths[child] = len(stack)
+                stack.append(frame(child, doc.xref_object(child, compressed=True)))
+    
+    def _page_store_key(self, page_hash: str, extract_tables: bool) -> str:
+        """Page store key: the page hash plus every setting that changes the extracted record."""
+        settings = [f"v{PARSER_VERSION}", self.table_detection if extract_tables else "text"]
+        if self.ocr:
+            settings.append(self.ocr_engine.name)
+        if self.strip_boilerplate:
+            settings.append("margins")
+        if self.paragraph_breaks:
+            settings.append("paragraphs")
+        return f"{page_hash}-{'-'.join(settings)}"
+    
+    def _store_pages(self, records: List[PageRecord], extract_tables: bool):
+        """
+        Save newly extracted page records to the page store.
+        
+        Args:
+            records (List[PageRecord]): Records after OCR
+            extract_tables (bool): Whether table detection ran for them
+        """
+        if self.page_store is None:
+            return
+        for record in records:
+            if record.page_hash is None or record.from_store:
+                continue
+            if record.table_budget_exceeded == "document_time":
+                # Tables were skipped for lack of time, not because of the page's content
+                continue
+            try:
+                self.page_store.put(self._page_store_key(record.page_hash, extract_tables), record)
+            except Exception as e:
+                print(f"Warning: Could not store page {record.page_number}: {str(e)}")
+    
+    def _evict_page_store(self):
+        """Keep the page store within its bounds once a document's pages are stored."""
+        if self.page_store is None:
+            return
+        try:
+            self.page_store.evict()
+        except Exception as e:
+            print(f"Warning: Could not evict page store entries: {str(e)}")
+    
+    def _margin_lines(self, page, textpage=None) -> List[Tuple[str, str, Tuple[float, float, float, float]]]:
+        """
+        Collect the lines in a page's top and bottom margins, where running headers and footers sit.
+        
+        Args:
+            page: PyMuPDF page object
+            textpage: TextPage already extracted for the page, if any
+            
+        Returns:
+            List[Tuple[str, str, Tuple[float, float, float, float]]]: ("top" | "bottom", line, bbox)
+                triples, lines as page.get_text() prints them
+        """
+        height = page.rect.height
+        lines = []
+        try:
+            textpage = textpage or page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            for block in textpage.extractDICT()["blocks"]:
+                # Whole blocks only, so a body paragraph running into the margin is never a candidate
+                if block["type"] != 0:
+                    continue
+                if block["bbox"][3] <= height * BOILERPLATE_MARGIN:
+                    zone = "top"
+                elif block["bbox"][1] >= height * (1 - BOILERPLATE_MARGIN):
+                    zone = "bottom"
+                else:
+                    continue
+                for line in block["lines"]:
+                    text = "".join(span["text"] for span in line["spans"])
+                    if text.strip():
+                        lines.append((zone, text, tuple(line["bbox"])))
+        except Exception as e:
+            print(f"Warning: Could not read margins of page {page.number + 1}: {str(e)}")
+        return lines
+    
+    @staticmethod
+    def _normalize_line(line: str) -> str:
+        """
+        Normalize a line for boilerplate matching: case, page numbers, underscores and spacing.
+        
+        Other numbers are kept, so rows of a schedule that repeat in the margins of
+        consecutive pages ("Month 41 $10,000.00") never match each other.
+        """
+        line = " ".join(re.sub(r'_+', '_', line.lower()).split())
+        if _PAGE_NUMBER_LINE.fullmatch(line):
+            return re.sub(r'\d+', '#', line)
+        return _PAGE_NUMBER_TOKEN.sub(lambda match: re.sub(r'\d+', '#', match.group(0)), line)
+    
+    def _boilerplate_candidates(self, record: PageRecord) -> Iterator[Tuple[Tuple[str, int, str], str]]:
+        """
+        Yield the margin lines of a page that may be boilerplate, with their matching key.
+        
+        Args:
+            record (PageRecord): The page's record, with its margin lines and tables
+            
+        Yields:
+            Tuple[Tuple[str, int, str], str]: (zone, height bucket, normalized line) and the line;
+                the height is measured from the nearer page edge, so footers match on pages of
+                different sizes
+        """
+        table_rects = [fitz.Rect(table.bbox) for table in record.tables or []]
+        for zone, line, bbox in record.margin_lines or []:
+            line_rect = fitz.Rect(bbox)
+            center = fitz.Point((line_rect.x0 + line_rect.x1) / 2, (line_rect.y0 + line_rect.y1) / 2)
+            if any(center in table_rect for table_rect in table_rects):
+                continue
+            offset = line_rect.y0 if zone == "top" else record.height - line_rect.y1
+            yield (zone, round(offset / BOILERPLATE_POSITION_TOLERANCE), self._normalize_line(line)), line
+    
+    def _find_boilerplate(self, records: List[PageRecord]) -> set:
+        """
+        Find the margin lines repeated across pages.
+        
+        Args:
+            records (List[PageRecord]): Sample of page records, from the start of the document
+            
+        Returns:
+            set: (zone, height bucket, normalized line) keys to strip, see _boilerplate_candidates
+        """
+        self.boilerplate_report = {'patterns': [], 'lines_removed': 0, 'chars_saved': 0, 'tokens_saved': 0,
+                                   'removed': {}}
+        if not self.strip_boilerplate:
+            return set()
+        
+        page_counts = Counter()
+        for record in records:
+            page_counts.update({key for key, _ in self._boilerplate_candidates(record)})
+        min_pages = max(BOILERPLATE_MIN_PAGES, math.ceil(len(records) * BOILERPLATE_MIN_SHARE))
+        patterns = {key for key, count in page_counts.items() if count >= min_pages and key[2]}
+        self.boilerplate_report['patterns'] = sorted({f"{zone}: {line}" for zone, _, line in patterns})
+        return patterns
+    
+    def _strip_page_boilerplate(self, record: PageRecord, text: str, patterns: set) -> str:
+        """
+        Remove a page's boilerplate margin lines from its text.
+        
+        Each removed line is recorded with its offset in the stripped text so the
+        original can be rebuilt for citations.
+        
+        Args:
+            record (PageRecord): The page's record, with its margin lines
+            text (str): Page text, tables included
+            patterns (set): Keys from _find_boilerplate
+            
+        Returns:
+            str: Page text without the boilerplate lines
+        """
+        to_remove = Counter(line for key, line in self._boilerplate_candidates(record) if key in patterns)
+        if not to_remove:
+            return text
+        
+        kept = []
+        removed = []
+        length = 0
+        for line in re.findall(r'[^\n]*\n|[^\n]+', text):
+            content = line.rstrip("\n")
+            if to_remove[content] > 0:
+                to_remove[content] -= 1
+                removed.append((length, line))
+                continue
+            kept.append(line)
+            length += len(line)
+        
+        if removed:
+            self.boilerplate_report['removed'][record.page_number] = removed
+            self.boilerplate_report['lines_removed'] += len(removed)
+            self.boilerplate_report['chars_saved'] += sum(len(line) for _, line in removed)
+            self.boilerplate_report['tokens_saved'] += sum(estimate_tokens(line) for _, line in removed)
+        return "".join(kept)
+    
+    def _render_for_ocr(self, page, text: str) -> Optional[bytes]:
+        """
+        Render a page for OCR if it is image-only, i.e. a scan without a text layer.
+        
+        Args:
+            page: PyMuPDF page object
+            text (str): Text already extracted from the page
+            
+        Returns:
+            Optional[bytes]: Grayscale PNG of the page, or None if the page needs no OCR
+        """
+        if not self.ocr:
+            return None
+        try:
+            if not self._is_image_only(page, text):
+                return None
+            return page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY).tobytes("png")
+        except Exception as e:
+            print(f"Warning: Could not render page {page.number + 1} for OCR: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _is_image_only(page, text: str) -> bool:
+        """
+        Check whether a page is a scan: almost no text, and images covering most of it.
+        
+        Args:
+            page: PyMuPDF page object
+            text (str): Text already extracted from the page
+            
+        Returns:
+            bool: True if the page needs OCR to yield text
+        """
+        if len(text.strip()) >= OCR_MIN_TEXT_CHARS:
+            return False
+        page_rect = page.rect
+        covered = 0.0
+        for image in page.get_image_info():
+            area = fitz.Rect(image['bbox']) & page_rect
+            covered += area.width * area.height if not area.is_empty else 0.0
+        return covered >= OCR_MIN_IMAGE_COVERAGE * page_rect.width * page_rect.height
+    
+    def _apply_ocr(self, records: List[PageRecord]):
+        """
+        Replace the text of image-only pages with OCR text, in a bounded thread pool.
+        
+        Args:
+            records (List[PageRecord]): Page records; rendered images are released afterwards
+        """
+        pending = [record for record in records if record.ocr_image is not None]
+        if not pending:
+            return
+        
+        with ThreadPoolExecutor(max_workers=min(self.ocr_workers, len(pending))) as pool:
+            texts = list(pool.map(self._ocr_page, [record.ocr_image for record in pending]))
+        
+        for record, text in zip(pending, texts):
+            record.ocr_image = None
+            if text is not None:
+                record.text = text
+                record.ocr = True
+    
+    def _ocr_page(self, image: bytes) -> Optional[str]:
+        """
+        OCR one rendered page, reusing the cached text for an identical page image.
+        
+        Args:
+            image (bytes): PNG of the page
+            
+        Returns:
+            Optional[str]: Recognised text, or None if OCR failed
+        """
+        digest = hashlib.sha256(image).hexdigest()
+        cache_path = os.path.join(OCR_CACHE_DIR, f"{self.ocr_engine.name}-{digest}.txt")
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        
+        try:
+            text = self.ocr_engine.extract_text(image)
+        except Exception as e:
+            print(f"Warning: OCR failed, keeping extracted text: {str(e)}")
+            return None
+        
+        # Write to a temp file first so concurrent parses never read a partial entry
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=OCR_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+        return text
+    
+    def _page_drawings(self, page) -> Optional[List[Dict]]:
+        """
+        Read a page's vector graphics for the table detection budget and prefilter.
+        
+        get_cdrawings() returns the same paths as get_drawings() with plain tuples for
+        points and rects, at a fraction of the cost on pages with many paths; find_tables
+        reads the full drawings itself, only on pages it runs on.
+        
+        Args:
+            page: PyMuPDF page object
+            
+        Returns:
+            Optional[List[Dict]]: page.get_cdrawings() output, or None if detection is off or
+                the graphics could not be read
+        """
+        if self.table_detection == "never":
+            return None
+        try:
+            return page.get_cdrawings()
+        except Exception as e:
+            print(f"Warning: Could not read drawings on page {page.number + 1}, running detection: {str(e)}")
+            return None
+    
+    def _should_detect_tables(self, page, drawings: Optional[List[Dict]] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Decide whether find_tables needs to run on a page under the table_detection mode
+        and the time budgets.
+        
+        find_tables is pure Python and cannot be interrupted once started, so the page
+        budget is enforced up front: its cost grows with the number of vector drawing
+        items, which are counted for a fraction of the price.
+        
+        Args:
+            page: PyMuPDF page object
+            drawings (Optional[List[Dict]]): The page's drawings from _page_drawings; None
+                when they could not be read, in which case detection runs
+            
+        Returns:
+            Tuple[bool, Optional[str]]: Whether detection should run, and the budget that
+                ruled it out ("page_drawings" or "document_time"), if any
+        """
+        if self.table_detection == "never":
+            return False, None
+        if self._table_deadline is not None and time.time() > self._table_deadline:
+            return False, "document_time"
+        if drawings is None:
+            return True, None
+        
+        if self.page_time_budget is not None:
+            items = sum(len(path['items']) for path in drawings)
+            if items * TABLE_SECONDS_PER_DRAWING_ITEM > self.page_time_budget:
+                print(f"Warning: Page {page.number + 1} has {items} drawing items, over the "
+                      f"{self.page_time_budget}s table detection budget; keeping its plain text")
+                return False, "page_drawings"
+        if self.table_detection == "always":
+            return True, None
+        return self._page_has_ruling_lines(page, drawings), None
+    
+    def _page_has_ruling_lines(self, page, drawings: List[Dict]) -> bool:
+        """
+        Cheap prefilter: can the page's vector graphics form a ruled table at all?
+        
+        find_tables' default "lines" strategy builds cells only from drawn lines and
+        rectangles, so a page without at least two horizontal and two vertical edges
+        cannot yield a table. Counting them costs a fraction of a find_tables call.
+        
+        Args:
+            page: PyMuPDF page object
+            drawings (List[Dict]): The page's drawings from _page_drawings
+            
+        Returns:
+            bool: True if the page is a table candidate
+        """
+        horizontal = vertical = 0
+        try:
+            for path in drawings:
+                for item in path['items']:
+                    if item[0] in ('re', 'qu'):
+                        # A rectangle or quad contributes two edges in each direction
+                        horizontal += 2
+                        vertical += 2
+                    elif item[0] == 'l':
+                        (x0, y0), (x1, y1) = item[1], item[2]
+                        if abs(y1 - y0) <= 1:
+                            horizontal += 1
+                        elif abs(x1 - x0) <= 1:
+                            vertical += 1
+                if horizontal >= 2 and vertical >= 2:
+                    return True
+        except Exception as e:
+            print(f"Warning: Table prefilter failed on page {page.number + 1}, running detection: {str(e)}")
+            return True
+        return False
+    
+    def _start_table_budget(self):
+        """Start the document_time_budget clock for a new parse."""
+        self._table_deadline = (time.time() + self.document_time_budget
+                                if self.document_time_budget is not None else None)
+    
+    def _reset_parse_stats(self):
+        """Clear the counters for a new parse."""
+        self.parse_stats = {'pages': 0, 'table_detection_pages': 0, 'table_detection_skipped': 0, 'ocr_pages': 0,
+                            'pages_reused': 0, 'table_budget_exceeded': 0}
+        self.table_budget_pages = {}
+        self.parse_timings = {'get_text_seconds': 0.0, 'find_tables_seconds': 0.0}
+    
+    def _count_page(self, record: PageRecord):
+        """Add one page record to parse_stats."""
+        self.parse_stats['pages'] += 1
+        if record.table_detection_skipped:
+            self.parse_stats['table_detection_skipped'] += 1
+        elif record.tables is not None:
+            self.parse_stats['table_detection_pages'] += 1
+        if record.ocr:
+            self.parse_stats['ocr_pages'] += 1
+        if record.table_budget_exceeded:
+            self.parse_stats['table_budget_exceeded'] += 1
+            self.table_budget_pages[record.page_number] = record.table_budget_exceeded
+        if record.from_store:
+            self.parse_stats['pages_reused'] += 1
+            return
+        self.parse_timings['get_text_seconds'] += record.text_seconds
+        self.parse_timings['find_tables_seconds'] += record.table_seconds
+    
+    def _read_pages_parallel(self, pdf_source: PDFSource, page_count: int,
+                             extract_tables: bool) -> List[PageRecord]:
+        """
+        Read page ranges in worker processes, each opening the document from disk.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            page_count (int): Number of pages in the document
+            extract_tables (bool): Whether to run table detection
+            
+        Returns:
+            List[PageRecord]: One record per page, in page order
+        """
+        return self._map_page_ranges(pdf_source, page_count, _parse_page_range, extract_tables,
+                                     self._worker_settings(), self._table_deadline)
+    
+    def _map_page_ranges(self, pdf_source: PDFSource, page_count: int, job, *args) -> List:
+        """
+        Run a page range job in worker processes, one contiguous range per worker.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            page_count (int): Number of pages in the document
+            job: Module-level function called as job(pdf_path, start, end, *args), returning a list
+            *args: Further arguments for job
+            
+        Returns:
+            List: The jobs' results concatenated in page order
+        """
+        # Workers open the document from disk instead of each receiving a pickled copy
+        with self.source_on_disk(pdf_source) as pdf_path:
+            range_size = -(-page_count // self.workers)
+            ranges = [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                futures = [pool.submit(job, pdf_path, start, end, *args) for start, end in ranges]
+                return [item for future in futures for item in future.result()]
+    
+    @contextmanager
+    def source_on_disk(self, pdf_source: PDFSource) -> Iterator[str]:
+        """
+        Provide a file path for a PDF source, so other processes can open it.
+        
+        Paths and on-disk (spooled) files are used as they are; in-memory buffers are
+        written to a temporary file that is removed on exit.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            
+        Yields:
+            str: Path of the PDF
+        """
+        source = self._resolve_source(pdf_source)
+        if isinstance(source, str):
+            yield source
+            return
+        
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as fp:
+            fp.write(source)
+        try:
+            yield fp.name
+        finally:
+            os.remove(fp.name)
+    
+    def _worker_settings(self) -> Dict[str, Any]:
+        """Constructor arguments that reproduce this chunker's extraction behaviour in a worker."""
+        # The OCR engine is pickled along, so workers render and key pages for the configured engine
+        return {'overlap_percentage': self.overlap_percentage, 'table_detection': self.table_detection, 'ocr': self.ocr,
+                'ocr_engine': self.ocr_engine, 'strip_boilerplate': self.strip_boilerplate, 'page_store': self.page_store,
+                'page_time_budget': self.page_time_budget, 'document_time_budget': self.document_time_budget,
+                'paragraph_breaks': self.paragraph_breaks}
+    
+    def _resolve_source(self, pdf_source: PDFSource) -> Union[str, bytes, memoryview]:
+        """
+        Reduce a PDF source to a file path or a buffer PyMuPDF can open without copying.
+        
+        BytesIO objects are exposed through getbuffer() and on-disk file objects through
+        a path, so parsing an upload never duplicates it into a Python bytes object.
+        Spooled files still in memory are rolled over to disk first. Without a path
+        (anonymous temp files off Linux) the file is read into memory.
+        
+        Building a request body (see payload.prepare_pdf_payload) still reads the whole
+        document, since the bytes are what gets sent.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            
+        Returns:
+            Union[str, bytes, memoryview]: A filesystem path or a bytes-like buffer
+            
+        Raises:
+            ValueError: If the PDF source type is unsupported
+        """
+        if isinstance(pdf_source, (str, os.PathLike)):
+            return os.fspath(pdf_source)
+        if isinstance(pdf_source, (bytes, memoryview)):
+            return pdf_source
+        if isinstance(pdf_source, bytearray):
+            return memoryview(pdf_source)
+        
+        # UploadFile and NamedTemporaryFile wrap the real file object
+        file_obj = getattr(pdf_source, 'file', pdf_source)
+        if isinstance(file_obj, tempfile.SpooledTemporaryFile):
+            # An anonymous temp file from here on; a no-op if it already spilled to disk
+            file_obj.rollover()
+        
+        if isinstance(file_obj, io.BytesIO):
+            return file_obj.getbuffer()
+        if isinstance(getattr(file_obj, 'name', None), str) and os.path.isfile(file_obj.name):
+            file_obj.flush()
+            return file_obj.name
+        if hasattr(file_obj, 'fileno'):
+            file_obj.flush()
+            # Anonymous temp files have no name, but on Linux /proc exposes them as a path
+            # MuPDF can stream from (worker processes included)
+            fd_path = f"/proc/{os.getpid()}/fd/{file_obj.fileno()}"
+            if os.path.isfile(fd_path):
+                return fd_path
+            position = file_obj.tell()
+            file_obj.seek(0)
+            try:
+                return file_obj.read()
+            finally:
+                file_obj.seek(position)
+        
+        raise ValueError(f"Unsupported PDF source type: {type(pdf_source)}")
+    
+    def _open_document(self, pdf_source: PDFSource):
+        """
+        Open a PDF source with PyMuPDF.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            
+        Returns:
+            fitz.Document: The opened document
+            
+        Raises:
+            ValueError: If the PDF source type is unsupported
+        """
+        source = self._resolve_source(pdf_source)
+        if isinstance(source, str):
+            # File path, read by MuPDF directly
+            return fitz.open(source)
+        # Buffers are handed to MuPDF as-is; the document keeps a reference while open
+        return fitz.open(stream=source, filetype="pdf")
+    
+    def _source_digest(self, pdf_source: PDFSource) -> str:
+        """
+        Compute the SHA-256 of a PDF source, used to key per-document caches.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            
+        Returns:
+            str: Hex digest of the PDF bytes
+        """
+        source = self._resolve_source(pdf_source)
+        digest = hashlib.sha256()
+        if isinstance(source, str):
+            with open(source, 'rb') as fp:
+                for block in iter(lambda: fp.read(1024 * 1024), b''):
+                    digest.update(block)
+        else:
+            digest.update(source)
+        return digest.hexdigest()
+    
+    def _table_cache_key(self, pdf_source: PDFSource) -> str:
+        """Key a document's cached tables by its bytes and the table detection mode."""
+        return f"{self._source_digest(pdf_source)}:{self.table_detection}"
+    
+    def _get_page_tables(self, doc, cache_key: str) -> Dict[int, Optional[List[PageTable]]]:
         """
-        Initialize the PDF chunker.
+        Return the tables of every page, running table detection only on a cache miss.
         
         Args:
-            overlap_percentage (float): Percentage of overlap between chunks (default: 0.2 for 20%)
+            doc: PyMuPDF document object
+            cache_key (str): Key from _table_cache_key
+            
+        Returns:
+            Dict[int, Optional[List[PageTable]]]: Tables per page number, None where detection failed
         """
-        self.overlap_percentage = overlap_percentage
+        if cache_key in self._table_cache:
+            return self._table_cache[cache_key]
+        
+        page_tables = {}
+        budget_exceeded = False
+        self._start_table_budget()
+        for page_num in range(len(doc)):
+            page = doc.load_page(page_num)
+            drawings = self._page_drawings(page)
+            detect_tables, reason = self._should_detect_tables(page, drawings)
+            page_tables[page_num + 1] = self._find_page_tables(page) if detect_tables else []
+            budget_exceeded = budget_exceeded or reason is not None
         
-    def parse_pdf(self, pdf_source: Union[str, bytes, io.BytesIO], extract_tables: bool = True) -> List[Tuple[int, str]]:
+        if not budget_exceeded:
+            self._cache_page_tables(cache_key, page_tables)
+        return page_tables
+    
+    def _cache_page_tables(self, cache_key: str, page_tables: Dict[int, Optional[List[PageTable]]]):
         """
-        Parse a PDF file and extract text with page references.
+        Remember a document's tables, evicting the oldest document beyond TABLE_CACHE_SIZE.
+        
+        Callers skip documents where a table detection budget was exceeded, so their
+        pages are checked and flagged again on the next parse.
+        """
+        self._table_cache[cache_key] = page_tables
+        while len(self._table_cache) > TABLE_CACHE_SIZE:
+            self._table_cache.pop(next(iter(self._table_cache)))
+    
+    def _find_page_tables(self, page, textpage=None) -> Optional[List[PageTable]]:
+        """
+        Run table detection on a page and extract each table's cells.
+        
+        find_tables builds its own character map and reads the page's drawings; the
+        TextPage is reused for the text around the table.
         
         Args:
-            pdf_source: Can be:
-                - str: Path to the PDF file
-                - bytes: PDF file content as bytes
-                - io.BytesIO: PDF file as BytesIO object
-            extract_tables (bool): Whether to extract tables with proper formatting
+            page: PyMuPDF page object
+            textpage: TextPage already extracted for the page, if any
             
         Returns:
-            List[Tuple[int, str]]: List of tuples containing (page_number, text)
-            
-        Raises:
-            ValueError: If the PDF source is invalid
-            Exception: If there's an error parsing the PDF
+            Optional[List[PageTable]]: Tables on the page, or None if detection failed
         """
         try:
-            # Handle different input types
-            if isinstance(pdf_source, str):
-                # File path
-                doc = fitz.open(pdf_source)
-            elif isinstance(pdf_source, bytes):
-                # Bytes data
-                doc = fitz.open(stream=pdf_source, filetype="pdf")
-            elif isinstance(pdf_source, io.BytesIO):
-                # BytesIO object
-                doc = fitz.open(stream=pdf_source.read(), filetype="pdf")
-            else:
-                raise ValueError(f"Unsupported PDF source type: {type(pdf_source)}")
+            tables = [
+                PageTable(index=i + 1, bbox=tuple(table_obj.bbox), rows=table_obj.extract())
+                for i, table_obj in enumerate(page.find_tables())
+            ]
+            if tables:
+                # Only a page's topmost table can continue a table from the previous page
+                topmost = min(tables, key=lambda table: table.bbox[1])
+                topmost.text_outside = self._text_outside(page, topmost.bbox, textpage)
+            return tables
+        except Exception as e:
+            print(f"Warning: Table detection failed on page {page.number + 1}: {str(e)}")
+            return None
+    
+    def _text_outside(self, page, bbox: Tuple[float, float, float, float], textpage=None) -> str:
+        """
+        Extract a page's text without the lines that sit inside a table.
+        
+        Args:
+            page: PyMuPDF page object
+            bbox (Tuple[float, float, float, float]): Table bounding box
+            textpage: TextPage already extracted for the page, if any
             
-            pages_data = []
+        Returns:
+            str: Page text, formatted like page.get_text(), minus the table's lines
+        """
+        table_rect = fitz.Rect(bbox)
+        lines = []
+        for line in self._page_lines(textpage or page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)):
+            line_rect = fitz.Rect(line['bbox'])
+            center = fitz.Point((line_rect.x0 + line_rect.x1) / 2, (line_rect.y0 + line_rect.y1) / 2)
+            if center not in table_rect:
+                lines.append(line)
+        if self.paragraph_breaks:
+            return self._join_paragraphs(self._segment_paragraphs(lines))
+        return "".join(line['text'] + "\n" for line in lines)
+    
+    @staticmethod
+    def _page_lines(textpage) -> List[Dict[str, Any]]:
+        """
+        List a page's text lines in reading order, as page.get_text() prints them.
+        
+        Args:
+            textpage: TextPage of the page
             
-            if extract_tables:
-                # First pass: analyze all tables across pages to handle multi-page tables
-                table_tracker = self._analyze_multi_page_tables(doc)
-                
-                # Second pass: extract text with table awareness
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text = self._extract_text_with_tables_and_tracking(page, page_num + 1, table_tracker)
-                    pages_data.append((page_num + 1, text))  # Page numbers start from 1
-            else:
-                # Basic text extraction
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    pages_data.append((page_num + 1, text))  # Page numbers start from 1
-                
-            doc.close()
-            return pages_data
+        Returns:
+            List[Dict[str, Any]]: Lines with their text, bbox and largest font size
+        """
+        lines = []
+        for block in textpage.extractDICT()["blocks"]:
+            if block["type"] != 0:
+                continue
+            for line in block["lines"]:
+                lines.append({
+                    'text': "".join(span["text"] for span in line["spans"]),
+                    'bbox': tuple(line["bbox"]),
+                    'size': max((span["size"] for span in line["spans"]), default=0.0),
+                })
+        return lines
+    
+    @staticmethod
+    def _starts_paragraph(previous: Dict[str, Any], line: Dict[str, Any], paragraph: List[Dict[str, Any]]) -> bool:
+        """Decide from the layout whether a line opens a new paragraph after the previous line."""
+        height = max(previous['bbox'][3] - previous['bbox'][1], 1.0)
+        # Spans on the same baseline, e.g. a label and its value, belong together
+        if abs(line['bbox'][1] - previous['bbox'][1]) < height / 2 and line['bbox'][0] >= previous['bbox'][2]:
+            return False
+        gap = line['bbox'][1] - previous['bbox'][3]
+        if gap > PARAGRAPH_LINE_GAP * height or gap < -height:
+            # Blank space, or a jump back up to the top of the next column
+            return True
+        if abs(line['size'] - previous['size']) > 1:
+            return True
+        if not previous['text'].rstrip().endswith(PARAGRAPH_END_CHARS):
+            return False
+        left = min(member['bbox'][0] for member in paragraph)
+        right = max(member['bbox'][2] for member in paragraph)
+        if line['bbox'][0] - left > PARAGRAPH_INDENT:
+            return True
+        return previous['bbox'][2] < left + PARAGRAPH_SHORT_LINE * (right - left)
+    
+    def _segment_paragraphs(self, lines: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Group a page's lines into paragraphs using their geometry.
+        
+        Args:
+            lines (List[Dict[str, Any]]): Lines from _page_lines, in reading order
             
-        except Exception as e:
-            raise Exception(f"Error parsing PDF: {str(e)}")
+        Returns:
+            List[List[Dict[str, Any]]]: Paragraphs, each a list of lines
+        """
+        paragraphs: List[List[Dict[str, Any]]] = []
+        for line in lines:
+            if paragraphs and not self._starts_paragraph(paragraphs[-1][-1], line, paragraphs[-1]):
+                paragraphs[-1].append(line)
+            else:
+                paragraphs.append([line])
+        return paragraphs
+    
+    @staticmethod
+    def _join_paragraphs(paragraphs: List[List[Dict[str, Any]]]) -> str:
+        """Print paragraphs line by line like page.get_text(), with a blank line between paragraphs."""
+        return "\n".join("".join(line['text'] + "\n" for line in paragraph) for paragraph in paragraphs)
+    
+    def _paragraph_text(self, textpage) -> str:
+        """Page text with a blank line between paragraphs; every line is kept as get_text() prints it."""
+        return self._join_paragraphs(self._segment_paragraphs(self._page_lines(textpage)))
+    
+    @staticmethod
+    def _paragraph_string(paragraph: List[Dict[str, Any]]) -> str:
+        """Join a paragraph's lines into one string, undoing end-of-line hyphenation."""
+        text = ""
+        for line in paragraph:
+            line_text = line['text'].strip()
+            if not line_text:
+                continue
+            if text.endswith("-") and line_text[:1].islower():
+                text = text[:-1] + line_text
+            else:
+                text = f"{text} {line_text}" if text else line_text
+        return text
     
-    def _analyze_multi_page_tables(self, doc) -> Dict:
+    def _read_paragraphs(self, doc, start: int, end: int) -> List[Tuple[int, str]]:
         """
-        Analyze tables across all pages to identify multi-page tables.
+        Segment pages [start, end) into paragraphs.
         
         Args:
             doc: PyMuPDF document object
+            start (int): First page index (0-based)
+            end (int): Page index to stop before
+            
+        Returns:
+            List[Tuple[int, str]]: (page_number, paragraph) tuples in reading order
+        """
+        paragraphs = []
+        for page_num in range(start, end):
+            textpage = doc.load_page(page_num).get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            for paragraph in self._segment_paragraphs(self._page_lines(textpage)):
+                text = self._paragraph_string(paragraph)
+                if text:
+                    paragraphs.append((page_num + 1, text))
+        return paragraphs
+    
+    def extract_paragraphs(self, pdf_source: PDFSource) -> List[Tuple[int, str]]:
+        """
+        Split a PDF into paragraphs from its text layout, offline.
+        
+        Lines are grouped by vertical gaps, indents, font size changes and short
+        sentence-ending lines. Pages are segmented in worker processes when workers > 1
+        and the document has at least parallel_min_pages pages.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            
+        Returns:
+            List[Tuple[int, str]]: (page_number, paragraph) tuples in document order
+        """
+        doc = self._open_document(pdf_source)
+        try:
+            page_count = len(doc)
+            if self.workers <= 1 or page_count < self.parallel_min_pages:
+                return self._read_paragraphs(doc, 0, page_count)
+        finally:
+            doc.close()
+        return self._map_page_ranges(pdf_source, page_count, _paragraph_page_range, self._worker_settings())
+    
+    def _analyze_multi_page_tables(self, page_tables: Dict[int, Optional[List[PageTable]]],
+                                   page_heights: Dict[int, float]) -> Dict:
+        """
+        Analyze tables across all pages to identify and stitch multi-page tables.
+        
+        Args:
+            page_tables (Dict[int, Optional[List[PageTable]]]): Tables found on each page
+            page_heights (Dict[int, float]): Height of each page
             
         Returns:
             Dict: Table tracking information
         """
-        table_tracker = {
-            'multi_page_tables': {},  # Track tables that span multiple pages
-            'table_origins': {},      # Track which page each table originates from
-            'processed_tables': set() # Track which tables have been processed
-        }
+        table_tracker = self._new_table_tracker()
         
         try:
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                tables = page.find_tables()
-                
-                for i, table_obj in enumerate(tables):
-                    table_id = f"page_{page_num + 1}_table_{i + 1}"
-                    bbox = table_obj.bbox
-                    
-                    # Check if table extends beyond page boundaries
-                    page_height = page.rect.height
-                    if bbox[3] > page_height * 0.9:  # Table extends near bottom of page
-                        # This might be a multi-page table
-                        table_tracker['multi_page_tables'][table_id] = {
-                            'origin_page': page_num + 1,
-                            'bbox': bbox,
-                            'table_obj': table_obj
-                        }
-                    
-                    table_tracker['table_origins'][table_id] = page_num + 1
+            for page_num, tables in sorted(page_tables.items()):
+                self._track_page_tables(table_tracker, page_num, tables, page_heights[page_num])
                     
         except Exception as e:
             print(f"Warning: Error analyzing multi-page tables: {str(e)}")
             
         return table_tracker
     
-    def _extract_text_with_tables_and_tracking(self, page, page_num: int, table_tracker: Dict) -> str:
+    def _new_table_tracker(self) -> Dict:
+        """Create an empty multi-page table tracker."""
+        return {
+            'multi_page_tables': {},  # Track tables that span multiple pages
+            'table_origins': {},      # Track which page each table originates from
+            'processed_tables': set(), # Track which tables have been processed
+            'merged_tables': {},      # Origin table id -> table with the continuation rows appended
+            'open_table': None        # Last table of the latest page, which the next page may continue
+        }
+    
+    def _track_page_tables(self, table_tracker: Dict, page_num: int,
+                           tables: Optional[List[PageTable]], page_height: float):
         """
-        Extract text from a page with table awareness and multi-page table tracking.
+        Register one page's tables with the tracker, stitching continuations.
+        
+        Pages must be tracked in order. If the topmost table on this page continues
+        the last table of the previous page, its rows are appended to the merged
+        table of the origin page and it is marked as a continuation.
         
         Args:
-            page: PyMuPDF page object
+            table_tracker (Dict): Table tracking information, updated in place
+            page_num (int): Page number
+            tables (Optional[List[PageTable]]): Tables found on the page
+            page_height (float): Height of the page
+        """
+        open_table = table_tracker['open_table']
+        table_tracker['open_table'] = None
+        
+        for position, table in enumerate(sorted(tables or [], key=lambda table: table.bbox[1])):
+            table_id = f"page_{page_num}_table_{table.index}"
+            chain = {'origin_id': table_id, 'origin_page': page_num, 'header': table.rows[0] if table.rows else None}
+            
+            if (position == 0 and open_table and open_table['page'] == page_num - 1
+                    and self._continues_table(open_table, table, page_height)):
+                chain = {key: open_table[key] for key in ('origin_id', 'origin_page', 'header')}
+                origin = open_table['origin']
+                table_tracker['multi_page_tables'].setdefault(chain['origin_id'], {
+                    'origin_page': chain['origin_page'], 'bbox': origin.bbox, 'table': origin
+                })
+                table_tracker['multi_page_tables'][table_id] = {
+                    'origin_page': chain['origin_page'], 'bbox': table.bbox, 'table': table
+                }
+                merged = table_tracker['merged_tables'].setdefault(
+                    chain['origin_id'], PageTable(index=origin.index, bbox=origin.bbox, rows=list(origin.rows))
+                )
+                # Drop the header row the continuation page repeats
+                repeats_header = self._header_similarity(chain['header'], table.rows[0]) >= TABLE_HEADER_SIMILARITY
+                merged.rows.extend(table.rows[1:] if repeats_header else table.rows)
+            
+            table_tracker['table_origins'][table_id] = chain['origin_page']
+            table_tracker['open_table'] = dict(chain, page=page_num, table=table, page_height=page_height,
+                                               origin=open_table['origin'] if chain['origin_page'] != page_num else table)
+    
+    def _continues_table(self, open_table: Dict, table: PageTable, page_height: float) -> bool:
+        """
+        Decide whether a page's topmost table continues the previous page's last table.
+        
+        Args:
+            open_table (Dict): The previous page's last table and the header of its origin
+            table (PageTable): Topmost table on the current page
+            page_height (float): Height of the current page
+            
+        Returns:
+            bool: True if the table is a continuation
+        """
+        previous = open_table['table']
+        if not table.rows or not previous.rows or len(table.rows[0]) != len(previous.rows[0]):
+            return False
+        if table.bbox[1] > page_height * TABLE_CONTINUATION_MARGIN:
+            return False  # Prose above the table: a new table, not a continuation
+        if self._header_similarity(open_table['header'], table.rows[0]) >= TABLE_HEADER_SIMILARITY:
+            return True
+        return previous.bbox[3] > open_table['page_height'] * (1 - TABLE_CONTINUATION_MARGIN)
+    
+    @staticmethod
+    def _header_similarity(header: Optional[List[Optional[str]]], row: List[Optional[str]]) -> float:
+        """Share of cells that are equal, ignoring case and whitespace, between two rows of the same width."""
+        if not header or len(header) != len(row):
+            return 0.0
+        normalize = lambda cell: " ".join(str(cell or "").lower().split())
+        return sum(1 for a, b in zip(header, row) if normalize(a) == normalize(b)) / len(header)
+    
+    def _extract_text_with_tables_and_tracking(self, basic_text: str, page_num: int, table_tracker: Dict,
+                                               tables: Optional[List[PageTable]]) -> str:
+        """
+        Build a page's text with table awareness and multi-page table tracking.
+        
+        Args:
+            basic_text (str): Plain text of the page
             page_num (int): Page number
             table_tracker (Dict): Table tracking information
+            tables (Optional[List[PageTable]]): Tables already found on this page
             
         Returns:
             str: Formatted text with tables properly structured
         """
         try:
-            # Get basic text first
-            basic_text = page.get_text()
-            
-            # Find tables on the page
-            tables = page.find_tables()
-            
             if not tables:
                 return basic_text
             
             # Process tables with multi-page awareness
             result_text = basic_text
             
-            for i, table_obj in enumerate(tables):
-                table_id = f"page_{page_num}_table_{i + 1}"
+            for table in tables:
+                table_id = f"page_{page_num}_table_{table.index}"
+                multi_page = table_tracker['multi_page_tables'].get(table_id)
+                if multi_page and multi_page['origin_page'] != page_num and table.text_outside is not None:
+                    # Continuation rows are shown with the merged table on the origin page
+                    result_text = table.text_outside
+            
+            for table in tables:
+                table_id = f"page_{page_num}_table_{table.index}"
                 
                 # Check if this table should be processed on this page
                 if table_id in table_tracker['processed_tables']:
@@ -162,10 +1645,10 @@ class PDFChunker:
                 if table_id in table_tracker['multi_page_tables']:
                     # This is a multi-page table - only show on origin page
                     if table_tracker['multi_page_tables'][table_id]['origin_page'] == page_num:
-                        # This is the origin page - show the full table
-                        table_data = table_obj.extract()
-                        if table_data and len(table_data) > 0:
-                            formatted_table = self._format_table_as_llm_friendly_text(table_data, i + 1)
+                        # This is the origin page - show the full stitched table
+                        merged = table_tracker['merged_tables'].get(table_id, table)
+                        if merged.rows and len(merged.rows) > 0:
+                            formatted_table = self._format_table(merged.rows, table.index)
                             result_text += f"\n\n{formatted_table}\n"
                             table_tracker['processed_tables'].add(table_id)
                     else:
@@ -174,9 +1657,8 @@ class PDFChunker:
                         continue
                 else:
                     # Regular single-page table
-                    table_data = table_obj.extract()
-                    if table_data and len(table_data) > 0:
-                        formatted_table = self._format_table_as_llm_friendly_text(table_data, i + 1)
+                    if table.rows and len(table.rows) > 0:
+                        formatted_table = self._format_table(table.rows, table.index)
                         result_text += f"\n\n{formatted_table}\n"
                         table_tracker['processed_tables'].add(table_id)
             
@@ -184,7 +1666,46 @@ class PDFChunker:
             
         except Exception as e:
             print(f"Warning: Table extraction failed, using basic text: {str(e)}")
-            return page.get_text()
+            return basic_text
+    
+    def _format_table(self, table_data: List[List[str]], table_num: int, table_format: Optional[str] = None) -> str:
+        """
+        Format table data in the chunker's table format.
+        
+        Args:
+            table_data (List[List[str]]): Table data as list of rows, header first
+            table_num (int): Table number for reference
+            table_format (Optional[str]): Format to use instead of self.table_format
+            
+        Returns:
+            str: Formatted table text, starting with a "TABLE n" line
+        """
+        table_format = table_format or self.table_format
+        if table_format == "legacy":
+            return self._format_table_as_llm_friendly_text(table_data, table_num)
+        if not table_data or len(table_data) == 0:
+            return f"TABLE {table_num}: [Empty table]"
+        
+        try:
+            # Cells wrap over several lines in the PDF; one line per row keeps the grid intact
+            rows = [[" ".join(str(cell).split()) if cell else "" for cell in row] for row in table_data]
+            
+            if table_format == "tsv":
+                lines = [f"TABLE {table_num} (TSV):"]
+                lines.extend("\t".join(row) for row in rows)
+                return "\n".join(lines)
+            
+            if table_format == "json":
+                body = json.dumps({'columns': rows[0], 'rows': rows[1:]}, ensure_ascii=False, separators=(',', ':'))
+                return f"TABLE {table_num} (JSON):\n{body}"
+            
+            rows = [[cell.replace("|", "\\|") for cell in row] for row in rows]
+            lines = [f"TABLE {table_num}:", "| " + " | ".join(rows[0]) + " |", "|" + "---|" * len(rows[0])]
+            lines.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+            return "\n".join(lines)
+            
+        except Exception as e:
+            return f"TABLE {table_num}: [Error formatting: {str(e)}]"
     
     def _format_table_as_llm_friendly_text(self, table_data: List[List[str]], table_num: int) -> str:
         """
@@ -238,77 +1759,211 @@ class PDFChunker:
         """
         return int(len(text) * self.overlap_percentage)
     
-    def create_chunks(self, pages_data: List[Tuple[int, str]]) -> List[PDFChunk]:
+    def create_chunks(self, pages_data: List[Tuple[int, str]],
+                      boilerplate: Optional[Dict[int, List[Tuple[int, str]]]] = None,
+                      table_budget: Optional[Dict[int, str]] = None) -> List[PDFChunk]:
         """
-        Create chunks from pages data with overlap between adjacent pages.
+        Create chunks from pages data with overlap between adjacent chunks.
+        
+        In "page" mode every page becomes one chunk. In "tokens" mode short
+        consecutive pages are merged and oversized pages are split so that each
+        chunk fits max_chunk_tokens; overlap_info['pages'] and overlap_info['spans']
+        record which page every part of the chunk text came from.
         
         Args:
             pages_data (List[Tuple[int, str]]): List of (page_number, text) tuples
+            boilerplate (Optional[Dict]): Lines stripped from the pages, as in
+                boilerplate_report['removed'], so chunk.source_text can restore them
+            table_budget (Optional[Dict[int, str]]): Pages that exceeded a table detection budget,
+                as in table_budget_pages; recorded in overlap_info['table_budget_exceeded']
             
         Returns:
             List[PDFChunk]: List of PDF chunks with overlap information
         """
-        if not pages_data:
-            return []
-            
-        chunks = []
-        total_pages = len(pages_data)
-        
-        for i, (page_num, text) in enumerate(pages_data):
-            chunk_text = text
-            overlap_info = {
-                'has_previous_overlap': False,
-                'has_next_overlap': False,
-                'previous_page': None,
-                'next_page': None,
-                'overlap_chars_used': 0
-            }
-            
-            # Initialize overlap text fields
-            prev_overlap_text = None
-            next_overlap_text = None
-            
-            # Add overlap from previous page (if not first page)
-            if i > 0:
-                prev_page_num, prev_text = pages_data[i - 1]
-                overlap_chars = self.calculate_overlap_chars(prev_text)
-                if overlap_chars > 0:
-                    prev_overlap_text = prev_text[-overlap_chars:] if len(prev_text) > overlap_chars else prev_text
-                    overlap_info['has_previous_overlap'] = True
-                    overlap_info['previous_page'] = prev_page_num
-                    overlap_info['overlap_chars_used'] += overlap_chars
-            
-            # Add overlap from next page (if not last page)
-            if i < total_pages - 1:
-                next_page_num, next_text = pages_data[i + 1]
-                overlap_chars = self.calculate_overlap_chars(next_text)
-                if overlap_chars > 0:
-                    next_overlap_text = next_text[:overlap_chars] if len(next_text) > overlap_chars else next_text
-                    overlap_info['has_next_overlap'] = True
-                    overlap_info['next_page'] = next_page_num
-                    overlap_info['overlap_chars_used'] += overlap_chars
-            
-            chunk = PDFChunk(
-                page_number=page_num,
-                chunk_id=i + 1,
-                overlap_info=overlap_info,
-                original_page_text=text,
-                previous_overlap=prev_overlap_text,
-                next_overlap=next_overlap_text
-            )
-            chunks.append(chunk)
+        return list(self._iter_built_chunks(pages_data, boilerplate, table_budget))
+    
+    def _iter_built_chunks(self, pages: Iterable[Tuple[int, str]],
+                           boilerplate: Optional[Dict[int, List[Tuple[int, str]]]] = None,
+                           table_budget: Optional[Dict[int, str]] = None) -> Iterator[PDFChunk]:
+        """
+        Build chunks from pages as they arrive.
+        
+        Each chunk is yielded once the following chunk's text is known, since the
+        next overlap is taken from it.
+        
+        Args:
+            pages (Iterable[Tuple[int, str]]): (page_number, text) tuples in page order
+            boilerplate (Optional[Dict]): Lines stripped from the pages, filled in as they are read
+            table_budget (Optional[Dict[int, str]]): Pages over a table detection budget, filled in as they are read
             
-        return chunks
+        Yields:
+            PDFChunk: Chunks in page order
+        """
+        if self.chunking == "tokens":
+            entries = self._pack_token_chunks(pages)
+        else:
+            entries = ((page_num, text, None) for page_num, text in pages)
+        
+        document = DocumentText(boilerplate=boilerplate)
+        spans: List[Optional[List[Dict[str, int]]]] = []
+        for page_num, text, chunk_spans in entries:
+            index = document.append(page_num, text)
+            spans.append(chunk_spans)
+            if index > 0:
+                yield self._build_chunk(index, document, index - 1, spans, table_budget)
+        
+        if document.pages:
+            yield self._build_chunk(len(document.pages), document, len(document.pages) - 1, spans, table_budget)
+    
+    def _pack_token_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str, List[Dict[str, int]]]]:
+        """
+        Pack page text into chunks of at most max_chunk_tokens.
+        
+        Pages are added whole while they fit; a page that is larger than the budget
+        on its own is split at the best boundary in SPLIT_BOUNDARIES. Every part
+        is preceded by a PAGE_MARKER so the model can cite page numbers.
+        
+        Args:
+            pages (Iterable[Tuple[int, str]]): (page_number, text) tuples in page order
+            
+        Yields:
+            Tuple[int, str, List[Dict[str, int]]]: (first page number, chunk text, spans), where
+                each span gives the page, the [start, end) offsets of its text in the chunk and
+                the offset of that text within the page
+        """
+        parts: List[str] = []
+        spans: List[Dict[str, int]] = []
+        length = 0
+        tokens = 0
+        
+        for page_num, text in pages:
+            marker = PAGE_MARKER.format(page=page_num)
+            max_chars = max(CHARS_PER_TOKEN, (self.max_chunk_tokens - estimate_tokens("\n\n" + marker)) * CHARS_PER_TOKEN)
+            for start, end in self._split_text(text, max_chars):
+                part_tokens = estimate_tokens("\n\n" + marker + text[start:end])
+                if parts and tokens + part_tokens > self.max_chunk_tokens:
+                    yield spans[0]['page'], "".join(parts), spans
+                    parts, spans, length, tokens = [], [], 0, 0
+                
+                part = ("\n\n" if parts else "") + marker
+                span_start = length + len(part)
+                part += text[start:end]
+                parts.append(part)
+                spans.append({'page': page_num, 'start': span_start, 'end': span_start + end - start, 'offset': start})
+                length += len(part)
+                tokens += part_tokens
+        
+        if parts:
+            yield spans[0]['page'], "".join(parts), spans
+    
+    @staticmethod
+    def _split_text(text: str, max_chars: int) -> List[Tuple[int, int]]:
+        """
+        Split text into [start, end) ranges of at most max_chars characters.
+        
+        Cuts go right after the best boundary found in the second half of the
+        window, so pieces keep whole paragraphs and tables where possible.
+        
+        Args:
+            text (str): Page text
+            max_chars (int): Maximum characters per range
+            
+        Returns:
+            List[Tuple[int, int]]: Ranges that together cover the whole text
+        """
+        ranges = []
+        start = 0
+        while len(text) - start > max_chars:
+            window_end = start + max_chars
+            cut = window_end
+            for boundary in SPLIT_BOUNDARIES:
+                position = text.rfind(boundary, start + max_chars // 2, window_end - len(boundary) + 1)
+                if position != -1:
+                    cut = position + len(boundary)
+                    break
+            ranges.append((start, cut))
+            start = cut
+        ranges.append((start, len(text)))
+        return ranges
+    
+    def _build_chunk(self, chunk_id: int, document: DocumentText, index: int,
+                     spans: Optional[List[Optional[List[Dict[str, int]]]]] = None,
+                     table_budget: Optional[Dict[int, str]] = None) -> PDFChunk:
+        """
+        Build the chunk for one page from its text and its neighbours' text.
+        
+        The chunk references the shared document buffer; its overlaps are recorded as
+        character counts. A next overlap is added only if the following page is
+        already in the buffer.
+        
+        Args:
+            chunk_id (int): 1-based chunk id
+            document (DocumentText): Buffer holding the page texts read so far
+            index (int): Index of the chunk's page in the buffer
+            spans (Optional[List]): Page spans per buffer entry for token-budget chunks
+            table_budget (Optional[Dict[int, str]]): Pages whose table detection exceeded a budget
+            
+        Returns:
+            PDFChunk: The chunk with overlap information
+        """
+        overlap_info = {
+            'has_previous_overlap': False,
+            'has_next_overlap': False,
+            'previous_page': None,
+            'next_page': None,
+            'overlap_chars_used': 0
+        }
+        
+        # Initialize overlap lengths
+        prev_overlap_chars = None
+        next_overlap_chars = None
+        
+        # Add overlap from previous page (if not first page)
+        if index > 0:
+            overlap_chars = self.calculate_overlap_chars(document.pages[index - 1])
+            if overlap_chars > 0:
+                prev_overlap_chars = overlap_chars
+                overlap_info['has_previous_overlap'] = True
+                overlap_info['previous_page'] = document.page_numbers[index - 1]
+                overlap_info['overlap_chars_used'] += overlap_chars
+        
+        # Add overlap from next page (if not last page)
+        if index < len(document.pages) - 1:
+            overlap_chars = self.calculate_overlap_chars(document.pages[index + 1])
+            if overlap_chars > 0:
+                next_overlap_chars = overlap_chars
+                overlap_info['has_next_overlap'] = True
+                overlap_info['next_page'] = document.page_numbers[index + 1]
+                overlap_info['overlap_chars_used'] += overlap_chars
+        
+        # Token-budget chunks: record page provenance and point previous_page at
+        # the last page of the previous chunk rather than its first
+        if spans and spans[index]:
+            overlap_info['pages'] = sorted({span['page'] for span in spans[index]})
+            overlap_info['spans'] = spans[index]
+            if overlap_info['previous_page'] is not None:
+                overlap_info['previous_page'] = spans[index - 1][-1]['page']
+        
+        # Flag pages whose tables were skipped or slow to detect, so reviewers know their
+        # tables may only be present as plain text
+        if table_budget:
+            page_numbers = overlap_info.get('pages') or [document.page_numbers[index]]
+            exceeded = {page: table_budget[page] for page in page_numbers if page in table_budget}
+            if exceeded:
+                overlap_info['table_budget_exceeded'] = exceeded
+        
+        return PDFChunk.from_document(document, index, chunk_id, overlap_info, prev_overlap_chars, next_overlap_chars)
     
-    def process_pdf(self, pdf_source: Union[str, bytes, io.BytesIO], extract_tables: bool = True) -> List[PDFChunk]:
+    def process_pdf(self, pdf_source: PDFSource, extract_tables: bool = True) -> List[PDFChunk]:
         """
         Main method to process a PDF file and return chunks.
         
         Args:
             pdf_source: Can be:
-                - str: Path to the PDF file
-                - bytes: PDF file content as bytes
+                - str / os.PathLike: Path to the PDF file
+                - bytes / bytearray / memoryview: PDF file content, read without copying
                 - io.BytesIO: PDF file as BytesIO object
+                - file object or UploadFile: read via its buffer or a memory map, without copying
             extract_tables (bool): Whether to extract tables with proper formatting
             
         Returns:
@@ -321,51 +1976,332 @@ class PDFChunker:
         # Parse the PDF
         pages_data = self.parse_pdf(pdf_source, extract_tables=extract_tables)
         print(f"Extracted text from {len(pages_data)} pages")
+        if extract_tables:
+            print(f"Table detection ({self.table_detection}): skipped {self.parse_stats['table_detection_skipped']} "
+                  f"of {self.parse_stats['pages']} pages")
+        if self.parse_stats['table_budget_exceeded']:
+            print(f"Table detection budget exceeded on {self.parse_stats['table_budget_exceeded']} pages: "
+                  f"{self.table_budget_pages}")
+        if self.page_store is not None:
+            print(f"Page store: reused {self.parse_stats['pages_reused']} of {self.parse_stats['pages']} pages")
+        if self.boilerplate_report['lines_removed']:
+            print(f"Boilerplate: removed {self.boilerplate_report['lines_removed']} header/footer lines, "
+                  f"{self.boilerplate_report['chars_saved']} chars (~{self.boilerplate_report['tokens_saved']} tokens)")
+        if self.parse_stats['ocr_pages']:
+            print(f"OCR ({self.ocr_engine.name}): {self.parse_stats['ocr_pages']} image-only pages")
         
         # Create chunks with overlap
-        chunks = self.create_chunks(pages_data)
-        print(f"Created {len(chunks)} chunks with {self.overlap_percentage*100}% overlap")
+        chunks = self.create_chunks(pages_data, self.boilerplate_report['removed'], self.table_budget_pages)
+        if self.chunking == "tokens":
+            print(f"Created {len(chunks)} chunks from {len(pages_data)} pages "
+                  f"(budget {self.max_chunk_tokens} tokens) with {self.overlap_percentage*100}% overlap")
+        else:
+            print(f"Created {len(chunks)} chunks with {self.overlap_percentage*100}% overlap")
         
         return chunks
     
-    def get_table_info(self, pdf_source: Union[str, bytes, io.BytesIO]) -> Dict[int, int]:
+    def iter_pages(self, pdf_source: PDFSource, extract_tables: bool = True,
+                   boilerplate: Optional[Dict[int, List[Tuple[int, str]]]] = None,
+                   table_budget: Optional[Dict[int, str]] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Parse a PDF lazily, yielding each page as soon as it is extracted.
+        
+        Produces the same (page_number, text) tuples as parse_pdf, in order. The first
+        BOILERPLATE_SAMPLE_PAGES pages are held back until headers and footers are known.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            extract_tables (bool): Whether to extract tables with proper formatting
+            boilerplate (Optional[Dict]): Filled with the lines stripped from each page before it is yielded
+            table_budget (Optional[Dict[int, str]]): Filled with the table detection budget each page
+                exceeded, if any, before it is yielded
+            
+        Yields:
+            Tuple[int, str]: (page_number, text) for each page
+        """
+        cache_key = self._table_cache_key(pdf_source) if extract_tables else None
+        cached_tables = self._table_cache.get(cache_key) if extract_tables else None
+        find_tables = extract_tables and cached_tables is None
+        table_tracker = self._new_table_tracker()
+        page_tables = {}
+        held: List[Tuple[PageRecord, Optional[List[PageTable]]]] = []
+        patterns = None
+        self._reset_parse_stats()
+        self._start_table_budget()
+        
+        def render(record: PageRecord, tables: Optional[List[PageTable]]) -> Tuple[int, str]:
+            text = record.text
+            if extract_tables:
+                text = self._extract_text_with_tables_and_tracking(text, record.page_number, table_tracker, tables)
+            text = self._strip_page_boilerplate(record, text, patterns)
+            if boilerplate is not None and record.page_number in self.boilerplate_report['removed']:
+                boilerplate[record.page_number] = self.boilerplate_report['removed'][record.page_number]
+            if table_budget is not None and record.table_budget_exceeded:
+                table_budget[record.page_number] = record.table_budget_exceeded
+            return record.page_number, text
+        
+        doc = self._open_document(pdf_source)
+        try:
+            page_count = len(doc)
+            for page_index in range(page_count):
+                record = self._read_pages(doc, page_index, page_index + 1, find_tables)[0]
+                self._apply_ocr([record])
+                self._store_pages([record], find_tables)
+                self._count_page(record)
+                
+                tables = None
+                if extract_tables:
+                    tables = cached_tables.get(record.page_number) if cached_tables else record.tables
+                    # Boilerplate matching skips lines inside tables, so cached tables go on the record
+                    record.tables = tables
+                    page_tables[record.page_number] = tables
+                    self._track_page_tables(table_tracker, record.page_number, tables, record.height)
+                held.append((record, tables))
+                
+                # Boilerplate is learned from the first pages, which are held back until then
+                if patterns is None:
+                    if len(held) < min(BOILERPLATE_SAMPLE_PAGES, page_count):
+                        continue
+                    patterns = self._find_boilerplate([held_record for held_record, _ in held])
+                
+                # Hold pages back while a table is open: its origin page gets the rows of
+                # every continuation, so it can only be rendered once the table has ended
+                open_table = table_tracker['open_table']
+                keep_from = open_table['origin_page'] if open_table else record.page_number + 1
+                while held and held[0][0].page_number < keep_from:
+                    yield render(*held.pop(0))
+            
+            if patterns is None:
+                patterns = self._find_boilerplate([held_record for held_record, _ in held])
+            for ready, ready_tables in held:
+                yield render(ready, ready_tables)
+            self._evict_page_store()
+            
+            if find_tables and not self.table_budget_pages:
+                self._cache_page_tables(cache_key, page_tables)
+        finally:
+            doc.close()
+    
+    def iter_chunks(self, pdf_source: PDFSource, extract_tables: bool = True) -> Iterator[PDFChunk]:
+        """
+        Stream chunks while the PDF is still being parsed.
+        
+        Each chunk is yielded as soon as its text and the following chunk's text
+        (needed for next_overlap) are extracted, so callers can start LLM work on
+        the first chunk while later pages are still parsing. The chunks match
+        process_pdf's output in either chunking mode.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            extract_tables (bool): Whether to extract tables with proper formatting
+            
+        Yields:
+            PDFChunk: Chunks in page order
+        """
+        boilerplate: Dict[int, List[Tuple[int, str]]] = {}
+        table_budget: Dict[int, str] = {}
+        pages = self.iter_pages(pdf_source, extract_tables=extract_tables, boilerplate=boilerplate,
+                                table_budget=table_budget)
+        yield from self._iter_built_chunks(pages, boilerplate, table_budget)
+    
+    async def aiter_chunks(self, pdf_source: PDFSource, extract_tables: bool = True,
+                           executor: Optional[Executor] = None) -> AsyncIterator[PDFChunk]:
+        """
+        Async variant of iter_chunks that parses in a background thread.
+        
+        Parsing keeps running while the caller awaits model calls for earlier chunks.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            extract_tables (bool): Whether to extract tables with proper formatting
+            executor (Optional[Executor]): Thread pool to parse in (default: a dedicated thread)
+            
+        Yields:
+            PDFChunk: Chunks in page order
+            
+        Raises:
+            Exception: If there's an error parsing the PDF
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        done = object()
+        
+        def produce():
+            try:
+                for chunk in self.iter_chunks(pdf_source, extract_tables=extract_tables):
+                    if stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, Exception(f"Error parsing PDF: {str(e)}"))
+        
+        if executor is not None:
+            executor.submit(produce)
+        else:
+            threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+    
+    def get_table_info(self, pdf_source: PDFSource) -> Dict[int, int]:
         """
         Get information about tables found in the PDF.
         
         Args:
             pdf_source: Can be:
-                - str: Path to the PDF file
-                - bytes: PDF file content as bytes
+                - str / os.PathLike: Path to the PDF file
+                - bytes / bytearray / memoryview: PDF file content, read without copying
                 - io.BytesIO: PDF file as BytesIO object
+                - file object or UploadFile: read via its buffer or a memory map, without copying
             
         Returns:
             Dict[int, int]: Dictionary mapping page numbers to number of tables found
         """
         try:
-            # Handle different input types
-            if isinstance(pdf_source, str):
-                doc = fitz.open(pdf_source)
-            elif isinstance(pdf_source, bytes):
-                doc = fitz.open(stream=pdf_source, filetype="pdf")
-            elif isinstance(pdf_source, io.BytesIO):
-                doc = fitz.open(stream=pdf_source.read(), filetype="pdf")
+            cache_key = self._table_cache_key(pdf_source)
+            if cache_key in self._table_cache:
+                page_tables = self._table_cache[cache_key]
             else:
-                raise ValueError(f"Unsupported PDF source type: {type(pdf_source)}")
-            
-            table_info = {}
+                doc = self._open_document(pdf_source)
+                page_tables = self._get_page_tables(doc, cache_key)
+                doc.close()
             
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                tables = page.find_tables()
-                table_list = list(tables)
-                table_info[page_num + 1] = len(table_list)
-                
-            doc.close()
-            return table_info
+            return {page_num: len(tables or []) for page_num, tables in page_tables.items()}
             
         except Exception as e:
             raise Exception(f"Error analyzing tables in PDF: {str(e)}")
     
+    def preflight(self, pdf_source: PDFSource, sample_pages: int = PREFLIGHT_SAMPLE_PAGES) -> Dict[str, Any]:
+        """
+        Inspect a PDF in milliseconds, before paying for a full parse and LLM calls.
+        
+        Reads the document metadata and scans a few pages spread over the document for
+        their text, ruling lines and scanned images, then extrapolates to the whole file.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            sample_pages (int): Pages to scan
+            
+        Returns:
+            Dict[str, Any]: Report with readable, encrypted, repaired, pages, sampled_pages,
+                text_chars_per_page, table_likelihood and scanned_ratio (shares of sampled
+                pages), estimated_tokens, estimated_parse_seconds, problems and preflight_seconds
+        """
+        started = time.perf_counter()
+        report: Dict[str, Any] = {
+            'readable': True, 'encrypted': False, 'repaired': False, 'pages': 0, 'sampled_pages': [],
+            'text_chars_per_page': 0, 'table_likelihood': 0.0, 'scanned_ratio': 0.0,
+            'estimated_tokens': 0, 'estimated_parse_seconds': 0.0, 'problems': []
+        }
+        
+        try:
+            doc = self._open_document(pdf_source)
+        except Exception as e:
+            report['readable'] = False
+            report['problems'].append(f"unreadable: {str(e)}")
+            report['preflight_seconds'] = round(time.perf_counter() - started, 4)
+            return report
+        
+        try:
+            page_count = len(doc)
+            report['pages'] = page_count
+            report['encrypted'] = bool(doc.needs_pass)
+            report['repaired'] = bool(doc.is_repaired)
+            if doc.needs_pass:
+                report['problems'].append("encrypted")
+            elif page_count == 0:
+                report['problems'].append("no pages")
+            else:
+                self._preflight_sample(doc, sample_pages, report)
+        except Exception as e:
+            report['readable'] = False
+            report['problems'].append(f"unreadable: {str(e)}")
+        finally:
+            doc.close()
+        
+        report['preflight_seconds'] = round(time.perf_counter() - started, 4)
+        return report
+    
+    def _preflight_sample(self, doc, sample_pages: int, report: Dict[str, Any]):
+        """
+        Scan evenly spread pages of an open document and fill in preflight's estimates.
+        
+        Args:
+            doc: PyMuPDF document object
+            sample_pages (int): Pages to scan
+            report (Dict[str, Any]): Preflight report to fill in
+        """
+        page_count = len(doc)
+        sample_size = max(1, min(sample_pages, page_count))
+        indices = sorted({round(i * (page_count - 1) / max(1, sample_size - 1)) for i in range(sample_size)})
+        
+        text_chars = []
+        table_pages = scanned_pages = 0
+        parse_seconds = 0.0
+        for index in indices:
+            page = doc.load_page(index)
+            page_started = time.perf_counter()
+            text = page.get_text()
+            parse_seconds += time.perf_counter() - page_started
+            
+            if self._is_image_only(page, text):
+                scanned_pages += 1
+                parse_seconds += PREFLIGHT_OCR_PAGE_SECONDS if self.ocr else 0.0
+            else:
+                text_chars.append(len(text))
+            
+            drawings = page.get_cdrawings()
+            if self._page_has_ruling_lines(page, drawings):
+                table_pages += 1
+                items = sum(len(path['items']) for path in drawings)
+                parse_seconds += PREFLIGHT_TABLE_PAGE_SECONDS + items * TABLE_SECONDS_PER_DRAWING_ITEM
+        
+        # Scanned pages are assumed to carry as much text as the text pages once OCR'd
+        chars_per_page = sum(text_chars) / len(text_chars) if text_chars else 0
+        report['sampled_pages'] = [index + 1 for index in indices]
+        report['text_chars_per_page'] = round(chars_per_page)
+        report['table_likelihood'] = round(table_pages / len(indices), 3)
+        report['scanned_ratio'] = round(scanned_pages / len(indices), 3)
+        report['estimated_tokens'] = math.ceil(chars_per_page * page_count / CHARS_PER_TOKEN)
+        report['estimated_parse_seconds'] = round(parse_seconds * page_count / len(indices), 3)
+        if not text_chars:
+            report['problems'].append("no text layer" if self.ocr else "no text layer, OCR disabled")
+    
+    def table_format_costs(self, pdf_source: PDFSource) -> Dict[str, int]:
+        """
+        Estimate the tokens the document's tables cost in each table format.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object
+            
+        Returns:
+            Dict[str, int]: Estimated tokens per format, for all tables in the document
+        """
+        cache_key = self._table_cache_key(pdf_source)
+        page_tables = self._table_cache.get(cache_key)
+        if page_tables is None:
+            doc = self._open_document(pdf_source)
+            try:
+                page_tables = self._get_page_tables(doc, cache_key)
+            finally:
+                doc.close()
+        
+        tables = [table for tables in page_tables.values() for table in tables or [] if table.rows]
+        return {
+            table_format: sum(estimate_tokens(self._format_table(table.rows, table.index, table_format))
+                              for table in tables)
+            for table_format in TABLE_FORMATS
+        }
+    
     def print_chunk_summary(self, chunks: List[PDFChunk]):
         """
         Print a summary of the created chunks.
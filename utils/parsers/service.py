@@ -0,0 +1,178 @@
+"""
+Parsing service that keeps CPU-bound PDF parsing off the asyncio event loop.
+
+All routers parse through one shared, bounded executor, so a long lease keeps
+at most `workers` parses busy while the event loop goes on serving requests.
+"""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from utils.parsers.pdf import PDFChunk, PDFChunker, PDFSource
+
+
+# Executor kinds: threads share the process (PyMuPDF releases little of the GIL),
+# processes parse truly in parallel at the cost of opening the PDF from disk
+PARSE_EXECUTORS = ("thread", "process")
+# Parses run at the same time; further requests wait in the executor's queue
+DEFAULT_PARSE_WORKERS = 2
+
+
+def _process_pdf_job(pdf_source: PDFSource, extract_tables: bool, options: Dict[str, Any]) -> List[PDFChunk]:
+    """Executor job: parse a PDF into chunks with a chunker built from options."""
+    return PDFChunker(**options).process_pdf(pdf_source, extract_tables=extract_tables)
+
+
+class ParsingService:
+    """Bounded executor for PDF parsing with an awaitable API and queue metrics."""
+    
+    def __init__(self, executor: str = "thread", workers: int = DEFAULT_PARSE_WORKERS):
+        """
+        Initialize the service.
+        
+        Args:
+            executor (str): "thread" or "process"
+            workers (int): Parses that run at the same time
+            
+        Raises:
+            ValueError: If executor is not a known kind
+        """
+        if executor not in PARSE_EXECUTORS:
+            raise ValueError(f"executor must be one of {PARSE_EXECUTORS}, got {executor!r}")
+        
+        self.executor = executor
+        self.workers = max(1, workers)
+        if executor == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            # Streamed chunks are handed to the event loop as they are produced, so streams parse in threads
+            self._stream_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-stream")
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-parse")
+            self._stream_executor = self._executor
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+    
+    @classmethod
+    def from_env(cls) -> 'ParsingService':
+        """Build the service from the optional PARSING env var, e.g. {"executor": "process", "workers": 4}."""
+        config: dict = json.loads(os.environ.get('PARSING') or '{}')
+        return cls(executor=config.get('executor', 'thread'), workers=config.get('workers', DEFAULT_PARSE_WORKERS))
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current load of the service.
+        
+        Returns:
+            Dict[str, Any]: Executor kind, workers, parses in flight, parses queued
+                behind busy workers, and completed and failed counts
+        """
+        with self._lock:
+            return {
+                'executor': self.executor,
+                'workers': self.workers,
+                'in_flight': self._in_flight,
+                'queued': max(0, self._in_flight - self.workers),
+                'completed': self._completed,
+                'failed': self._failed,
+            }
+    
+    def _started(self):
+        with self._lock:
+            self._in_flight += 1
+    
+    def _finished(self, failed: bool):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+    
+    async def process_pdf(self, pdf_source: PDFSource, extract_tables: bool = True, **options) -> List[PDFChunk]:
+        """
+        Parse a PDF into chunks on the service's executor.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object such as an UploadFile
+            extract_tables (bool): Whether to extract tables with proper formatting
+            **options: PDFChunker constructor arguments
+            
+        Returns:
+            List[PDFChunk]: List of PDF chunks with overlap
+            
+        Raises:
+            Exception: If there's an error parsing the PDF
+        """
+        if self.executor == "process":
+            # Worker processes open the document by path instead of receiving the upload
+            with PDFChunker().source_on_disk(pdf_source) as pdf_path:
+                return await self._submit(pdf_path, extract_tables, options)
+        return await self._submit(pdf_source, extract_tables, options)
+    
+    async def preflight(self, pdf_source: PDFSource, **options) -> Dict[str, Any]:
+        """
+        Inspect a PDF before parsing it, see PDFChunker.preflight.
+        
+        Runs on the event loop's default executor rather than the parse workers, so the
+        check answers in milliseconds even while long parses are queued.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object such as an UploadFile
+            **options: PDFChunker constructor arguments
+            
+        Returns:
+            Dict[str, Any]: The preflight report
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, PDFChunker(**options).preflight, pdf_source)
+    
+    async def _submit(self, pdf_source: PDFSource, extract_tables: bool, options: Dict[str, Any]) -> List[PDFChunk]:
+        self._started()
+        future: Future = self._executor.submit(_process_pdf_job, pdf_source, extract_tables, options)
+        future.add_done_callback(lambda done: self._finished(done.exception() is not None))
+        return await asyncio.wrap_future(future)
+    
+    async def aiter_chunks(self, pdf_source: PDFSource, extract_tables: bool = True,
+                           **options) -> AsyncIterator[PDFChunk]:
+        """
+        Stream chunks while the PDF is parsed on the service's threads.
+        
+        Args:
+            pdf_source: File path, bytes-like object, BytesIO or (spooled) file object such as an UploadFile
+            extract_tables (bool): Whether to extract tables with proper formatting
+            **options: PDFChunker constructor arguments
+            
+        Yields:
+            PDFChunk: Chunks in page order
+            
+        Raises:
+            Exception: If there's an error parsing the PDF
+        """
+        chunker = PDFChunker(**options)
+        self._started()
+        failed = False
+        try:
+            async for chunk in chunker.aiter_chunks(pdf_source, extract_tables=extract_tables,
+                                                    executor=self._stream_executor):
+                yield chunk
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._finished(failed)
+
+
+_parsing_service: Optional[ParsingService] = None
+
+
+def get_parsing_service() -> ParsingService:
+    """Return the process-wide parsing service, creating it from the environment on first use."""
+    global _parsing_service
+    if _parsing_service is None:
+        _parsing_service = ParsingService.from_env()
+    return _parsing_service